@@ -1,32 +1,73 @@
-from infrastructure.db_helper import db_helper
+from infrastructure.cache import entity_cache
+from infrastructure.db_helper import db_helper, settings
+from infrastructure.events import PgNotifyBroker
+from infrastructure.orm.metadata_providers.inventoryRollupMetadataProvider import InventoryRollupMetadataProvider
+from infrastructure.orm.metadata_providers.positionStatsMetadataProvider import PositionStatsMetadataProvider
 from infrastructure.orm.metadata_providers.positionsMetadataProvider import PositionsMetadataProvider
 from infrastructure.orm.metadata_providers.providerManagerMetadataProvider import ProviderManagerMetadataProvider
 from infrastructure.orm.metadata_providers.providersMetadataProvider import ProviderMetadataProvider
+from infrastructure.orm.metadata_providers.stockLedgerMetadataProvider import StockLedgerMetadataProvider
+from infrastructure.orm.models.position import LOW_STOCK_CHANNEL
+from use_cases.inventory import InventoryUseCases
 from use_cases.position import PositionsUseCases
+from use_cases.position_stats import PositionStatsUseCases
 from use_cases.providers import ProviderUseCases
 from use_cases.provider_managers import ProviderManagerUseCases
+from use_cases.stock_ledger import StockLedgerUseCases
+
+# провайдеры и use cases без состояния: создаются один раз,
+# сессия берётся из unit of work текущего запроса (см. UnitOfWorkMiddleware)
+provider_provider = ProviderMetadataProvider(db=db_helper, cache=entity_cache)
+manager_provider = ProviderManagerMetadataProvider(db=db_helper, cache=entity_cache)
+positions_provider = PositionsMetadataProvider(db=db_helper, cache=entity_cache)
+stock_ledger_provider = StockLedgerMetadataProvider(db=db_helper)
+position_stats_provider = PositionStatsMetadataProvider(db=db_helper)
+inventory_rollup_provider = InventoryRollupMetadataProvider(db=db_helper)
+low_stock_events = PgNotifyBroker(
+    db_helper, channel=LOW_STOCK_CHANNEL, queue_size=settings.LOW_STOCK_EVENTS_QUEUE_SIZE
+)
+
+provider_use_cases = ProviderUseCases(providers=provider_provider, managers=manager_provider)
+manager_use_cases = ProviderManagerUseCases(managers=manager_provider)
+positions_use_cases = PositionsUseCases(
+    positions=positions_provider, low_stock_events=low_stock_events
+)
+stock_ledger_use_cases = StockLedgerUseCases(ledger=stock_ledger_provider)
+position_stats_use_cases = PositionStatsUseCases(stats=position_stats_provider)
+inventory_use_cases = InventoryUseCases(rollup=inventory_rollup_provider)
 
 
 def get_provider_provider() -> ProviderMetadataProvider:
-    return ProviderMetadataProvider(db=db_helper)
+    return provider_provider
 
 
 def get_manager_provider() -> ProviderManagerMetadataProvider:
-    return ProviderManagerMetadataProvider(db=db_helper)
+    return manager_provider
 
 
 def get_provider_use_cases() -> ProviderUseCases:
-    return ProviderUseCases(
-        providers=get_provider_provider(),
-        managers=get_manager_provider(),
-    )
+    return provider_use_cases
 
 
 def get_manager_use_cases() -> ProviderManagerUseCases:
-    return ProviderManagerUseCases(managers=get_manager_provider())
+    return manager_use_cases
+
+
 def get_positions_provider() -> PositionsMetadataProvider:
-    return PositionsMetadataProvider(db=db_helper)
+    return positions_provider
 
 
 def get_positions_use_cases() -> PositionsUseCases:
-    return PositionsUseCases(positions=get_positions_provider())
\ No newline at end of file
+    return positions_use_cases
+
+
+def get_stock_ledger_use_cases() -> StockLedgerUseCases:
+    return stock_ledger_use_cases
+
+
+def get_position_stats_use_cases() -> PositionStatsUseCases:
+    return position_stats_use_cases
+
+
+def get_inventory_use_cases() -> InventoryUseCases:
+    return inventory_use_cases
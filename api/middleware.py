@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import math
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from infrastructure.db_helper import DatabaseHelper, WriteTracker, bind_write_tracker
+from infrastructure.query_tracker import QueryStats, collect_queries
+from services.logger_setup import get_logger
+from services.metrics import CounterVec, GaugeVec, Histogram, HistogramVec, Labels, registry
+
+log = get_logger(__name__)
+
+# запросы без побочных эффектов: сессия read-only, может уйти в реплику
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_COMMIT_FAILED = b'{"detail":"Commit failed"}'
+
+
+class ReadYourWritesMiddleware:
+    """
+    Read-your-writes между запросами одного клиента: после записи ставим cookie
+    с её временем, и пока окно не истекло, read-only сессии этого клиента
+    идут в primary, а не в реплику.
+    """
+
+    cookie_name = "db_last_write"
+
+    def __init__(self, app: ASGIApp, *, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = WriteTracker(last_write=self._last_write_from_cookie(scope))
+        bind_write_tracker(tracker)
+        seen = tracker.last_write
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and tracker.last_write != seen:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{self.cookie_name}={tracker.last_write:.3f}; "
+                    f"Max-Age={math.ceil(self.window)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _last_write_from_cookie(self, scope: Scope) -> float | None:
+        raw = HTTPConnection(scope).cookies.get(self.cookie_name)
+        try:
+            return float(raw) if raw else None
+        except ValueError:
+            return None
+
+
+class UnitOfWorkMiddleware:
+    """
+    Одна сессия БД на запрос (см. DatabaseHelper.unit_of_work): соединение берётся
+    лениво при первом обращении к БД, commit — перед отправкой ответа со статусом < 400,
+    на 4xx/5xx и исключения — rollback.
+    """
+
+    def __init__(self, app: ASGIApp, *, db: DatabaseHelper):
+        self.app = app
+        self.db = db
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async with self.db.unit_of_work(readonly=scope["method"] in SAFE_METHODS) as uow:
+            failed = False
+
+            async def send_wrapper(message: Message) -> None:
+                nonlocal failed
+                if failed:
+                    return
+                if message["type"] == "http.response.start":
+                    if message["status"] >= 400:
+                        await uow.rollback()
+                    else:
+                        try:
+                            await uow.commit()
+                        except Exception as e:
+                            # клиент не должен получить 2xx на незакоммиченную запись
+                            log.error("Commit failed: %s", e)
+                            failed = True
+                            await send(
+                                {
+                                    "type": "http.response.start",
+                                    "status": 500,
+                                    "headers": [
+                                        (b"content-type", b"application/json"),
+                                        (b"content-length", str(len(_COMMIT_FAILED)).encode()),
+                                    ],
+                                }
+                            )
+                            await send({"type": "http.response.body", "body": _COMMIT_FAILED})
+                            return
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+http_duration = registry.register(
+    HistogramVec(
+        "http_request_duration_seconds",
+        "HTTP request latency until the response is fully sent",
+        ("method", "route", "status"),
+    )
+)
+http_in_flight = registry.register(
+    GaugeVec("http_requests_in_flight", "HTTP requests being processed", ("method",))
+)
+
+
+class MetricsMiddleware:
+    """
+    Латентность и in-flight запросы по роутам. Метка route — шаблон пути
+    (/positions/{position_id}), а не сам путь, чтобы не раздувать число серий.
+
+    Гистограмма серии ищется по (route, method, status) во вложенных dict'ах и
+    кэшируется: на горячем пути нет сборки кортежа меток и str(status).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._series: dict[str, dict[str, dict[int, Histogram]]] = {}
+        self._in_flight_keys: dict[str, Labels] = {}
+
+    def _histogram(self, route: str, method: str, status: int) -> Histogram:
+        histogram = http_duration.labels(method, route, str(status))
+        self._series.setdefault(route, {}).setdefault(method, {})[status] = histogram
+        return histogram
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = http_in_flight.values
+        key = self._in_flight_keys.get(method)
+        if key is None:
+            key = self._in_flight_keys[method] = (method,)
+        in_flight[key] = in_flight.get(key, 0.0) + 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight[key] -= 1
+            route = scope.get("route")
+            path = route.path if route is not None else "<unmatched>"
+            try:
+                histogram = self._series[path][method][status]
+            except KeyError:
+                histogram = self._histogram(path, method, status)
+            histogram.observe(elapsed)
+
+
+http_db_statements = registry.register(
+    HistogramVec(
+        "http_request_db_statements",
+        "SQL statements executed per HTTP request",
+        ("route",),
+        buckets=(1, 2, 5, 10, 20, 50, 100, 500),
+    )
+)
+http_over_budget = registry.register(
+    CounterVec(
+        "http_requests_over_db_budget_total",
+        "HTTP requests that exceeded the per-request DB query budget",
+        ("route",),
+    )
+)
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-statement'ы и время БД на запрос (через QueryTracker на engine).
+    Запросы сверх бюджета и с повторяющимся SQL (похоже на N+1) пишутся в лог.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        max_queries: int,
+        max_duration: float,
+        repeat_threshold: int,
+    ):
+        self.app = app
+        self.max_queries = max_queries
+        self.max_duration = max_duration
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_queries() as stats:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self._check(scope, stats)
+
+    def _check(self, scope: Scope, stats: QueryStats) -> None:
+        route = scope.get("route")
+        label = route.path if route is not None else "<unmatched>"
+        http_db_statements.observe(stats.count, label)
+
+        problems = []
+        if self.max_queries and stats.count > self.max_queries:
+            problems.append(f"{stats.count} queries > {self.max_queries}")
+        if self.max_duration and stats.duration > self.max_duration:
+            problems.append(f"{stats.duration * 1000:.1f} ms in DB > {self.max_duration * 1000:.0f} ms")
+        repeated = stats.repeated(self.repeat_threshold) if self.repeat_threshold else []
+        if repeated:
+            problems.append(f"possible N+1: {len(repeated)} statement(s) repeated")
+        if not problems:
+            return
+
+        http_over_budget.inc(label)
+        log.warning(
+            "DB budget exceeded for %s %s (%s):\n%s",
+            scope["method"],
+            label,
+            "; ".join(problems),
+            stats.describe(),
+        )
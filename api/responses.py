@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+
+
+def _default(value: Any) -> str:
+    # asyncpg отдаёт свой подкласс uuid.UUID, который orjson не сериализует сам
+    return str(value)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    Ответ для read-эндпоинтов: строки из БД кодируются orjson сразу в байты,
+    без повторной валидации через response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _utc(value: datetime) -> datetime:
+    # колонки timestamp без зоны: считаем, что timezone сервера БД — UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@dataclass(frozen=True, slots=True)
+class Validators:
+    """
+    Валидаторы conditional GET: weak ETag (тело совпадает по смыслу, не по байтам)
+    и Last-Modified с точностью до секунды.
+    """
+
+    etag: str
+    last_modified: datetime | None = None
+
+    @classmethod
+    def for_entity(cls, entity_id: Any, updated_at: datetime) -> "Validators":
+        updated_at = _utc(updated_at)
+        micros = int(updated_at.timestamp() * 1_000_000)
+        return cls(f'W/"{entity_id}-{micros:x}"', updated_at)
+
+    @classmethod
+    def for_collection(
+        cls, version: Any, last_modified: datetime | None, **params: Any
+    ) -> "Validators":
+        """
+        ETag — хэш версии выборки и параметров запроса (фильтры, limit, cursor).
+        last_modified передаётся, только если его двигает любое изменение выборки,
+        включая удаление; иначе None — If-Modified-Since для списка не учитывается.
+        """
+        if last_modified is not None:
+            last_modified = _utc(last_modified)
+        key = repr((version, sorted(params.items())))
+        digest = hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+        return cls(f'W/"{digest}"', last_modified)
+
+    def headers(self) -> dict[str, str]:
+        # no-cache: клиент и прокси хранят ответ, но перед использованием переспрашивают
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def not_modified(self, request: Request) -> bool:
+        """
+        If-None-Match (weak comparison), а без него — If-Modified-Since (RFC 9110, 13.2.2).
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            own = self.etag.removeprefix("W/")
+            return any(
+                tag.strip().removeprefix("W/") == own for tag in if_none_match.split(",")
+            )
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or self.last_modified is None:
+            return False
+        try:
+            since = _utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return self.last_modified.replace(microsecond=0) <= since
+
+    def not_modified_response(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
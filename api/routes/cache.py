@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from infrastructure.cache import entity_cache
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+
+@router.get("/stats")
+async def cache_stats():
+    if entity_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **entity_cache.stats()}
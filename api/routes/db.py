@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from infrastructure.db_helper import db_helper
+
+router = APIRouter(prefix="/db", tags=["db"])
+
+
+@router.get("/pool")
+async def pool_stats():
+    return db_helper.pool_stats()
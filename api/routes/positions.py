@@ -1,27 +1,262 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Any
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Literal
 
-from api.dependencies import get_positions_use_cases
-from api.schemas.positions import PositionRead, PositionCreate, PositionUpdate
+from api.dependencies import (
+    get_inventory_use_cases,
+    get_position_stats_use_cases,
+    get_positions_use_cases,
+    get_stock_ledger_use_cases,
+)
+from api.responses import FastJSONResponse, Validators
+from api.schemas.batch import BatchGetIds
+from api.schemas.positions import (
+    InventorySummary,
+    PositionBatch,
+    PositionChanges,
+    PositionCreate,
+    PositionPage,
+    PositionRead,
+    PositionStats,
+    PositionUpdate,
+    StockBalance,
+    StockBalances,
+    StockBalanceAt,
+    StockIssue,
+    StockLedgerEntry,
+    StockMovementBatch,
+    StockReceive,
+)
+from infrastructure.db_helper import settings
+from infrastructure.events import Subscription
+from infrastructure.orm.metadata_providers.positionsMetadataProvider import (
+    STOCK_INSUFFICIENT,
+    STOCK_NOT_FOUND,
+)
+from use_cases.inventory import InventoryUseCases
 from use_cases.position import PositionsUseCases
+from use_cases.position_stats import PositionStatsUseCases
+from use_cases.stock_ledger import StockLedgerUseCases
 from uuid import UUID
 router = APIRouter(prefix="/positions", tags=["positions"])
 
 
-@router.get("", response_model=list[PositionRead])
-async def list_positions(uc: PositionsUseCases = Depends(get_positions_use_cases)):
-    items = await uc.list_positions()
-    return [x.to_dict() for x in items]
+@router.get("", response_model=PositionPage)
+async def list_positions(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    category: str | None = None,
+    sub_category: str | None = None,
+    provider_id: UUID | None = None,
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    # версия списка дешевле страницы: при совпадении ETag страницу не читаем вовсе
+    version = await uc.positions_version()
+    validators = None
+    if version is not None:
+        validators = Validators.for_collection(
+            *version,
+            limit=limit,
+            cursor=cursor,
+            category=category,
+            sub_category=sub_category,
+            provider_id=provider_id,
+        )
+        if validators.not_modified(request):
+            return validators.not_modified_response()
+
+    try:
+        items, next_cursor = await uc.list_positions_page(
+            limit=limit,
+            cursor=cursor,
+            category=category,
+            sub_category=sub_category,
+            provider_id=provider_id,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # строки уже в форме PositionRead — отдаём байты напрямую, без второго прохода Pydantic
+    return FastJSONResponse(
+        {"items": items, "next_cursor": next_cursor},
+        headers=validators.headers() if validators is not None else None,
+    )
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def _ndjson_chunks(chunks: AsyncIterator[list[dict[str, Any]]]) -> AsyncIterator[str]:
+    async for rows in chunks:
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+
+async def _csv_chunks(chunks: AsyncIterator[list[dict[str, Any]]]) -> AsyncIterator[str]:
+    header_sent = False
+    async for rows in chunks:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if not header_sent:
+            writer.writerow(rows[0].keys())
+            header_sent = True
+        writer.writerows(
+            [_json_default(v) if v is not None else "" for v in row.values()] for row in rows
+        )
+        yield buf.getvalue()
+
+
+@router.get("/export")
+async def export_positions(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    chunk_size: int = Query(1000, ge=1, le=10000),
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    chunks = uc.export_positions(chunk_size=chunk_size)
+    if format == "csv":
+        return StreamingResponse(
+            _csv_chunks(chunks),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="positions.csv"'},
+        )
+    return StreamingResponse(_ndjson_chunks(chunks), media_type="application/x-ndjson")
+
+
+@router.get("/changes", response_model=PositionChanges)
+async def list_position_changes(
+    since: str | None = None,
+    limit: int = Query(500, ge=1, le=5000),
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    # без since — вся таблица с начала; дальше клиент ходит с next_cursor
+    try:
+        changes, next_cursor, has_more = await uc.list_changes(
+            since=since, limit=limit, settle_seconds=settings.CHANGES_SETTLE_SECONDS
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return FastJSONResponse(
+        {
+            "changes": [
+                {"op": op, "id": payload["id"], "item": payload}
+                if op == "upsert"
+                else {"op": op, "id": payload, "item": None}
+                for op, payload in changes
+            ],
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }
+    )
+
+
+@router.get("/stats", response_model=list[PositionStats])
+async def get_position_stats(
+    category: str | None = None,
+    sub_category: str | None = None,
+    name: str | None = None,
+    uc: PositionStatsUseCases = Depends(get_position_stats_use_cases),
+):
+    # уровень задаётся префиксом ключа: category [+ sub_category [+ name]] или только name
+    if category is None and (name is None or sub_category is not None):
+        raise HTTPException(status_code=400, detail="Pass category or name")
+    if category is not None and name is not None and sub_category is None:
+        raise HTTPException(status_code=400, detail="name with category requires sub_category")
+    items = await uc.get_stats(category=category, sub_category=sub_category, name=name)
+    if items is None:
+        raise HTTPException(status_code=400, detail="Failed to get position stats")
+    return FastJSONResponse(items)
+
+
+@router.get("/summary", response_model=InventorySummary)
+async def get_inventory_summary(
+    group_by: Literal["category", "sub_category", "provider"] = "category",
+    category: str | None = None,
+    sub_category: str | None = None,
+    provider_id: UUID | None = None,
+    uc: InventoryUseCases = Depends(get_inventory_use_cases),
+):
+    # сводка из materialized view: данные на refreshed_at, не на момент запроса
+    result = await uc.get_summary(
+        group_by, category=category, sub_category=sub_category, provider_id=provider_id
+    )
+    if result is None:
+        raise HTTPException(status_code=400, detail="Failed to get inventory summary")
+    items, refreshed_at = result
+    return FastJSONResponse({"group_by": group_by, "refreshed_at": refreshed_at, "items": items})
+
+
+@router.get("/low-stock", response_model=PositionPage)
+async def list_low_stock(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    category: str | None = None,
+    provider_id: UUID | None = None,
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    try:
+        items, next_cursor = await uc.list_low_stock_page(
+            limit=limit, cursor=cursor, category=category, provider_id=provider_id
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+async def _sse_events(subscription: Subscription, heartbeat: float) -> AsyncIterator[str]:
+    with subscription:
+        # клиент переподключается через 3 с и перечитывает /positions/low-stock
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), heartbeat)
+            except TimeoutError:
+                # комментарий SSE: держит соединение через прокси и выявляет отвалившихся клиентов
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                return
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get("/low-stock/events")
+async def low_stock_events(uc: PositionsUseCases = Depends(get_positions_use_cases)):
+    """
+    SSE: событие low — позиция ушла ниже min_balance, restored — вернулась к нему.
+    Поток закрывается, если клиент не успевает читать: переподключиться и перечитать список.
+    """
+    try:
+        subscription = await uc.subscribe_low_stock()
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="Event stream unavailable")
+    return StreamingResponse(
+        _sse_events(subscription, settings.SSE_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{position_id}", response_model=PositionRead)
-async def get_position(position_id: UUID, uc: PositionsUseCases = Depends(get_positions_use_cases)):
+async def get_position(
+    position_id: UUID,
+    request: Request,
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
     item = await uc.get_position(position_id)
     if item is None:
         raise HTTPException(status_code=404, detail="Position not found")
-    return item.to_dict()
+    validators = Validators.for_entity(item["id"], item.pop("updated_at"))
+    if validators.not_modified(request):
+        return validators.not_modified_response()
+    return FastJSONResponse(item, headers=validators.headers())
 
 
 @router.post("", response_model=PositionRead, status_code=201)
@@ -35,19 +270,54 @@ async def create_position(body: PositionCreate, uc: PositionsUseCases = Depends(
 @router.post("/bulk", status_code=200)
 async def create_positions_bulk(
     bodies: list[PositionCreate],
+    mode: Literal["insert", "upsert"] = "insert",
     uc: PositionsUseCases = Depends(get_positions_use_cases),
 ):
     payload = [b.model_dump() for b in bodies]
-    result = await uc.create_many(payload)
-    if result is None:
-        raise HTTPException(status_code=400, detail="Bulk insert failed")
-    ok, failed = result
+    if mode == "upsert":
+        # по (provider_id, category, sub_category, name); null в balance/min_balance/
+        # provider_manager_id — оставить как есть
+        counts, failed = await uc.upsert_many(payload)
+        return {
+            **counts,
+            "failed": [{"item": it, "error": err} for it, err in failed],
+        }
+    ok, failed = await uc.create_many(payload)
     return {
-        "ok": [x.to_dict() for x in ok],
+        "ok": ok,
         "failed": [{"item": it, "error": err} for it, err in failed],
     }
 
 
+@router.post("/import", status_code=200)
+async def import_positions(
+    request: Request,
+    format: Literal["csv", "tsv"] = "csv",
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    # тело запроса — сам файл (text/csv), читаем его потоком, без буферизации целиком
+    delimiter = "\t" if format == "tsv" else ","
+    try:
+        summary = await uc.import_positions(request.stream(), delimiter=delimiter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if summary is None:
+        raise HTTPException(status_code=400, detail="Import failed")
+    return summary
+
+
+@router.patch("/bulk", status_code=200)
+async def update_positions_bulk(
+    ids_data: dict[str, dict[str, Any]],
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    updated, failed = await uc.update_many(ids_data)
+    return {
+        "updated": updated,
+        "failed": [{"id": pid, "error": err} for pid, err in failed],
+    }
+
+
 @router.patch("/{position_id}", response_model=PositionRead)
 async def update_position(
     position_id: str,
@@ -61,16 +331,79 @@ async def update_position(
     return item.to_dict()
 
 
-@router.patch("/bulk", status_code=200)
-async def update_positions_bulk(
-    ids_data: dict[str, dict[str, Any]],
+def _stock_response(position_id: UUID, balance: int | None, error: str | None) -> dict[str, Any]:
+    if error == STOCK_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Position not found")
+    if error == STOCK_INSUFFICIENT:
+        raise HTTPException(status_code=409, detail="Insufficient stock")
+    if error is not None:
+        raise HTTPException(status_code=400, detail="Stock movement failed")
+    return {"id": position_id, "balance": balance}
+
+
+@router.post("/stock-movements", response_model=StockBalances)
+async def move_stock(
+    body: StockMovementBatch,
     uc: PositionsUseCases = Depends(get_positions_use_cases),
 ):
-    updated, failed = await uc.update_many(ids_data)
-    return {
-        "updated": [x.to_dict() for x in updated],
-        "failed": [{"id": pid, "error": err} for pid, err in failed],
-    }
+    # всё или ничего: при отказе 409 и список причин, остатки не меняются
+    result = await uc.move_stock_many(
+        [(m.position_id, m.delta) for m in body.movements],
+        allow_negative=body.allow_negative,
+    )
+    if result is None:
+        raise HTTPException(status_code=400, detail="Stock movement failed")
+    balances, failed = result
+    if failed or not balances:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Stock movement refused",
+                "failed": [{"id": str(pid), "error": err} for pid, err in failed],
+            },
+        )
+    return {"balances": [{"id": pid, "balance": b} for pid, b in balances.items()]}
+
+
+@router.post("/{position_id}/stock/receive", response_model=StockBalance)
+async def receive_stock(
+    position_id: UUID,
+    body: StockReceive,
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    balance, error = await uc.receive_stock(position_id, body.quantity)
+    return _stock_response(position_id, balance, error)
+
+
+@router.post("/{position_id}/stock/issue", response_model=StockBalance)
+async def issue_stock(
+    position_id: UUID,
+    body: StockIssue,
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    balance, error = await uc.issue_stock(
+        position_id, body.quantity, allow_negative=body.allow_negative
+    )
+    return _stock_response(position_id, balance, error)
+
+
+@router.get("/{position_id}/stock/movements", response_model=list[StockLedgerEntry])
+async def list_stock_movements(
+    position_id: UUID,
+    limit: int = Query(100, ge=1, le=1000),
+    uc: StockLedgerUseCases = Depends(get_stock_ledger_use_cases),
+):
+    return FastJSONResponse(await uc.list_movements(position_id, limit=limit))
+
+
+@router.get("/{position_id}/stock/balance", response_model=StockBalanceAt)
+async def get_stock_balance_at(
+    position_id: UUID,
+    at: datetime,
+    uc: StockLedgerUseCases = Depends(get_stock_ledger_use_cases),
+):
+    balance, as_of = await uc.balance_at(position_id, at)
+    return {"id": position_id, "at": at, "balance": balance, "as_of": as_of}
 
 
 @router.delete("/{position_id}", status_code=204)
@@ -81,7 +414,26 @@ async def delete_position(position_id: str, uc: PositionsUseCases = Depends(get_
     return None
 
 
+@router.post("/batch-get", response_model=PositionBatch)
+async def batch_get_positions(
+    ids: BatchGetIds,
+    uc: PositionsUseCases = Depends(get_positions_use_cases),
+):
+    items = await uc.get_positions(ids)
+    if items is None:
+        raise HTTPException(status_code=400, detail="Batch get failed")
+    for item in items:
+        if item is not None:
+            # повторный id в запросе — тот же словарь
+            item.pop("updated_at", None)
+    not_found = [pid for pid, item in zip(ids, items) if item is None]
+    return FastJSONResponse({"items": items, "not_found_ids": not_found})
+
+
 @router.post("/delete-bulk", status_code=200)
 async def delete_positions_bulk(ids: list[str], uc: PositionsUseCases = Depends(get_positions_use_cases)):
-    await uc.delete_many(ids)
-    return {"deleted_ids": ids}
+    result = await uc.delete_many(ids)
+    if result is None:
+        raise HTTPException(status_code=400, detail="Bulk delete failed")
+    deleted, not_found = result
+    return {"deleted_ids": deleted, "not_found_ids": not_found}
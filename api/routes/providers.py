@@ -1,29 +1,63 @@
 from __future__ import annotations
 
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.exc import IntegrityError
 
 from api.dependencies import get_provider_use_cases
+from api.responses import FastJSONResponse, Validators
 from api.schemas.provider_managers import ProviderManagerCreate
-from api.schemas.providers import ProviderRead, ProviderUpdate, ProviderCreate
+from api.schemas.batch import BatchGetIds
+from api.schemas.providers import ProviderBatch, ProviderRead, ProviderUpdate, ProviderCreate
 from use_cases.providers import ProviderUseCases
 
 router = APIRouter(prefix="/providers", tags=["providers"])
 
 
 @router.get("", response_model=list[ProviderRead])
-async def list_providers(uc: ProviderUseCases = Depends(get_provider_use_cases)):
+async def list_providers(
+    request: Request,
+    uc: ProviderUseCases = Depends(get_provider_use_cases),
+):
+    version = await uc.providers_version()
+    validators = Validators.for_collection(*version) if version is not None else None
+    if validators is not None and validators.not_modified(request):
+        return validators.not_modified_response()
     providers = await uc.list_providers()
-    return [p.to_dict() for p in providers]
+    return FastJSONResponse(
+        providers, headers=validators.headers() if validators is not None else None
+    )
+
+
+@router.post("/batch-get", response_model=ProviderBatch)
+async def batch_get_providers(
+    ids: BatchGetIds,
+    uc: ProviderUseCases = Depends(get_provider_use_cases),
+):
+    providers = await uc.get_providers(ids)
+    if providers is None:
+        raise HTTPException(status_code=400, detail="Batch get failed")
+    for p in providers:
+        if p is not None:
+            # повторный id в запросе — тот же словарь
+            p.pop("updated_at", None)
+    not_found = [pid for pid, p in zip(ids, providers) if p is None]
+    return FastJSONResponse({"items": providers, "not_found_ids": not_found})
 
 
 @router.get("/{provider_id}", response_model=ProviderRead)
-async def get_provider(provider_id: UUID, uc: ProviderUseCases = Depends(get_provider_use_cases)):
+async def get_provider(
+    provider_id: UUID,
+    request: Request,
+    uc: ProviderUseCases = Depends(get_provider_use_cases),
+):
     p = await uc.get_provider(provider_id)
     if not p:
         raise HTTPException(status_code=404, detail="Provider not found")
-    return p.to_dict()
+    validators = Validators.for_entity(p["id"], p.pop("updated_at"))
+    if validators.not_modified(request):
+        return validators.not_modified_response()
+    return FastJSONResponse(p, headers=validators.headers())
 
 
 @router.post("", response_model=ProviderRead, status_code=201)
@@ -4,7 +4,14 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from uuid import UUID
 from api.dependencies import get_manager_use_cases
-from api.schemas.provider_managers import ProviderManagerRead, ProviderManagerCreate, ProviderManagerUpdate
+from api.responses import FastJSONResponse
+from api.schemas.batch import BatchGetIds
+from api.schemas.provider_managers import (
+    ProviderManagerBatch,
+    ProviderManagerCreate,
+    ProviderManagerRead,
+    ProviderManagerUpdate,
+)
 from use_cases.provider_managers import ProviderManagerUseCases
 
 router = APIRouter(prefix="/managers", tags=["provider_managers"])
@@ -13,7 +20,19 @@ router = APIRouter(prefix="/managers", tags=["provider_managers"])
 @router.get("", response_model=list[ProviderManagerRead])
 async def list_managers(uc: ProviderManagerUseCases = Depends(get_manager_use_cases)):
     managers = await uc.list_managers()
-    return [m.to_dict() for m in managers]
+    return FastJSONResponse(managers)
+
+
+@router.post("/batch-get", response_model=ProviderManagerBatch)
+async def batch_get_managers(
+    ids: BatchGetIds,
+    uc: ProviderManagerUseCases = Depends(get_manager_use_cases),
+):
+    managers = await uc.get_managers(ids)
+    if managers is None:
+        raise HTTPException(status_code=400, detail="Batch get failed")
+    not_found = [mid for mid, m in zip(ids, managers) if m is None]
+    return FastJSONResponse({"items": managers, "not_found_ids": not_found})
 
 
 @router.get("/{manager_id}", response_model=ProviderManagerRead)
@@ -21,13 +40,13 @@ async def get_manager(manager_id: UUID, uc: ProviderManagerUseCases = Depends(ge
     m = await uc.get_manager(manager_id)
     if not m:
         raise HTTPException(status_code=404, detail="Manager not found")
-    return m.to_dict()
+    return FastJSONResponse(m)
 
 
 @router.get("/by-provider/{provider_id}", response_model=list[ProviderManagerRead])
 async def list_managers_by_provider(provider_id: UUID, uc: ProviderManagerUseCases = Depends(get_manager_use_cases)):
     managers = await uc.list_by_provider(provider_id)
-    return [m.to_dict() for m in managers]
+    return FastJSONResponse(managers)
 
 
 @router.post("", response_model=ProviderManagerRead, status_code=201)
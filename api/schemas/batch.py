@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import Body
+
+from infrastructure.orm.settings import Settings
+
+BATCH_GET_MAX_IDS = Settings().BATCH_GET_MAX_IDS
+
+# тело POST /.../batch-get: список id, порядок ответа совпадает с ним
+BatchGetIds = Annotated[list[UUID], Body(min_length=1, max_length=BATCH_GET_MAX_IDS)]
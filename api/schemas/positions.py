@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import Optional
+from datetime import datetime
+from typing import Literal, Optional
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class PositionCreate(BaseModel):
@@ -49,3 +50,105 @@ class PositionRead(BaseModel):
 
     provider_id: Optional[UUID] = None
     provider_manager_id: Optional[UUID] = None
+
+
+class PositionPage(BaseModel):
+    items: list[PositionRead]
+    next_cursor: Optional[str] = None
+
+
+class PositionBatch(BaseModel):
+    # в порядке запроса; null — id не найден (он же есть в not_found_ids)
+    items: list[Optional[PositionRead]]
+    not_found_ids: list[UUID]
+
+
+class PositionChange(BaseModel):
+    op: Literal["upsert", "delete"]
+    id: UUID
+    # для delete — null
+    item: Optional[PositionRead] = None
+
+
+class PositionChanges(BaseModel):
+    changes: list[PositionChange]
+    # передать как since в следующий запрос; без изменений — прежний курсор
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+
+class StockReceive(BaseModel):
+    quantity: int = Field(gt=0)
+
+
+class StockIssue(BaseModel):
+    quantity: int = Field(gt=0)
+    # разрешить уход остатка в минус (продажа под заказ)
+    allow_negative: bool = False
+
+
+class StockMovement(BaseModel):
+    position_id: UUID
+    # > 0 — приход, < 0 — расход
+    delta: int
+
+
+class StockMovementBatch(BaseModel):
+    movements: list[StockMovement] = Field(min_length=1, max_length=1000)
+    allow_negative: bool = False
+
+
+class StockBalance(BaseModel):
+    id: UUID
+    balance: int
+
+
+class StockBalances(BaseModel):
+    balances: list[StockBalance]
+
+
+class StockLedgerEntry(BaseModel):
+    id: int
+    delta: int
+    created_at: datetime
+
+
+class StockBalanceAt(BaseModel):
+    id: UUID
+    at: datetime
+    balance: int
+    # момент, на который balance точен: == at, раньше at (журнал свёрнут в снимок) или null
+    as_of: Optional[datetime] = None
+
+
+class PositionStats(BaseModel):
+    category: str
+    # "" — строка уровня категории / подкатегории
+    sub_category: str
+    name: str
+    positions_count: int
+    first_purchase_price: Optional[float] = None
+    last_purchase_price: Optional[float] = None
+    avg_purchase_price: Optional[float] = None
+    first_sale_price: Optional[float] = None
+    last_sale_price: Optional[float] = None
+    avg_sale_price: Optional[float] = None
+    updated_at: datetime
+
+
+class InventorySummaryItem(BaseModel):
+    # ключ уровня; колонки других уровней — null
+    category: Optional[str] = None
+    sub_category: Optional[str] = None
+    provider_id: Optional[UUID] = None
+    positions_count: int
+    total_balance: int
+    stock_value: float
+    potential_revenue: float
+
+
+class InventorySummary(BaseModel):
+    group_by: Literal["category", "sub_category", "provider"]
+    # момент, на который посчитана сводка (null — ещё не считалась)
+    refreshed_at: Optional[datetime] = None
+    items: list[InventorySummaryItem]
@@ -21,3 +21,9 @@ class ProviderManagerRead(BaseModel):
     provider_id: UUID
     telephones: str
     name: str
+
+
+class ProviderManagerBatch(BaseModel):
+    # в порядке запроса; null — id не найден (он же есть в not_found_ids)
+    items: list[Optional[ProviderManagerRead]]
+    not_found_ids: list[UUID]
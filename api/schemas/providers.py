@@ -22,3 +22,9 @@ class ProviderRead(BaseModel):
     name: str
     address: str
     description: str
+
+
+class ProviderBatch(BaseModel):
+    # в порядке запроса; null — id не найден (он же есть в not_found_ids)
+    items: list[Optional[ProviderRead]]
+    not_found_ids: list[UUID]
@@ -0,0 +1,136 @@
+"""
+Накладные расходы инструментирования (/metrics), чтобы держать его включённым в проде.
+
+sql:     before/after_cursor_execute на один statement (без БД, тот же QueryTracker
+         с наблюдателем метрик, что собирает main) — нс на statement
+request: пустой FastAPI-роут через ASGI без и с MetricsMiddleware — мкс на запрос
+middleware: MetricsMiddleware вокруг голого ASGI-приложения — собственная цена
+         middleware без шума роутинга FastAPI (стабильнее между прогонами)
+
+Запуск: python -m benchmarks.metrics_overhead --requests 20000 --statements 200000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from api.middleware import MetricsMiddleware
+from infrastructure.db_metrics import observe_statement
+from infrastructure.query_tracker import QueryTracker
+
+_STATEMENT = (
+    "SELECT positions.id, positions.category, positions.name FROM positions "
+    "WHERE positions.id = $1::UUID"
+)
+
+
+def bench_sql(n: int, repeat: int) -> float:
+    cursor = SimpleNamespace(rowcount=1)
+    context = SimpleNamespace()
+    tracker = QueryTracker(slow_query=0)
+    tracker.add_observer(observe_statement)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(n):
+            tracker._before_cursor_execute(None, cursor, _STATEMENT, (), context, False)
+            tracker._after_cursor_execute(None, cursor, _STATEMENT, (), context, False)
+        best = min(best, time.perf_counter() - started)
+    per_statement = best / n * 1e9
+    print(f"sql      {per_statement:10.0f} ns/statement")
+    return per_statement
+
+
+def _make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/positions/{position_id}")
+    async def get_position(position_id: str):
+        return PlainTextResponse(position_id)
+
+    return app
+
+
+async def _run_requests(app, n: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/positions/42",
+        "raw_path": b"/positions/42",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("test", 80),
+        "client": ("test", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - started
+
+
+async def _raw_app(scope, receive, send):
+    scope["route"] = _RAW_ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+_RAW_ROUTE = SimpleNamespace(path="/positions/{position_id}")
+
+
+def bench_middleware(n: int, repeat: int) -> float:
+    results = {}
+    for name, app in (("raw", _raw_app), ("raw+mw", MetricsMiddleware(_raw_app))):
+        best = min(asyncio.run(_run_requests(app, n)) for _ in range(repeat))
+        results[name] = best / n * 1e6
+    overhead = results["raw+mw"] - results["raw"]
+    print(f"mw       {overhead:10.2f} us/request")
+    return overhead
+
+
+def bench_request(n: int, repeat: int) -> tuple[float, float]:
+    bare = _make_app()
+    instrumented = MetricsMiddleware(_make_app())
+    # прогрев: сборка middleware stack, кэши роутинга
+    asyncio.run(_run_requests(bare, 100))
+    asyncio.run(_run_requests(instrumented, 100))
+
+    results = {}
+    for name, app in (("bare", bare), ("metrics", instrumented)):
+        best = min(asyncio.run(_run_requests(app, n)) for _ in range(repeat))
+        results[name] = best / n * 1e6
+        print(f"{name:<8} {results[name]:10.1f} us/request")
+    overhead = results["metrics"] - results["bare"]
+    print(f"overhead {overhead:10.1f} us/request ({overhead / results['bare']:.1%})")
+    return results["bare"], results["metrics"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--statements", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bench_sql(args.statements, args.repeat)
+    bench_middleware(args.requests * 10, args.repeat)
+    bench_request(args.requests, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Детерминированное наполнение БД для бенчмарков: поставщики, по менеджеру на поставщика
+и N позиций (COPY, чтобы 1M строк грузился за секунды, а не минуты).
+
+Запуск отдельно: python -m benchmarks.seed --positions 100000 --recreate
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import text
+
+from infrastructure.db_helper import DatabaseHelper, db_helper
+
+_PROVIDER_COLUMNS = ("id", "name", "address", "description")
+_MANAGER_COLUMNS = ("id", "provider_id", "telephones", "name")
+_POSITION_COLUMNS = (
+    "id",
+    "category",
+    "sub_category",
+    "name",
+    "description",
+    "balance",
+    "min_balance",
+    "purchase_price",
+    "sale_price",
+    "markup",
+    "provider_id",
+    "provider_manager_id",
+)
+
+CATEGORIES = 50
+SUB_CATEGORIES = 500
+# сколько id каждого вида держать под рукой для точечных запросов
+_SAMPLE = 10_000
+
+
+@dataclass
+class SeedInfo:
+    positions: int
+    provider_ids: list[uuid.UUID]
+    manager_ids: list[uuid.UUID]
+    # случайная выборка id позиций (не все — для 1M это лишняя память)
+    position_ids: list[uuid.UUID]
+
+
+def _uuid(rnd: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rnd.getrandbits(128), version=4)
+
+
+async def seed(
+    db: DatabaseHelper,
+    positions: int,
+    *,
+    seed: int = 42,
+    batch_size: int = 50_000,
+) -> SeedInfo:
+    """
+    Пересоздаёт схему и заливает данные. Один и тот же seed -> одни и те же строки.
+    """
+    rnd = random.Random(seed)
+    providers_count = max(10, positions // 100)
+
+    providers = [
+        (_uuid(rnd), f"provider-{i}", f"address-{i}", "benchmark provider")
+        for i in range(providers_count)
+    ]
+    managers = [(_uuid(rnd), p[0], f"+7900{i:07d}", f"manager-{i}") for i, p in enumerate(providers)]
+
+    await db.recreate_all()
+    sample: list[uuid.UUID] = []
+    async with db.engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.copy_records_to_table("providers", records=providers, columns=_PROVIDER_COLUMNS)
+        await raw.copy_records_to_table("provider_manager", records=managers, columns=_MANAGER_COLUMNS)
+
+        for start in range(0, positions, batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, positions)):
+                k = rnd.randrange(providers_count)
+                purchase = round(rnd.uniform(10, 1000), 2)
+                markup = round(rnd.uniform(5, 80), 2)
+                row = (
+                    _uuid(rnd),
+                    f"category-{i % CATEGORIES}",
+                    f"sub-{i % SUB_CATEGORIES}",
+                    f"position-{i}",
+                    "benchmark position",
+                    rnd.randrange(0, 1000),
+                    10,
+                    purchase,
+                    round(purchase * (1 + markup / 100), 2),
+                    markup,
+                    providers[k][0],
+                    managers[k][0],
+                )
+                batch.append(row)
+                # резервуарная выборка: равномерно по всей таблице, не больше _SAMPLE id
+                if i < _SAMPLE:
+                    sample.append(row[0])
+                else:
+                    j = rnd.randrange(i + 1)
+                    if j < _SAMPLE:
+                        sample[j] = row[0]
+            await raw.copy_records_to_table("positions", records=batch, columns=_POSITION_COLUMNS)
+
+        await conn.commit()
+        await conn.execute(text("ANALYZE"))
+        await conn.commit()
+
+    return SeedInfo(
+        positions=positions,
+        provider_ids=[p[0] for p in providers],
+        manager_ids=[m[0] for m in managers],
+        position_ids=sample,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--recreate", action="store_true", help="подтверждение: схема БД будет пересоздана")
+    args = parser.parse_args()
+    if not args.recreate:
+        parser.error("seed drops all tables; pass --recreate to confirm")
+
+    async def run() -> None:
+        started = time.perf_counter()
+        info = await seed(db_helper, args.positions, seed=args.seed)
+        await db_helper.dispose()
+        print(
+            f"seeded {info.positions} positions, {len(info.provider_ids)} providers "
+            f"in {time.perf_counter() - started:.1f} s"
+        )
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
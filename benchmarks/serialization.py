@@ -0,0 +1,95 @@
+"""
+Бенчмарк сериализации ответа GET /positions: rows/sec до и после.
+
+before: ORM-объекты -> to_dict() через inspect(self).mapper на каждую строку
+        -> валидация response_model (list[PositionRead]) -> jsonable-дамп -> json.dumps
+after:  строки-словари (как из result.mappings()) -> FastJSONResponse (orjson)
+
+Запуск: python -m benchmarks.serialization --rows 100000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable
+
+from pydantic import TypeAdapter
+from sqlalchemy import inspect
+
+from api.responses import FastJSONResponse
+from api.schemas.positions import PositionRead
+from infrastructure.orm.models import PositionsModel
+
+
+def _make_rows(n: int) -> list[dict[str, Any]]:
+    now = datetime.now()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "category": f"category-{i % 50}",
+            "sub_category": f"sub-{i % 500}",
+            "name": f"position-{i}",
+            "description": "some description",
+            "balance": i % 1000,
+            "min_balance": 10,
+            "purchase_price": 100.5,
+            "sale_price": 150.25,
+            "markup": 49.75,
+            "provider_id": uuid.uuid4(),
+            "provider_manager_id": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def _legacy_to_dict(obj: PositionsModel) -> dict[str, Any]:
+    mapper = inspect(obj).mapper
+    return {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+
+
+def before(objs: list[PositionsModel]) -> bytes:
+    adapter = TypeAdapter(list[PositionRead])
+    validated = adapter.validate_python([_legacy_to_dict(o) for o in objs])
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode("utf-8")
+
+
+def after(rows: list[dict[str, Any]]) -> bytes:
+    return FastJSONResponse(rows).body
+
+
+def _measure(name: str, fn: Callable[[Any], bytes], arg: Any, n: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - started)
+    rate = n / best
+    print(f"{name:<8} {best * 1000:10.1f} ms  {rate:14,.0f} rows/sec")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = _make_rows(args.rows)
+    objs = [PositionsModel(**row) for row in rows]
+    # read path отдаёт только колонки PositionRead
+    read_keys = set(PositionRead.model_fields)
+    read_rows = [{k: v for k, v in row.items() if k in read_keys} for row in rows]
+
+    print(f"rows = {args.rows}")
+    slow = _measure("before", before, objs, args.rows, args.repeat)
+    fast = _measure("after", after, read_rows, args.rows, args.repeat)
+    print(f"speedup  x{fast / slow:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,675 @@
+"""
+Нагрузочный и микро-бенчмарк против локального Postgres (БД из Settings / DB_*).
+
+Для каждого размера (по умолчанию 10k, 100k, 1M позиций):
+  1. seed — пересоздаёт схему и заливает детерминированные данные (benchmarks.seed);
+  2. provider — каждый метод *MetadataProvider напрямую, последовательно;
+  3. http — каждый роут api/routes/* через in-process ASGI-клиент с concurrency.
+
+По каждому сценарию: throughput (ops/s), p50/p95/p99 (мс), ошибки, peak RSS процесса.
+Результат пишется в JSON (--out); --compare печатает разницу с прошлым прогоном.
+
+Запуск: python -m benchmarks.suite --sizes 10000 100000 --recreate --out benchmarks/baseline.json
+ВНИМАНИЕ: схема БД пересоздаётся на каждом размере.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import count
+from typing import Any, Awaitable, Callable
+
+# бенчмарк не должен мерить запись логов и предупреждения бюджета запросов
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import httpx  # noqa: E402
+import sqlalchemy  # noqa: E402
+
+from benchmarks.seed import CATEGORIES, SUB_CATEGORIES, SeedInfo, seed  # noqa: E402
+from infrastructure.cache import EntityCache, LRUTTLCache, entity_cache  # noqa: E402
+from infrastructure.db_helper import db_helper, settings  # noqa: E402
+from infrastructure.orm.metadata_providers.positionsMetadataProvider import PositionsMetadataProvider  # noqa: E402
+from infrastructure.orm.metadata_providers.providerManagerMetadataProvider import ProviderManagerMetadataProvider  # noqa: E402
+from infrastructure.orm.metadata_providers.providersMetadataProvider import ProviderMetadataProvider  # noqa: E402
+from services.positions_import import STAGING_COLUMNS  # noqa: E402
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+# сценарии, которые читают всю таблицу, на больших размерах делают меньше итераций
+HEAVY_DIVISOR = 50
+
+
+@dataclass
+class Scenario:
+    group: str  # "provider" | "http"
+    name: str
+    run: Callable[[int], Awaitable[Any]]
+    heavy: bool = False
+    # не запускать, если позиций больше (например, get_all на 1M ORM-объектов)
+    max_size: int | None = None
+
+
+@dataclass
+class BenchState:
+    """Id, созданные одними сценариями и потребляемые другими (delete после insert)."""
+
+    info: SeedInfo
+    created_positions: list[uuid.UUID] = field(default_factory=list)
+    created_bulk: list[list[uuid.UUID]] = field(default_factory=list)
+    created_providers: list[uuid.UUID] = field(default_factory=list)
+    created_managers: list[uuid.UUID] = field(default_factory=list)
+    seq: count = field(default_factory=count)
+
+    def position_id(self, i: int) -> uuid.UUID:
+        ids = self.info.position_ids
+        return ids[(i * 7919) % len(ids)]
+
+    def provider_id(self, i: int) -> uuid.UUID:
+        ids = self.info.provider_ids
+        return ids[(i * 7919) % len(ids)]
+
+    def manager_id(self, i: int) -> uuid.UUID:
+        ids = self.info.manager_ids
+        return ids[(i * 7919) % len(ids)]
+
+
+def _position_payload(n: int, **extra: Any) -> dict[str, Any]:
+    return {
+        "category": f"category-{n % CATEGORIES}",
+        "sub_category": "bench",
+        "name": f"bench-{n}",
+        "description": "created by benchmark",
+        "balance": 10,
+        "min_balance": 1,
+        "purchase_price": 100.0,
+        "sale_price": 150.0,
+        "markup": 50.0,
+        **extra,
+    }
+
+
+def _import_records(n: int, rows: int) -> list[tuple]:
+    values = {
+        "description": "imported by benchmark",
+        "balance": 5,
+        "min_balance": 1,
+        "purchase_price": 10.0,
+        "sale_price": 12.0,
+        "markup": 20.0,
+        "provider_id": None,
+        "provider_manager_id": None,
+    }
+    return [
+        tuple(
+            {"line_no": i + 2, "category": "import", "sub_category": f"batch-{n}", "name": f"row-{i}", **values}[c]
+            for c in STAGING_COLUMNS
+        )
+        for i in range(rows)
+    ]
+
+
+async def _one(batch: list[tuple]):
+    yield batch
+
+
+# --------------------------------------------------------------------------- provider
+
+
+def provider_scenarios(state: BenchState) -> list[Scenario]:
+    positions = PositionsMetadataProvider(db=db_helper)
+    positions_cached = PositionsMetadataProvider(
+        db=db_helper, cache=EntityCache(LRUTTLCache(max_size=100_000, ttl=300))
+    )
+    providers = ProviderMetadataProvider(db=db_helper)
+    managers = ProviderManagerMetadataProvider(db=db_helper)
+
+    async def stream_all(i: int) -> int:
+        return sum([len(chunk) async for chunk in positions.stream_all(chunk_size=1000)])
+
+    async def insert(i: int):
+        obj = await positions.insert(_position_payload(next(state.seq)))
+        state.created_positions.append(obj.id)
+
+    async def insert_many(i: int):
+        ok, _ = await positions.insert_many([_position_payload(next(state.seq)) for _ in range(100)])
+        state.created_bulk.append([row["id"] for row in ok])
+
+    async def update_many(i: int):
+        ids = [state.position_id(i * 100 + k) for k in range(100)]
+        return await positions.update_many_by_id({pid: {"balance": i % 100} for pid in ids})
+
+    async def delete_by_id(i: int):
+        if state.created_positions:
+            return await positions.delete_by_id(state.created_positions.pop())
+
+    async def delete_many(i: int):
+        if state.created_bulk:
+            return await positions.delete_many(state.created_bulk.pop())
+
+    async def provider_insert(i: int):
+        n = next(state.seq)
+        obj = await providers.insert({"name": f"bench-{n}", "address": "a", "description": "d"})
+        state.created_providers.append(obj.id)
+
+    async def provider_delete(i: int):
+        if state.created_providers:
+            return await providers.delete_by_id(state.created_providers.pop())
+
+    async def manager_insert(i: int):
+        obj = await managers.insert({"provider_id": state.provider_id(i), "telephones": "1", "name": "bench"})
+        state.created_managers.append(obj.id)
+
+    async def manager_delete(i: int):
+        if state.created_managers:
+            return await managers.delete_by_id(state.created_managers.pop())
+
+    async def create_with_manager(i: int):
+        n = next(state.seq)
+        await providers.create_with_manager(
+            {"name": f"bench-{n}", "address": "a", "description": "d"},
+            {"telephones": "1", "name": "bench"},
+        )
+
+    return [
+        Scenario("provider", "positions.get_all", lambda i: positions.get_all(), heavy=True, max_size=100_000),
+        Scenario("provider", "positions.get_page", lambda i: positions.get_page(limit=50)),
+        Scenario(
+            "provider",
+            "positions.get_page[category]",
+            lambda i: positions.get_page(limit=50, category=f"category-{i % CATEGORIES}"),
+        ),
+        Scenario("provider", "positions.stream_all", stream_all, heavy=True),
+        Scenario("provider", "positions.get_by_id", lambda i: positions.get_by_id(state.position_id(i))),
+        Scenario(
+            "provider",
+            "positions.get_by_id[cached]",
+            lambda i: positions_cached.get_by_id(state.position_id(i % 100)),
+        ),
+        Scenario(
+            "provider",
+            "positions.get_many_by_ids[200]",
+            lambda i: positions.get_many_by_ids([state.position_id(i * 200 + k) for k in range(200)]),
+        ),
+        Scenario("provider", "positions.insert", insert),
+        Scenario("provider", "positions.insert_many[100]", insert_many),
+        Scenario(
+            "provider",
+            "positions.copy_import[1000]",
+            lambda i: positions.copy_import(_one(_import_records(next(state.seq), 1000))),
+        ),
+        Scenario(
+            "provider",
+            "positions.update_by_id",
+            lambda i: positions.update_by_id(state.position_id(i), {"balance": i % 100}),
+        ),
+        Scenario("provider", "positions.update_many_by_id[100]", update_many),
+        Scenario("provider", "positions.delete_by_id", delete_by_id),
+        Scenario("provider", "positions.delete_many[100]", delete_many),
+        Scenario("provider", "providers.get_all", lambda i: providers.get_all()),
+        Scenario("provider", "providers.get_by_id", lambda i: providers.get_by_id(state.provider_id(i))),
+        Scenario("provider", "providers.insert", provider_insert),
+        Scenario(
+            "provider",
+            "providers.update_by_id",
+            lambda i: providers.update_by_id(state.provider_id(i), {"address": f"address-{i}"}),
+        ),
+        Scenario("provider", "providers.create_with_manager", create_with_manager),
+        Scenario("provider", "providers.delete_by_id", provider_delete),
+        Scenario("provider", "managers.get_all", lambda i: managers.get_all()),
+        Scenario("provider", "managers.get_by_id", lambda i: managers.get_by_id(state.manager_id(i))),
+        Scenario(
+            "provider",
+            "managers.get_by_provider_id",
+            lambda i: managers.get_by_provider_id(state.provider_id(i)),
+        ),
+        Scenario("provider", "managers.insert", manager_insert),
+        Scenario(
+            "provider",
+            "managers.update_by_id",
+            lambda i: managers.update_by_id(state.manager_id(i), {"telephones": f"{i}"}),
+        ),
+        Scenario("provider", "managers.delete_by_id", manager_delete),
+    ]
+
+
+# --------------------------------------------------------------------------- http
+
+
+class HttpError(Exception):
+    pass
+
+
+def http_scenarios(state: BenchState, client: httpx.AsyncClient) -> list[Scenario]:
+    async def call(method: str, url: str, **kwargs: Any) -> httpx.Response:
+        r = await client.request(method, url, **kwargs)
+        if r.status_code >= 400:
+            raise HttpError(f"{method} {url} -> {r.status_code}")
+        return r
+
+    async def export(fmt: str):
+        async with client.stream("GET", f"/positions/export?format={fmt}") as r:
+            async for _ in r.aiter_raw():
+                pass
+            if r.status_code >= 400:
+                raise HttpError(f"export -> {r.status_code}")
+
+    async def create_position(i: int):
+        r = await call("POST", "/positions", json=_position_payload(next(state.seq)))
+        state.created_positions.append(r.json()["id"])
+
+    async def create_bulk(i: int):
+        r = await call("POST", "/positions/bulk", json=[_position_payload(next(state.seq)) for _ in range(100)])
+        state.created_bulk.append([row["id"] for row in r.json()["ok"]])
+
+    def upsert_bulk(price: Callable[[int], float]):
+        # один и тот же прайс-лист из 100 строк: первый вызов вставляет, дальше — update/unchanged
+        async def op(i: int):
+            rows = [
+                _position_payload(k, sub_category="upsert", name=f"upsert-{k}", purchase_price=price(i))
+                for k in range(100)
+            ]
+            await call("POST", "/positions/bulk?mode=upsert", json=rows)
+
+        return op
+
+    async def import_csv(i: int):
+        n = next(state.seq)
+        lines = ["category,sub_category,name,description,purchase_price,sale_price,markup"]
+        lines += [f"import,http-{n},row-{k},d,10,12,20" for k in range(1000)]
+        await call("POST", "/positions/import?format=csv", content="\n".join(lines).encode())
+
+    async def delete_position(i: int):
+        if state.created_positions:
+            await call("DELETE", f"/positions/{state.created_positions.pop()}")
+
+    async def delete_bulk(i: int):
+        if state.created_bulk:
+            await call("POST", "/positions/delete-bulk", json=[str(x) for x in state.created_bulk.pop()])
+
+    async def create_provider(i: int):
+        n = next(state.seq)
+        r = await call("POST", "/providers", json={"name": f"bench-{n}", "address": "a", "description": "d"})
+        state.created_providers.append(r.json()["id"])
+
+    async def delete_provider(i: int):
+        if state.created_providers:
+            await call("DELETE", f"/providers/{state.created_providers.pop()}")
+
+    async def create_manager(i: int):
+        r = await call(
+            "POST", "/managers", json={"provider_id": str(state.provider_id(i)), "telephones": "1", "name": "b"}
+        )
+        state.created_managers.append(r.json()["id"])
+
+    async def delete_manager(i: int):
+        if state.created_managers:
+            await call("DELETE", f"/managers/{state.created_managers.pop()}")
+
+    async def with_manager(i: int):
+        n = next(state.seq)
+        await call(
+            "POST",
+            "/providers/with-manager",
+            json={
+                "provider": {"name": f"bench-{n}", "address": "a", "description": "d"},
+                "manager": {"provider_id": str(state.provider_id(i)), "telephones": "1", "name": "b"},
+            },
+        )
+
+    def get(url: Callable[[int], str]) -> Callable[[int], Awaitable[Any]]:
+        return lambda i: call("GET", url(i))
+
+    etags: dict[str, str] = {}
+
+    def revalidate(url: Callable[[int], str]) -> Callable[[int], Awaitable[Any]]:
+        # клиент с кэшем: повторный GET с If-None-Match, в ответ обычно 304 без тела
+        async def run(i: int) -> None:
+            u = url(i)
+            headers = {"If-None-Match": etags[u]} if u in etags else {}
+            r = await call("GET", u, headers=headers)
+            if r.status_code == 200:
+                etags[u] = r.headers["ETag"]
+
+        return run
+
+    return [
+        Scenario("http", "GET /positions", get(lambda i: "/positions?limit=50")),
+        Scenario("http", "GET /positions?category", get(lambda i: f"/positions?limit=50&category=category-{i % CATEGORIES}")),
+        Scenario("http", "GET /positions/export?format=ndjson", lambda i: export("ndjson"), heavy=True),
+        Scenario("http", "GET /positions/export?format=csv", lambda i: export("csv"), heavy=True),
+        Scenario("http", "GET /positions/changes", get(lambda i: "/positions/changes?limit=500")),
+        Scenario("http", "GET /positions/{position_id}", get(lambda i: f"/positions/{state.position_id(i)}")),
+        Scenario("http", "GET /positions/low-stock", get(lambda i: "/positions/low-stock?limit=50")),
+        Scenario("http", "GET /positions/summary", get(lambda i: "/positions/summary?group_by=category")),
+        Scenario(
+            "http",
+            "GET /positions/stats",
+            get(lambda i: f"/positions/stats?category=category-{i % CATEGORIES}&sub_category=sub-{i % SUB_CATEGORIES}"),
+        ),
+        Scenario("http", "GET /positions?category[304]", revalidate(lambda i: f"/positions?limit=50&category=category-{i % CATEGORIES}")),
+        Scenario("http", "GET /positions/{position_id}[304]", revalidate(lambda i: f"/positions/{state.position_id(i % 100)}")),
+        Scenario("http", "POST /positions", create_position),
+        Scenario("http", "POST /positions/bulk", create_bulk),
+        Scenario("http", "POST /positions/bulk?mode=upsert[unchanged]", upsert_bulk(lambda i: 100.0)),
+        Scenario("http", "POST /positions/bulk?mode=upsert[updated]", upsert_bulk(lambda i: 100.0 + i)),
+        Scenario(
+            "http",
+            "POST /positions/batch-get",
+            lambda i: call("POST", "/positions/batch-get", json=[str(state.position_id(i * 200 + k)) for k in range(200)]),
+        ),
+        Scenario("http", "POST /positions/import", import_csv),
+        Scenario(
+            "http",
+            "PATCH /positions/{position_id}",
+            lambda i: call("PATCH", f"/positions/{state.position_id(i)}", json={"balance": i % 100}),
+        ),
+        Scenario(
+            "http",
+            "PATCH /positions/bulk",
+            lambda i: call(
+                "PATCH", "/positions/bulk", json={str(state.position_id(i * 100 + k)): {"balance": k} for k in range(100)}
+            ),
+        ),
+        # горячие SKU: все движения по 10 позициям, конкурируют за одни строки
+        Scenario(
+            "http",
+            "POST /positions/{position_id}/stock/receive",
+            lambda i: call("POST", f"/positions/{state.position_id(i % 10)}/stock/receive", json={"quantity": 2}),
+        ),
+        Scenario(
+            "http",
+            "POST /positions/{position_id}/stock/issue",
+            lambda i: call(
+                "POST",
+                f"/positions/{state.position_id(i % 10)}/stock/issue",
+                json={"quantity": 1, "allow_negative": True},
+            ),
+        ),
+        Scenario(
+            "http",
+            "POST /positions/stock-movements",
+            lambda i: call(
+                "POST",
+                "/positions/stock-movements",
+                json={
+                    "movements": [
+                        {"position_id": str(state.position_id((i + k) % 10)), "delta": 1 if k % 2 else -1}
+                        for k in range(10)
+                    ],
+                    "allow_negative": True,
+                },
+            ),
+        ),
+        Scenario(
+            "http",
+            "GET /positions/{position_id}/stock/movements",
+            get(lambda i: f"/positions/{state.position_id(i % 10)}/stock/movements?limit=100"),
+        ),
+        Scenario(
+            "http",
+            "GET /positions/{position_id}/stock/balance",
+            get(lambda i: f"/positions/{state.position_id(i)}/stock/balance?at=2100-01-01T00:00:00"),
+        ),
+        Scenario("http", "DELETE /positions/{position_id}", delete_position),
+        Scenario("http", "POST /positions/delete-bulk", delete_bulk),
+        Scenario("http", "GET /providers", get(lambda i: "/providers")),
+        Scenario("http", "GET /providers[304]", revalidate(lambda i: "/providers")),
+        Scenario("http", "GET /providers/{provider_id}", get(lambda i: f"/providers/{state.provider_id(i)}")),
+        Scenario("http", "POST /providers", create_provider),
+        Scenario(
+            "http",
+            "POST /providers/batch-get",
+            lambda i: call("POST", "/providers/batch-get", json=[str(state.provider_id(i * 50 + k)) for k in range(50)]),
+        ),
+        Scenario(
+            "http",
+            "PATCH /providers/{provider_id}",
+            lambda i: call("PATCH", f"/providers/{state.provider_id(i)}", json={"address": f"a-{i}"}),
+        ),
+        Scenario("http", "POST /providers/with-manager", with_manager),
+        Scenario("http", "DELETE /providers/{provider_id}", delete_provider),
+        Scenario("http", "GET /managers", get(lambda i: "/managers")),
+        Scenario("http", "GET /managers/{manager_id}", get(lambda i: f"/managers/{state.manager_id(i)}")),
+        Scenario(
+            "http",
+            "GET /managers/by-provider/{provider_id}",
+            get(lambda i: f"/managers/by-provider/{state.provider_id(i)}"),
+        ),
+        Scenario("http", "POST /managers", create_manager),
+        Scenario(
+            "http",
+            "POST /managers/batch-get",
+            lambda i: call("POST", "/managers/batch-get", json=[str(state.manager_id(i * 50 + k)) for k in range(50)]),
+        ),
+        Scenario(
+            "http",
+            "PATCH /managers/{manager_id}",
+            lambda i: call("PATCH", f"/managers/{state.manager_id(i)}", json={"telephones": f"{i}"}),
+        ),
+        Scenario("http", "DELETE /managers/{manager_id}", delete_manager),
+        Scenario("http", "GET /cache/stats", get(lambda i: "/cache/stats")),
+        Scenario("http", "GET /db/pool", get(lambda i: "/db/pool")),
+        Scenario("http", "GET /metrics", get(lambda i: "/metrics")),
+    ]
+
+
+# документация и бесконечные SSE-потоки (ASGI-клиент ждёт конца ответа целиком)
+_UNBENCHED_PATHS = (
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/docs/oauth2-redirect",
+    "/positions/low-stock/events",
+)
+
+
+def uncovered_routes(app, scenarios: list[Scenario]) -> list[str]:
+    """Роуты приложения без сценария — чтобы новый роут не выпал из бенчмарка молча."""
+    covered = {s.name.split("?")[0] for s in scenarios}
+    missing = []
+    for route in app.routes:
+        for method in sorted(getattr(route, "methods", None) or ()):
+            name = f"{method} {route.path}"
+            if method != "HEAD" and name not in covered and route.path not in _UNBENCHED_PATHS:
+                missing.append(name)
+    return missing
+
+
+# --------------------------------------------------------------------------- runner
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile по отсортированному списку."""
+    k = max(0, math.ceil(q / 100 * len(values)) - 1)
+    return values[k]
+
+
+def _rss_mb() -> dict[str, float | None]:
+    # ru_maxrss в Linux — КБ, в macOS — байты
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    current = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        pass
+    return {"rss_peak_mb": round(peak_mb, 1), "rss_mb": round(current, 1) if current is not None else None}
+
+
+async def run_scenario(scenario: Scenario, iterations: int, concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors: list[str] = []
+    counter = count()
+
+    async def worker() -> None:
+        while (i := next(counter)) < iterations:
+            started = time.perf_counter()
+            try:
+                await scenario.run(i)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}"[:200])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "group": scenario.group,
+        "name": scenario.name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput_ops": round(iterations / wall, 2) if wall else None,
+        "p50_ms": round(_percentile(ms, 50), 3),
+        "p95_ms": round(_percentile(ms, 95), 3),
+        "p99_ms": round(_percentile(ms, 99), 3),
+        "max_ms": round(ms[-1], 3),
+        **_rss_mb(),
+    }
+
+
+def _print_row(size: int, row: dict[str, Any]) -> None:
+    err = f"  errors={row['errors']} ({row['first_error']})" if row["errors"] else ""
+    print(
+        f"{size:>9} {row['group']:<8} {row['name']:<42} {row['throughput_ops']:>10.1f} ops/s "
+        f"p50={row['p50_ms']:>8.2f} p95={row['p95_ms']:>8.2f} p99={row['p99_ms']:>8.2f} ms "
+        f"rss={row['rss_peak_mb']:.0f}MB{err}"
+    )
+
+
+async def run_size(size: int, args: argparse.Namespace) -> list[dict[str, Any]]:
+    import main as app_module  # импорт после env: settings читаются при импорте
+
+    # ASGI-клиент не запускает lifespan — логирование настраиваем как при старте приложения
+    app_module.configure_logging()
+
+    started = time.perf_counter()
+    info = await seed(db_helper, size, seed=args.seed)
+    print(f"seeded {size} positions in {time.perf_counter() - started:.1f} s")
+    # сводку по складу штатно обновляет фоновая задача lifespan, ASGI-клиент её не запускает
+    await app_module.inventory_use_cases.refresh_summary()
+    if entity_cache is not None:
+        # после пересоздания схемы кэш прошлого размера недействителен
+        await entity_cache.backend.clear()
+
+    results = []
+    state = BenchState(info=info)
+    groups = set(args.groups)
+
+    if "provider" in groups:
+        for scenario in provider_scenarios(state):
+            results.append(await _run(size, scenario, args, concurrency=1))
+
+    if "http" in groups:
+        state = BenchState(info=info, seq=state.seq)
+        transport = httpx.ASGITransport(app=app_module.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            scenarios = http_scenarios(state, client)
+            for name in uncovered_routes(app_module.app, scenarios):
+                print(f"warning: no benchmark scenario for {name}")
+            for scenario in scenarios:
+                results.append(await _run(size, scenario, args, concurrency=args.concurrency))
+
+    for row in results:
+        row["size"] = size
+    return results
+
+
+async def _run(size: int, scenario: Scenario, args: argparse.Namespace, *, concurrency: int) -> dict[str, Any]:
+    if scenario.max_size is not None and size > scenario.max_size:
+        row = {"group": scenario.group, "name": scenario.name, "skipped": f"size > {scenario.max_size}"}
+        print(f"{size:>9} {scenario.group:<8} {scenario.name:<42} skipped ({row['skipped']})")
+        return row
+    iterations = max(3, args.iterations // HEAVY_DIVISOR) if scenario.heavy else args.iterations
+    row = await run_scenario(scenario, iterations, concurrency)
+    _print_row(size, row)
+    return row
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path: str, results: list[dict[str, Any]]) -> None:
+    with open(previous_path) as f:
+        previous = {(r["size"], r["group"], r["name"]): r for r in json.load(f)["results"] if "p95_ms" in r}
+    print(f"\ncompare with {previous_path} (throughput / p95, + = faster)")
+    for row in results:
+        old = previous.get((row["size"], row["group"], row["name"]))
+        if old is None or "p95_ms" not in row:
+            continue
+        d_tp = (row["throughput_ops"] / old["throughput_ops"] - 1) * 100 if old["throughput_ops"] else 0.0
+        d_p95 = (old["p95_ms"] / row["p95_ms"] - 1) * 100 if row["p95_ms"] else 0.0
+        print(f"{row['size']:>9} {row['group']:<8} {row['name']:<42} {d_tp:+7.1f}% {d_p95:+7.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--iterations", type=int, default=200)
+    # больше pool_size — и overflow-соединения открываются/закрываются на каждый запрос
+    parser.add_argument("--concurrency", type=int, default=settings.DB_POOL_SIZE)
+    parser.add_argument("--groups", nargs="+", choices=("provider", "http"), default=["provider", "http"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="benchmarks/baseline.json")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--recreate", action="store_true", help="подтверждение: схема БД будет пересоздана")
+    args = parser.parse_args()
+    if not args.recreate:
+        parser.error("suite drops all tables on every size; pass --recreate to confirm")
+
+    async def run() -> list[dict[str, Any]]:
+        results = []
+        try:
+            for size in args.sizes:
+                results.extend(await run_size(size, args))
+        finally:
+            await db_helper.dispose()
+        return results
+
+    results = asyncio.run(run())
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("recreate",)},
+            "db_pool": {
+                "size": settings.DB_POOL_SIZE,
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "pre_ping": settings.DB_POOL_PRE_PING,
+            },
+            "cache_enabled": settings.CACHE_ENABLED,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwritten {len(results)} results to {args.out}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Protocol
+
+from infrastructure.orm.settings import Settings
+
+
+class CacheBackend(Protocol):
+    """
+    Хранилище для EntityCache. Асинхронный интерфейс, чтобы вместо in-process LRU
+    можно было подставить общий для воркеров бэкенд (Redis и т.п.).
+    """
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any) -> None: ...
+
+    async def get_many(self, keys: list[str]) -> list[Any | None]: ...
+
+    async def set_many(self, items: dict[str, Any]) -> None: ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+    async def clear(self) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+
+@dataclass
+class LRUTTLCache:
+    """
+    In-process LRU с TTL: не больше max_size ключей, запись живёт ttl секунд.
+    """
+
+    max_size: int = 10_000
+    ttl: float = 30.0
+    _data: OrderedDict[str, tuple[float, Any]] = field(default_factory=OrderedDict)
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def get_many(self, keys: list[str]) -> list[Any | None]:
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: dict[str, Any]) -> None:
+        for key, value in items.items():
+            await self.set(key, value)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class EntityCache:
+    """
+    Read-through кэш get_by_id для metadata providers.
+    Ключ — "<namespace>:<id>", значение — строка-словарь сущности.
+    Промахи (None) не кэшируются. Инвалидация вызывается после commit записи.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        # растёт на каждой инвалидации: если за время загрузки из БД что-то
+        # инвалидировали, результат загрузки в кэш не кладём (он мог устареть)
+        self._generation = 0
+
+    @staticmethod
+    def _key(namespace: str, entity_id: Any) -> str:
+        return f"{namespace}:{entity_id}"
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        entity_id: Any,
+        loader: Callable[[], Awaitable[dict[str, Any] | None]],
+    ) -> dict[str, Any] | None:
+        key = self._key(namespace, entity_id)
+        value = await self.backend.get(key)
+        if value is not None:
+            return dict(value)
+
+        generation = self._generation
+        value = await loader()
+        if value is not None and generation == self._generation:
+            await self.backend.set(key, dict(value))
+        return value
+
+    async def get_many_or_load(
+        self,
+        namespace: str,
+        entity_ids: Iterable[Any],
+        loader: Callable[[list[Any]], Awaitable[dict[Any, dict[str, Any]]]],
+    ) -> dict[Any, dict[str, Any]]:
+        """
+        Пакетный read-through: из бэкенда одним get_many, промахи — одним вызовом loader
+        (id -> строка). Отсутствующих в БД id в результате нет.
+        """
+        entity_ids = list(dict.fromkeys(entity_ids))
+        keys = [self._key(namespace, i) for i in entity_ids]
+        found: dict[Any, dict[str, Any]] = {}
+        missing: list[Any] = []
+        for entity_id, value in zip(entity_ids, await self.backend.get_many(keys)):
+            if value is not None:
+                found[entity_id] = dict(value)
+            else:
+                missing.append(entity_id)
+        if not missing:
+            return found
+
+        generation = self._generation
+        loaded = await loader(missing)
+        if loaded and generation == self._generation:
+            await self.backend.set_many(
+                {self._key(namespace, i): dict(v) for i, v in loaded.items()}
+            )
+        found.update(loaded)
+        return found
+
+    async def invalidate(self, namespace: str, *entity_ids: Any) -> None:
+        if not entity_ids:
+            return
+        self._generation += 1
+        await self.backend.delete(*(self._key(namespace, i) for i in entity_ids))
+
+    def stats(self) -> dict[str, int]:
+        return self.backend.stats()
+
+
+def _build_entity_cache(settings: Settings) -> EntityCache | None:
+    if not settings.CACHE_ENABLED:
+        return None
+    return EntityCache(
+        LRUTTLCache(max_size=settings.CACHE_MAX_SIZE, ttl=settings.CACHE_TTL_SECONDS)
+    )
+
+
+entity_cache = _build_entity_cache(Settings())
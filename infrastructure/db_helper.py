@@ -1,28 +1,330 @@
 import asyncio
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator, AsyncIterator
+import time
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Literal
 
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    async_sessionmaker,
+    AsyncEngine,
+    AsyncSession,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from infrastructure.orm.models.base import Base
 from infrastructure.orm.settings import Settings
+from services.logger_setup import get_logger
+from services.metrics import Histogram
+
+log = get_logger(__name__)
+
+
+@dataclass
+class PoolMetrics:
+    checkout_wait: Histogram = field(default_factory=Histogram)
+    connect_latency: Histogram = field(default_factory=Histogram)
+    checkout_timeouts: int = 0
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул, который меряет ожидание checkout (включая pre-ping) и время
+    установки нового физического соединения.
+    """
+
+    metrics: PoolMetrics | None = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.checkout_timeouts += 1
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.checkout_wait.observe(time.perf_counter() - started)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            if self.metrics is not None:
+                self.metrics.connect_latency.observe(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() пересоздаёт пул — метрики переносим в новый
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+@dataclass
+class WriteTracker:
+    """
+    Время последней записи (time.time()) в текущем контексте запроса.
+    Пока не прошло read_your_writes секунд, read-only сессии идут в primary.
+    """
+
+    last_write: float | None = None
+
+
+_write_tracker: ContextVar[WriteTracker | None] = ContextVar("db_write_tracker", default=None)
+
+
+def current_write_tracker() -> WriteTracker:
+    tracker = _write_tracker.get()
+    if tracker is None:
+        tracker = WriteTracker()
+        _write_tracker.set(tracker)
+    return tracker
+
+
+def bind_write_tracker(tracker: WriteTracker) -> None:
+    _write_tracker.set(tracker)
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    metrics: PoolMetrics
+    # monotonic-время, до которого реплика считается недоступной
+    unhealthy_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.unhealthy_until <= time.monotonic()
+
+
+class UnitOfWork:
+    """
+    Одна сессия БД на запрос: создаётся лениво при первом db.session(),
+    все провайдеры внутри запроса работают в ней, commit/rollback — один раз в конце.
+    readonly=True -> сессия может быть открыта на реплике и никогда не коммитится.
+    """
+
+    def __init__(self, db: "DatabaseHelper", *, readonly: bool = False):
+        self.db = db
+        self.readonly = readonly
+        # были успешные записи, которые ещё не закоммичены
+        self.dirty = False
+        self._session: AsyncSession | None = None
+        self._stack = AsyncExitStack()
+        self._after_commit: list[Callable[[], Awaitable[Any]]] = []
+
+    async def _get_session(self) -> AsyncSession:
+        if self._session is None:
+            session = None
+            if self.readonly:
+                session = await self._stack.enter_async_context(self.db._replica_session())
+            if session is None:
+                session = await self._stack.enter_async_context(self.db.session_factory())
+            self._session = session
+        return self._session
+
+    @asynccontextmanager
+    async def scope(self, *, write: bool) -> AsyncIterator[AsyncSession]:
+        """
+        Один вызов db.session() внутри запроса. Ошибка откатывает только этот вызов:
+        если до него уже были записи — через SAVEPOINT, иначе терять нечего
+        и откатываем транзакцию целиком (без лишних round trip на SAVEPOINT).
+        """
+        session = await self._get_session()
+        if self.dirty:
+            async with session.begin_nested():
+                yield session
+            return
+        try:
+            yield session
+            if write:
+                # ошибки flush должны всплыть здесь, в провайдере, а не на commit в конце запроса
+                await session.flush()
+                self.dirty = True
+        except Exception:
+            await session.rollback()
+            raise
+
+    def after_commit(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        self._after_commit.append(callback)
+
+    async def commit(self) -> None:
+        if self._session is None or not self.dirty:
+            await self.rollback()
+            return
+        await self._session.commit()
+        self.dirty = False
+        current_write_tracker().last_write = time.time()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            await callback()
+
+    async def rollback(self) -> None:
+        self.dirty = False
+        self._after_commit.clear()
+        if self._session is not None and self._session.in_transaction():
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        self._session = None
+        await self._stack.aclose()
+
+
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar("db_unit_of_work", default=None)
+
+
+def _is_connection_error(e: Exception) -> bool:
+    if isinstance(e, DBAPIError):
+        return e.connection_invalidated or isinstance(e, (OperationalError, InterfaceError))
+    return isinstance(e, OSError)
+
+
+def _connect_args(statement_cache_size: int) -> dict[str, Any]:
+    """
+    Кэш prepared statements на соединение: SQLAlchemy-диалекта и самого asyncpg.
+    0 выключает оба, а имена statement'ов делает уникальными: за pgbouncer в режиме
+    transaction соседний запрос может попасть на другое серверное соединение,
+    и именованный statement asyncpg (__asyncpg_stmt_N__) там уже занят или не существует.
+    """
+    if statement_cache_size:
+        return {"prepared_statement_cache_size": statement_cache_size}
+    return {
+        "prepared_statement_cache_size": 0,
+        "statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
 
 
 class DatabaseHelper:
-    def __init__(self, db_url: str, db_echo: bool = False):
-        self.engine = create_async_engine(
-            url=db_url,
+    def __init__(
+        self,
+        db_url: str,
+        db_echo: bool = False,
+        *,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = 1800,
+        pool_pre_ping: bool = True,
+        statement_cache_size: int = 100,
+        replica_urls: list[str] | None = None,
+        replica_strategy: Literal["round_robin", "least_connections"] = "round_robin",
+        read_your_writes: float = 2.0,
+        replica_retry: float = 10.0,
+    ):
+        engine_kwargs = dict(
             echo=db_echo,
-            pool_pre_ping=True,  # Автоматическая проверка соединения
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            # pre-ping = лишний round trip на каждый checkout; с recycle его можно выключить
+            pool_pre_ping=pool_pre_ping,
+            connect_args=_connect_args(statement_cache_size),
         )
-        self.session_factory = async_sessionmaker(
-            bind=self.engine,
+        self.pool_metrics = PoolMetrics()
+        self.engine = self._create_engine(db_url, self.pool_metrics, engine_kwargs)
+        self.session_factory = self._create_session_factory(self.engine)
+
+        self.replicas: list[Replica] = []
+        for url in replica_urls or []:
+            metrics = PoolMetrics()
+            engine = self._create_engine(url, metrics, engine_kwargs)
+            self.replicas.append(
+                Replica(
+                    engine=engine,
+                    session_factory=self._create_session_factory(engine),
+                    metrics=metrics,
+                )
+            )
+        self.replica_strategy = replica_strategy
+        self.read_your_writes = read_your_writes
+        self.replica_retry = replica_retry
+        self._next_replica = 0
+
+    @staticmethod
+    def _create_engine(url: str, metrics: PoolMetrics, kwargs: dict[str, Any]) -> AsyncEngine:
+        engine = create_async_engine(url=url, **kwargs)
+        engine.pool.metrics = metrics
+        return engine
+
+    @staticmethod
+    def _create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+        return async_sessionmaker(
+            bind=engine,
             class_=AsyncSession,
             autoflush=False,
             expire_on_commit=False,
         )
 
+    def _pick_replica(self) -> Replica | None:
+        """
+        Реплика для read-only сессии или None (тогда читаем из primary):
+        нет здоровых реплик или в этом контексте недавно была запись.
+        """
+        if not self.replicas:
+            return None
+        tracker = _write_tracker.get()
+        if (
+            tracker is not None
+            and tracker.last_write is not None
+            and time.time() - tracker.last_write < self.read_your_writes
+        ):
+            return None
+
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        if self.replica_strategy == "least_connections":
+            return min(healthy, key=lambda r: r.engine.pool.checkedout())
+        self._next_replica = (self._next_replica + 1) % len(healthy)
+        return healthy[self._next_replica]
+
+    def _mark_unhealthy(self, replica: Replica, e: Exception) -> None:
+        replica.unhealthy_until = time.monotonic() + self.replica_retry
+        log.warning(
+            "Replica %s is unavailable, fallback to primary for %ss: %s",
+            replica.engine.url.render_as_string(hide_password=True),
+            self.replica_retry,
+            e,
+        )
+
+    @asynccontextmanager
+    async def _replica_session(self) -> AsyncIterator[AsyncSession | None]:
+        """
+        Сессия на реплике с уже взятым соединением, либо None,
+        если реплик нет/недоступны — тогда вызывающий идёт в primary.
+        """
+        replica = self._pick_replica()
+        if replica is None:
+            yield None
+            return
+        async with replica.session_factory() as session:
+            try:
+                await session.connection()
+            except Exception as e:
+                if not _is_connection_error(e):
+                    raise
+                self._mark_unhealthy(replica, e)
+                yield None
+                return
+            try:
+                yield session
+            except Exception as e:
+                if _is_connection_error(e):
+                    self._mark_unhealthy(replica, e)
+                await session.rollback()
+                raise
+
     async def session(self) -> AsyncGenerator[AsyncSession, Exception]:
         try:
             async with self.session_factory() as session:
@@ -34,17 +336,106 @@ class DatabaseHelper:
     async def session(self, *, commit: bool = True) -> AsyncIterator[AsyncSession]:
         """
         commit=True  -> commit на успешный выход, rollback на ошибку
-        commit=False -> только rollback на ошибку (удобно для readonly операций)
+        commit=False -> только rollback на ошибку (удобно для readonly операций);
+                        если настроены реплики, сессия открывается на реплике
         """
+        uow = _unit_of_work.get()
+        # запись из read-only запроса в общую (возможно, реплику) сессию не пускаем
+        if uow is not None and not (commit and uow.readonly):
+            async with uow.scope(write=commit) as session:
+                yield session
+            return
+
+        if not commit:
+            async with self._replica_session() as session:
+                if session is not None:
+                    yield session
+                    return
+
         async with self.session_factory() as session:
             try:
                 yield session
                 if commit:
                     await session.commit()
+                    current_write_tracker().last_write = time.time()
             except Exception:
                 await session.rollback()
                 raise
 
+    @asynccontextmanager
+    async def unit_of_work(self, *, readonly: bool = False) -> AsyncIterator[UnitOfWork]:
+        """
+        Область запроса: все db.session() внутри неё используют одну сессию.
+        Commit вызывает владелец (uow.commit()), без него на выходе будет rollback.
+        """
+        uow = UnitOfWork(self, readonly=readonly)
+        token = _unit_of_work.set(uow)
+        try:
+            yield uow
+        finally:
+            _unit_of_work.reset(token)
+            try:
+                await uow.rollback()
+            finally:
+                await uow.close()
+
+    async def after_commit(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Выполнить callback после commit: сразу, если сессия уже закоммичена,
+        или в конце запроса, если идёт unit of work (при rollback — не выполнится).
+        """
+        uow = _unit_of_work.get()
+        if uow is not None and uow.dirty:
+            uow.after_commit(callback)
+        else:
+            await callback()
+
+    def has_pending_writes(self) -> bool:
+        """В текущем unit of work есть незакоммиченные записи (кэш читать нельзя)."""
+        uow = _unit_of_work.get()
+        return uow is not None and uow.dirty
+
+    def pool_stats(self) -> dict[str, Any]:
+        """Текущее состояние пулов и накопленные метрики checkout/connect."""
+        stats = self._engine_stats(self.engine, self.pool_metrics)
+        stats["replicas"] = [
+            {
+                "url": r.engine.url.render_as_string(hide_password=True),
+                "healthy": r.healthy,
+                **self._engine_stats(r.engine, r.metrics),
+            }
+            for r in self.replicas
+        ]
+        return stats
+
+    @staticmethod
+    def _engine_stats(engine: AsyncEngine, metrics: PoolMetrics) -> dict[str, Any]:
+        pool = engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkout_timeouts": metrics.checkout_timeouts,
+            "checkout_wait_seconds": metrics.checkout_wait.snapshot(),
+            "connect_latency_seconds": metrics.connect_latency.snapshot(),
+        }
+
+    async def check_replicas(self) -> None:
+        """SELECT 1 на каждой реплике; недоступные исключаются на replica_retry секунд."""
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                replica.unhealthy_until = 0.0
+            except Exception as e:
+                self._mark_unhealthy(replica, e)
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
     async def health_check(self) -> bool:
         """Проверка доступности БД"""
         try:
@@ -70,6 +461,18 @@ class DatabaseHelper:
                 print("DB created all")
 
 
-url = Settings().database_url
-db_helper = DatabaseHelper(db_url=url)
+settings = Settings()
+db_helper = DatabaseHelper(
+    db_url=settings.database_url,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+    replica_urls=settings.replica_urls,
+    replica_strategy=settings.DB_REPLICA_STRATEGY,
+    read_your_writes=settings.DB_READ_YOUR_WRITES_SECONDS,
+    replica_retry=settings.DB_REPLICA_RETRY_SECONDS,
+)
 # asyncio.run(db_helper.recreate_all())
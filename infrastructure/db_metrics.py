@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from infrastructure.db_helper import DatabaseHelper
+from infrastructure.query_tracker import QueryTracker
+from services.metrics import (
+    ROW_BUCKETS,
+    CounterVec,
+    GaugeVec,
+    HistogramVec,
+    registry,
+)
+
+sql_duration = registry.register(
+    HistogramVec(
+        "db_statement_duration_seconds",
+        "SQL statement execution time (cursor execute)",
+        ("operation", "table"),
+    )
+)
+sql_rows = registry.register(
+    HistogramVec(
+        "db_statement_rows",
+        "Rows returned or affected by SQL statement",
+        ("operation", "table"),
+        buckets=ROW_BUCKETS,
+    )
+)
+sql_errors = registry.register(
+    CounterVec(
+        "db_statement_errors_total",
+        "SQL statements that raised an error",
+        ("operation", "table"),
+    )
+)
+
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?([\w.]+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def statement_labels(statement: str) -> tuple[str, str]:
+    """
+    (operation, table) для SQL: первое ключевое слово и первая таблица.
+    Текст запросов повторяется, поэтому разбор кэшируется — на горячем пути это dict lookup.
+    """
+    head = statement.lstrip()
+    operation = head.split(None, 1)[0].upper() if head else "UNKNOWN"
+    if operation == "WITH":
+        # основной запрос CTE дальше по тексту, его не ищем
+        operation = "CTE"
+    match = _TABLE_RE.search(head)
+    return operation, match.group(1) if match else ""
+
+
+def observe_statement(statement: str, rowcount: int, elapsed: float) -> None:
+    """Наблюдатель QueryTracker: время и число строк statement'а в гистограммы."""
+    labels = statement_labels(statement)
+    sql_duration.labels(*labels).observe(elapsed)
+    if rowcount is not None and rowcount >= 0:
+        sql_rows.labels(*labels).observe(rowcount)
+
+
+def _handle_error(exception_context) -> None:
+    statement = exception_context.statement
+    if statement:
+        sql_errors.inc(*statement_labels(statement))
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подписывает engine на счётчик ошибок SQL (время и строки идут через QueryTracker)."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "handle_error", _handle_error):
+        return
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def pool_families(db: DatabaseHelper) -> Iterable[Any]:
+    """Состояние пулов на момент scrape: primary и реплики (метка pool)."""
+    size = GaugeVec("db_pool_size", "Configured pool size", ("pool",))
+    checked_out = GaugeVec("db_pool_checked_out", "Connections in use", ("pool",))
+    checked_in = GaugeVec("db_pool_checked_in", "Idle connections in pool", ("pool",))
+    overflow = GaugeVec("db_pool_overflow", "Overflow connections", ("pool",))
+    timeouts = CounterVec(
+        "db_pool_checkout_timeouts_total", "Checkouts failed by pool_timeout", ("pool",)
+    )
+    wait = HistogramVec(
+        "db_pool_checkout_wait_seconds", "Time spent waiting for a connection", ("pool",)
+    )
+    connect = HistogramVec(
+        "db_pool_connect_latency_seconds", "Time to open a new DB connection", ("pool",)
+    )
+
+    pools = [("primary", db.engine, db.pool_metrics)] + [
+        (f"replica{i}", r.engine, r.metrics) for i, r in enumerate(db.replicas)
+    ]
+    for name, engine, metrics in pools:
+        pool = engine.pool
+        size.set(pool.size(), name)
+        checked_out.set(pool.checkedout(), name)
+        checked_in.set(pool.checkedin(), name)
+        overflow.set(pool.overflow(), name)
+        timeouts.inc(name, amount=metrics.checkout_timeouts)
+        # гистограммы пула уже накоплены в PoolMetrics — отдаём их как есть
+        wait.histograms[(name,)] = metrics.checkout_wait
+        connect.histograms[(name,)] = metrics.connect_latency
+    return size, checked_out, checked_in, overflow, timeouts, wait, connect
+
+
+def setup_db_metrics(db: DatabaseHelper, tracker: QueryTracker) -> None:
+    """
+    Метрики SQL на всех engine (primary и реплики) + pool gauges в registry.
+    Время statement'ов берётся из того же cursor-хука QueryTracker, второго слушателя нет.
+    """
+    tracker.add_observer(observe_statement)
+    for engine in [db.engine] + [r.engine for r in db.replicas]:
+        instrument_engine(engine)
+    registry.register_collector(lambda: pool_families(db))
+
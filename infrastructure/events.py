@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import asyncpg
+import orjson
+
+from infrastructure.db_helper import DatabaseHelper
+from services.logger_setup import get_logger
+
+log = get_logger(__name__)
+
+# пауза перед переподключением LISTEN после обрыва соединения
+_RECONNECT_DELAY = 1.0
+
+
+class Subscription:
+    """
+    Очередь событий одного подписчика. get() -> None: подписка закрыта
+    (подписчик не успевал читать и переполнил очередь) — клиент должен переподключиться
+    и перечитать состояние, а не продолжать с пропущенными событиями.
+    """
+
+    def __init__(self, broker: "PgNotifyBroker", queue_size: int):
+        self._broker = broker
+        self._queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=queue_size)
+
+    async def get(self) -> dict[str, Any] | None:
+        return await self._queue.get()
+
+    def _put(self, event: dict[str, Any]) -> bool:
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self._end()
+            return False
+
+    def _end(self) -> None:
+        # маркер закрытия; место под него — за счёт самого старого события
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    def close(self) -> None:
+        self._broker._subscribers.discard(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class PgNotifyBroker:
+    """
+    Раздаёт события канала Postgres NOTIFY подписчикам этого процесса.
+
+    LISTEN держит отдельное соединение asyncpg (не из пула engine) и поднимается лениво,
+    при первой подписке; обрыв — переподключение. NOTIFY транзакционный, поэтому
+    подписчики видят только закоммиченные изменения. Каждый воркер слушает сам,
+    так что подписчик получает события независимо от того, какой воркер сделал запись.
+    publish() — то же самое в обход БД (in-process).
+    """
+
+    def __init__(self, db: DatabaseHelper, *, channel: str, queue_size: int = 1000):
+        self.db = db
+        self.channel = channel
+        self.queue_size = queue_size
+        self._subscribers: set[Subscription] = set()
+        self._listener: asyncio.Task[None] | None = None
+        self._listening = asyncio.Event()
+
+    async def subscribe(self, *, timeout: float = 5.0) -> Subscription:
+        """
+        Подписка начинает получать события после того, как LISTEN активен.
+        БД недоступна дольше timeout секунд -> TimeoutError.
+        """
+        if self._listener is None or self._listener.done():
+            self._listening.clear()
+            self._listener = asyncio.create_task(self._listen())
+        subscription = Subscription(self, self.queue_size)
+        self._subscribers.add(subscription)
+        try:
+            await asyncio.wait_for(self._listening.wait(), timeout)
+        except TimeoutError:
+            subscription.close()
+            raise
+        return subscription
+
+    def publish(self, event: dict[str, Any]) -> None:
+        for subscription in list(self._subscribers):
+            if not subscription._put(event):
+                log.warning("Subscriber of %s is too slow, dropped", self.channel)
+                subscription.close()
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            self.publish(orjson.loads(payload))
+        except orjson.JSONDecodeError as e:
+            log.error("Bad %s payload, %s", channel, e)
+
+    async def _listen(self) -> None:
+        url = self.db.engine.url
+        while True:
+            lost = asyncio.Event()
+            try:
+                # host=None: asyncpg берёт PGHOST / сокет по умолчанию, как и engine
+                connection = await asyncpg.connect(
+                    user=url.username,
+                    password=url.password,
+                    host=url.host or None,
+                    port=url.port,
+                    database=url.database,
+                )
+            except Exception as e:
+                log.error("LISTEN %s connect failed, %s", self.channel, e)
+                await asyncio.sleep(_RECONNECT_DELAY)
+                continue
+            try:
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notify)
+                self._listening.set()
+                log.info("Listening on %s", self.channel)
+                await lost.wait()
+                self._listening.clear()
+                log.warning("LISTEN %s connection lost, reconnecting", self.channel)
+                # пока LISTEN не активен, события теряются: подписчики пусть перечитают состояние
+                for subscription in list(self._subscribers):
+                    subscription._end()
+                    subscription.close()
+            except Exception as e:
+                log.error("LISTEN %s failed, %s", self.channel, e)
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
@@ -0,0 +1,47 @@
+from enum import Enum
+from typing import Any
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from infrastructure.orm.models import PositionsModel, ProviderModel, ProviderManagerModel
+
+
+class LoadProfile(str, Enum):
+    """
+    Что подгружать вместе с сущностью. По умолчанию все связи в моделях
+    объявлены lazy="raise_on_sql", поэтому без явного профиля запрос
+    не порождает дополнительных SELECT-ов, а случайное обращение к связи падает.
+    """
+
+    FLAT = "flat"  # только колонки
+    WITH_PROVIDER = "with_provider"  # + поставщик (и менеджер для позиции)
+    WITH_MANAGERS = "with_managers"  # + менеджеры поставщика
+
+
+_OPTIONS: dict[tuple[type, LoadProfile], tuple[Any, ...]] = {
+    (PositionsModel, LoadProfile.FLAT): (),
+    (PositionsModel, LoadProfile.WITH_PROVIDER): (
+        joinedload(PositionsModel.provider),
+        joinedload(PositionsModel.provider_manager),
+    ),
+    (ProviderModel, LoadProfile.FLAT): (),
+    (ProviderModel, LoadProfile.WITH_MANAGERS): (selectinload(ProviderModel.managers),),
+    (ProviderManagerModel, LoadProfile.FLAT): (),
+    (ProviderManagerModel, LoadProfile.WITH_PROVIDER): (
+        joinedload(ProviderManagerModel.provider),
+    ),
+}
+
+
+def load_options(model: type, profile: LoadProfile) -> tuple[Any, ...]:
+    """
+    Опции для select(model).options(*load_options(model, profile)).
+    Каждый профиль даёт фиксированное число запросов: FLAT — 1,
+    joinedload — 1, selectinload — 2.
+    """
+    try:
+        return _OPTIONS[(model, profile)]
+    except KeyError:
+        raise ValueError(
+            f"Load profile {profile.value} is not supported for {model.__name__}"
+        ) from None
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Literal
+import uuid
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from infrastructure.db_helper import DatabaseHelper
+from infrastructure.orm.models import RollupRefreshModel, inventory_rollup
+from infrastructure.orm.models.inventory import INVENTORY_ROLLUP, ROLLUP_NO_PROVIDER
+from services.logger_setup import get_logger
+
+log = get_logger(__name__)
+
+SummaryLevel = Literal["category", "sub_category", "provider"]
+
+# pg_try_advisory_xact_lock: при нескольких воркерах обновляет один, остальные пропускают такт
+_REFRESH_LOCK = 0x1A7E0F
+
+# ключи чужих уровней и "без поставщика" хранятся как '' / нулевой UUID — наружу null
+_SUMMARY_COLUMNS = (
+    func.nullif(inventory_rollup.c.category, "").label("category"),
+    func.nullif(inventory_rollup.c.sub_category, "").label("sub_category"),
+    func.nullif(inventory_rollup.c.provider_id, ROLLUP_NO_PROVIDER).label("provider_id"),
+    inventory_rollup.c.positions_count,
+    inventory_rollup.c.total_balance,
+    inventory_rollup.c.stock_value,
+    inventory_rollup.c.potential_revenue,
+)
+
+
+@dataclass(slots=True)
+class InventoryRollupMetadataProvider:
+    db: DatabaseHelper
+
+    async def get_summary(
+        self,
+        level: SummaryLevel,
+        *,
+        category: str | None = None,
+        sub_category: str | None = None,
+        provider_id: uuid.UUID | None = None,
+    ) -> tuple[list[dict[str, Any]], datetime | None] | None:
+        """
+        Строки сводки уровня level из inventory_rollup (по ix_inventory_rollup_key)
+        и момент обновления view. refreshed_at is None — view ещё ни разу не обновлялся.
+        """
+        rollup = inventory_rollup
+        query = select(*_SUMMARY_COLUMNS).where(rollup.c.level == level)
+        if category is not None:
+            query = query.where(rollup.c.category == category)
+        if sub_category is not None:
+            query = query.where(rollup.c.sub_category == sub_category)
+        if provider_id is not None:
+            query = query.where(rollup.c.provider_id == provider_id)
+        query = query.order_by(rollup.c.category, rollup.c.sub_category, rollup.c.provider_id)
+        try:
+            async with self.db.session(commit=False) as session:
+                refreshed_at = await session.scalar(
+                    select(RollupRefreshModel.refreshed_at).where(
+                        RollupRefreshModel.name == INVENTORY_ROLLUP
+                    )
+                )
+                res = await session.execute(query)
+                return [dict(row) for row in res.mappings()], refreshed_at
+        except Exception as e:
+            log.error("Error getting inventory summary: %s", e)
+            return None
+
+    async def refresh(self) -> datetime | None:
+        """
+        REFRESH MATERIALIZED VIEW CONCURRENTLY: читатели не блокируются и до коммита
+        видят прошлую версию. Отдаёт новый refreshed_at; None — обновление уже идёт
+        в другом воркере или упало.
+        """
+        try:
+            async with self.db.session(commit=True) as session:
+                locked = await session.scalar(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _REFRESH_LOCK}
+                )
+                if not locked:
+                    return None
+                await session.execute(
+                    text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {INVENTORY_ROLLUP}")
+                )
+                # момент начала транзакции: данные view не старее него
+                stmt = pg_insert(RollupRefreshModel).values(
+                    name=INVENTORY_ROLLUP, refreshed_at=func.localtimestamp()
+                )
+                refreshed_at = await session.scalar(
+                    stmt.on_conflict_do_update(
+                        index_elements=[RollupRefreshModel.name],
+                        set_={"refreshed_at": stmt.excluded.refreshed_at},
+                    ).returning(RollupRefreshModel.refreshed_at)
+                )
+            log.info("Inventory rollup refreshed at %s", refreshed_at)
+            return refreshed_at
+        except Exception as e:
+            log.error("Error refreshing inventory rollup: %s", e)
+            return None
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import select, text
+
+from infrastructure.db_helper import DatabaseHelper
+from infrastructure.orm.models import AVGPositionsInfoModel
+from services.logger_setup import get_logger
+
+log = get_logger(__name__)
+
+_STATS_COLUMNS = (
+    AVGPositionsInfoModel.category,
+    AVGPositionsInfoModel.sub_category,
+    AVGPositionsInfoModel.name,
+    AVGPositionsInfoModel.positions_count,
+    AVGPositionsInfoModel.first_purchase_price,
+    AVGPositionsInfoModel.last_purchase_price,
+    AVGPositionsInfoModel.avg_purchase_price,
+    AVGPositionsInfoModel.first_sale_price,
+    AVGPositionsInfoModel.last_sale_price,
+    AVGPositionsInfoModel.avg_sale_price,
+    AVGPositionsInfoModel.updated_at,
+)
+
+# Пересчёт с нуля. Истории цен нет, поэтому first/last берутся из текущих цен:
+# first — у самой ранней по created_at позиции, last — у последней по updated_at.
+# GROUPING SETS даёт все три уровня за один проход по positions; уровни, свёрнутые
+# в GROUPING SETS, помечаются "" — как в строках, которые пишут триггеры.
+_RECOMPUTE = text("""
+INSERT INTO avg_positions_info (
+    category, sub_category, name, positions_count, purchase_price_sum, sale_price_sum,
+    first_purchase_price, last_purchase_price, avg_purchase_price,
+    first_sale_price, last_sale_price, avg_sale_price
+)
+SELECT
+    category,
+    CASE WHEN grouping(sub_category) = 1 THEN '' ELSE sub_category END,
+    CASE WHEN grouping(name) = 1 THEN '' ELSE name END,
+    count(*), sum(purchase_price), sum(sale_price),
+    (array_agg(purchase_price ORDER BY created_at, id))[1],
+    (array_agg(purchase_price ORDER BY updated_at DESC, id DESC))[1],
+    avg(purchase_price),
+    (array_agg(sale_price ORDER BY created_at, id))[1],
+    (array_agg(sale_price ORDER BY updated_at DESC, id DESC))[1],
+    avg(sale_price)
+FROM positions
+GROUP BY GROUPING SETS ((category, sub_category, name), (category, sub_category), (category))
+""")
+
+
+@dataclass(slots=True)
+class PositionStatsMetadataProvider:
+    db: DatabaseHelper
+
+    async def get_stats(
+        self,
+        *,
+        category: str | None = None,
+        sub_category: str | None = None,
+        name: str | None = None,
+    ) -> list[dict[str, Any]] | None:
+        """
+        Статистика цен. С category — одна строка по PK: уровень категории,
+        подкатегории (+ sub_category) или имени (+ sub_category + name).
+        Только name — строки этого имени во всех категориях (ix_avg_positions_info_name).
+        """
+        stats = AVGPositionsInfoModel
+        query = select(*_STATS_COLUMNS)
+        if category is not None:
+            query = query.where(
+                stats.category == category,
+                stats.sub_category == (sub_category or ""),
+                stats.name == (name or ""),
+            )
+        else:
+            query = query.where(stats.name == name).order_by(stats.category, stats.sub_category)
+        try:
+            async with self.db.session(commit=False) as session:
+                res = await session.execute(query)
+                return [dict(row) for row in res.mappings()]
+        except Exception as e:
+            log.error("Error getting position stats: %s", e)
+            return None
+
+    async def recompute(self) -> int | None:
+        """
+        Полный пересчёт avg_positions_info из positions — ремонт после расхождений
+        (накопленная погрешность float-сумм, правки в обход триггеров).
+        SHARE ROW EXCLUSIVE на positions не пускает писателей до коммита, чтобы их
+        дельты не потерялись между DELETE и INSERT; чтение не блокируется.
+        Отдаёт число записанных строк статистики.
+        """
+        try:
+            async with self.db.session(commit=True) as session:
+                await session.execute(text("LOCK TABLE positions IN SHARE ROW EXCLUSIVE MODE"))
+                await session.execute(text("DELETE FROM avg_positions_info"))
+                res = await session.execute(_RECOMPUTE)
+                rows = res.rowcount
+            log.info("Position stats recomputed, rows = %d", rows)
+            return rows
+        except Exception as e:
+            log.error("Error recomputing position stats: %s", e)
+            return None
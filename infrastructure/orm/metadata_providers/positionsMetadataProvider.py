@@ -1,82 +1,694 @@
 import asyncio
+import uuid
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Optional, Any
-
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
-
-from infrastructure.orm.models import PositionsModel
-
-
+from datetime import datetime, timedelta
+from functools import partial
+from typing import TYPE_CHECKING, Optional, Any, AsyncIterator
+
+from sqlalchemy import (
+    Boolean,
+    Integer,
+    any_,
+    bindparam,
+    column,
+    delete,
+    func,
+    insert,
+    literal_column,
+    select,
+    text,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert as pg_insert
+from sqlalchemy.exc import IntegrityError, DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from infrastructure.orm.load_profiles import LoadProfile, load_options
+from infrastructure.orm.models import (
+    CollectionVersionModel,
+    PositionsModel,
+    PositionTombstoneModel,
+    ProviderModel,
+    ProviderManagerModel,
+)
+from infrastructure.orm.pagination import decode_cursor, encode_cursor
+
+
+from infrastructure.cache import EntityCache
 from infrastructure.db_helper import DatabaseHelper
 from services.logger_setup import get_logger
+from services.positions_import import STAGING_COLUMNS
 
 log = get_logger(__name__)
 from uuid import UUID
 
+# колонки, которые заполняются при вставке (created_at/updated_at ставит БД)
+_INSERT_COLUMNS = tuple(
+    c.key
+    for c in PositionsModel.__table__.columns
+    if c.key not in ("created_at", "updated_at")
+)
+_REQUIRED_COLUMNS = tuple(
+    c.key
+    for c in PositionsModel.__table__.columns
+    if c.key in _INSERT_COLUMNS and not c.nullable and c.key != "id"
+)
+# колонки, которые можно менять PATCH-ем
+_PATCH_COLUMNS = frozenset(k for k in _INSERT_COLUMNS if k != "id")
+_UUID_COLUMNS = ("id", "provider_id", "provider_manager_id")
+_UUID_ARRAY = ARRAY(PG_UUID(as_uuid=True))
+CACHE_NAMESPACE = "positions"
+# колонки, которые отдаются наружу (совпадают с PositionRead)
+_READ_COLUMNS = tuple(
+    c for c in PositionsModel.__table__.columns if c.key not in ("created_at", "updated_at")
+)
+# натуральный ключ позиции (uq_positions_category_sub_category_name_provider_id)
+_NATURAL_KEY = ("provider_id", "category", "sub_category", "name")
+# upsert: null в необязательной колонке — «не менять» (прайс-лист не знает остатков), а не «стереть»
+_UPSERT_KEEP_IF_NULL = frozenset(
+    c.key for c in PositionsModel.__table__.columns if c.nullable and c.key not in _NATURAL_KEY
+)
+# get_by_id дополнительно отдаёт updated_at — из него строится ETag/Last-Modified
+_ENTITY_COLUMNS = (*_READ_COLUMNS, PositionsModel.updated_at)
+
+
+def _tombstones(position_ids: list[UUID]):
+    """
+    INSERT надгробий для удалённых позиций; повторное удаление того же id
+    (позицию пересоздали) сдвигает deleted_at.
+    """
+    ids = bindparam("tombstone_ids", list(position_ids), type_=_UUID_ARRAY)
+    stmt = pg_insert(PositionTombstoneModel).from_select(["id"], select(func.unnest(ids)))
+    return stmt.on_conflict_do_update(
+        index_elements=[PositionTombstoneModel.id],
+        set_={"deleted_at": stmt.excluded.deleted_at},
+    )
+
+
+def _upsert_statement():
+    """
+    INSERT ... ON CONFLICT (натуральный ключ) DO UPDATE только для строк, где что-то
+    изменилось: неизменённые строки не переписываются (нет нового updated_at, записи
+    в WAL, срабатывания триггеров) и не попадают в RETURNING.
+    inserted = (xmax = 0): у только что вставленной версии строки xmax ещё пуст.
+    """
+    table = PositionsModel.__table__
+    stmt = pg_insert(table)
+    new = {}
+    for key in sorted(_PATCH_COLUMNS.difference(_NATURAL_KEY)):
+        value = stmt.excluded[key]
+        if key in _UPSERT_KEEP_IF_NULL:
+            value = func.coalesce(value, table.c[key])
+        new[key] = value
+    changed = tuple_(*(table.c[k] for k in new)).is_distinct_from(tuple_(*new.values()))
+    return stmt.on_conflict_do_update(
+        index_elements=list(_NATURAL_KEY),
+        set_={**new, "updated_at": func.now()},
+        where=changed,
+    ).returning(table.c.id, literal_column("(xmax = 0)", Boolean).label("inserted"))
+
+
+_UPSERT = _upsert_statement()
+
+
+def _coerce_uuids(row: dict[str, Any]) -> dict[str, Any]:
+    for k in _UUID_COLUMNS:
+        if row.get(k) is not None and not isinstance(row[k], UUID):
+            row[k] = UUID(str(row[k]))
+    return row
+
+_CREATE_IMPORT_STAGING = """
+CREATE TEMP TABLE positions_import (
+    line_no integer NOT NULL,
+    category varchar NOT NULL,
+    sub_category varchar NOT NULL,
+    name varchar NOT NULL,
+    description varchar NOT NULL,
+    balance integer,
+    min_balance integer,
+    purchase_price double precision NOT NULL,
+    sale_price double precision NOT NULL,
+    markup double precision NOT NULL,
+    provider_id uuid,
+    provider_manager_id uuid
+) ON COMMIT DROP
+"""
+
+_MERGE_IMPORT_STAGING = """
+WITH staged AS (
+    SELECT DISTINCT ON (s.provider_id, s.category, s.sub_category, s.name) s.*
+    FROM positions_import s
+    ORDER BY s.provider_id, s.category, s.sub_category, s.name, s.line_no
+),
+valid AS (
+    SELECT st.* FROM staged st
+    WHERE (st.provider_id IS NULL
+           OR EXISTS (SELECT 1 FROM providers p WHERE p.id = st.provider_id))
+      AND (st.provider_manager_id IS NULL
+           OR EXISTS (SELECT 1 FROM provider_manager m WHERE m.id = st.provider_manager_id))
+),
+inserted AS (
+    INSERT INTO positions (
+        id, category, sub_category, name, description, balance, min_balance,
+        purchase_price, sale_price, markup, provider_id, provider_manager_id
+    )
+    SELECT
+        gen_random_uuid(), v.category, v.sub_category, v.name, v.description,
+        v.balance, v.min_balance, v.purchase_price, v.sale_price, v.markup,
+        v.provider_id, v.provider_manager_id
+    FROM valid v
+    ORDER BY v.line_no
+    -- уже есть в positions (в том числе вставлена параллельным импортом) — пропускаем
+    ON CONFLICT (provider_id, category, sub_category, name) DO NOTHING
+    RETURNING 1
+)
+SELECT
+    (SELECT count(*) FROM positions_import),
+    (SELECT count(*) FROM staged),
+    (SELECT count(*) FROM valid),
+    (SELECT count(*) FROM inserted)
+"""
+
+# отказы движения остатка (второй элемент результата move_stock / failed у move_stock_many)
+STOCK_NOT_FOUND = "NOT_FOUND"
+STOCK_INSUFFICIENT = "INSUFFICIENT_STOCK"
+
+_MOVE_STOCK_MANY = text("""
+WITH movement AS (
+    SELECT m.id, sum(m.delta)::integer AS delta
+    FROM unnest(:ids, :deltas) AS m(id, delta)
+    GROUP BY m.id
+),
+locked AS (
+    -- блокировки строк в порядке id: встречные пакеты по одним SKU не дают deadlock
+    SELECT p.id, movement.delta, coalesce(p.balance, 0) + movement.delta AS balance
+    FROM positions p
+    JOIN movement ON movement.id = p.id
+    ORDER BY p.id
+    FOR UPDATE OF p
+),
+accepted AS (
+    SELECT count(*) = (SELECT count(*) FROM movement)
+           AND (:allow_negative
+                OR coalesce(bool_and(locked.balance >= 0 OR locked.delta >= 0), true)) AS ok
+    FROM locked
+)
+UPDATE positions p
+SET balance = locked.balance, updated_at = now()
+FROM locked, accepted
+WHERE p.id = locked.id AND accepted.ok
+RETURNING p.id, p.balance
+""").bindparams(
+    bindparam("ids", type_=_UUID_ARRAY),
+    bindparam("deltas", type_=ARRAY(Integer)),
+    bindparam("allow_negative", type_=Boolean),
+)
+
+
 @dataclass
 class PositionsMetadataProvider:
     db: DatabaseHelper
+    cache: EntityCache | None = None
+
+    async def _invalidate(self, *position_ids: Any, namespace: str = CACHE_NAMESPACE) -> None:
+        # внутри unit of work — только после commit запроса, иначе сразу
+        if self.cache is not None and position_ids:
+            await self.db.after_commit(partial(self.cache.invalidate, namespace, *position_ids))
 
-    async def get_all(self) -> list[PositionsModel] | None:
+    async def get_all(
+        self, *, load: LoadProfile = LoadProfile.FLAT
+    ) -> list[PositionsModel] | None:
         try:
-            async with self.db.session(commit=True) as session:
-                query = select(PositionsModel)
+            async with self.db.session(commit=False) as session:
+                query = select(PositionsModel).options(
+                    *load_options(PositionsModel, load)
+                )
                 result = await session.execute(query)
                 scalar_result = result.scalars().all()
-                log.info(msg=f"Successful got list items, len = {len(scalar_result)}")
+                log.info("Successful got list items, len = %d", len(scalar_result))
                 return scalar_result
         except Exception as e:
-            log.info(msg=f"Fail to get items, {e}")
+            log.info("Fail to get items, %s", e)
             return None
 
-    async def get_by_id(self, position_id: UUID) -> PositionsModel | None:
+    async def get_page(
+        self,
+        *,
+        limit: int,
+        cursor: str | None = None,
+        category: str | None = None,
+        sub_category: str | None = None,
+        provider_id: UUID | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None] | None:
+        """
+        Keyset-пагинация по (created_at, id): фильтры и граница страницы уходят в SQL,
+        поэтому стоимость запроса не зависит от размера таблицы.
+        Отдаёт строки-словари только с колонками _READ_COLUMNS, без ORM-объектов.
+        Невалидный cursor -> ValueError (до обращения к БД).
+        """
+        after = decode_cursor(cursor) if cursor else None
+
+        query = select(*_READ_COLUMNS, PositionsModel.created_at.label("_created_at"))
+        if category is not None:
+            query = query.where(PositionsModel.category == category)
+        if sub_category is not None:
+            query = query.where(PositionsModel.sub_category == sub_category)
+        if provider_id is not None:
+            query = query.where(PositionsModel.provider_id == provider_id)
+        if after is not None:
+            query = query.where(
+                tuple_(PositionsModel.created_at, PositionsModel.id) > tuple_(*after)
+            )
+        # limit + 1: лишняя строка говорит, что есть следующая страница
+        query = query.order_by(PositionsModel.created_at, PositionsModel.id).limit(
+            limit + 1
+        )
+
         try:
-            async with self.db.session(commit=True) as session:
-                query = select(PositionsModel).where(PositionsModel.id == position_id)
+            async with self.db.session(commit=False) as session:
                 result = await session.execute(query)
-                position = result.scalar_one_or_none()
-                log.info(msg=f"Successful got item by id {position_id}")
-                log.debug(
-                    msg=f"Successful got item by id {position_id}, item - {position.to_dict()}"
+                items = [dict(row) for row in result.mappings()]
+        except Exception as e:
+            log.info("Fail to get page of items, %s", e)
+            return None
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(last["_created_at"], last["id"])
+        for item in items:
+            del item["_created_at"]
+        log.info("Successful got page of items, len = %d", len(items))
+        return items, next_cursor
+
+    async def get_low_stock_page(
+        self,
+        *,
+        limit: int,
+        cursor: str | None = None,
+        category: str | None = None,
+        provider_id: UUID | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None] | None:
+        """
+        Позиции с balance < min_balance, keyset по (created_at, id) как у get_page.
+        Условие совпадает с предикатом ix_positions_low_stock_created_at_id — читается
+        только частичный индекс; фильтры применяются к уже малой выборке.
+        """
+        after = decode_cursor(cursor) if cursor else None
+
+        query = select(*_READ_COLUMNS, PositionsModel.created_at.label("_created_at")).where(
+            PositionsModel.balance < PositionsModel.min_balance
+        )
+        if category is not None:
+            query = query.where(PositionsModel.category == category)
+        if provider_id is not None:
+            query = query.where(PositionsModel.provider_id == provider_id)
+        if after is not None:
+            query = query.where(
+                tuple_(PositionsModel.created_at, PositionsModel.id) > tuple_(*after)
+            )
+        query = query.order_by(PositionsModel.created_at, PositionsModel.id).limit(
+            limit + 1
+        )
+
+        try:
+            async with self.db.session(commit=False) as session:
+                result = await session.execute(query)
+                items = [dict(row) for row in result.mappings()]
+        except Exception as e:
+            log.info("Fail to get low stock items, %s", e)
+            return None
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(last["_created_at"], last["id"])
+        for item in items:
+            del item["_created_at"]
+        return items, next_cursor
+
+    async def get_version(self) -> tuple[int, datetime] | None:
+        """
+        Версия списка для conditional GET: (счётчик, время изменения) из collection_versions —
+        одна строка по первичному ключу, без count(*) и скана positions. Счётчик двигает
+        commit любой записи, включая удаление и транзакцию, начатую раньше уже отданной версии.
+
+        Версия общая для всех фильтров: позиция, ушедшая из категории, тоже её меняет.
+        None — версии нет (в таблицу ещё не писали или ошибка БД).
+        """
+        version = CollectionVersionModel
+        query = select(version.version, version.changed_at).where(
+            version.name == PositionsModel.__tablename__
+        )
+        try:
+            async with self.db.session(commit=False) as session:
+                row = (await session.execute(query)).one_or_none()
+        except Exception as e:
+            log.info("Fail to get version of items, %s", e)
+            return None
+        return tuple(row) if row is not None else None
+
+    async def get_changes(
+        self,
+        *,
+        since: str | None = None,
+        limit: int,
+        settle_seconds: float = 0.0,
+    ) -> tuple[list[tuple[str, Any]], str | None, bool] | None:
+        """
+        Лента изменений после курсора since: созданные/изменённые позиции
+        (ix_positions_updated_at_id) и удалённые (position_tombstones), слитые
+        по (время, id). Отдаёт ([("upsert", row) | ("delete", id)], next_cursor, has_more).
+
+        Строки моложе settle_seconds не отдаются: updated_at — время начала транзакции,
+        и запись, закоммиченная позже чужого курсора, иначе осталась бы за ним навсегда.
+        Невалидный since -> ValueError (до обращения к БД).
+        """
+        after = decode_cursor(since) if since else None
+        horizon = func.localtimestamp() - timedelta(seconds=settle_seconds)
+        tombstone = PositionTombstoneModel
+
+        upserts = select(*_READ_COLUMNS, PositionsModel.updated_at.label("_changed_at")).where(
+            PositionsModel.updated_at <= horizon
+        )
+        deletes = select(tombstone.id, tombstone.deleted_at).where(tombstone.deleted_at <= horizon)
+        if after is not None:
+            upserts = upserts.where(
+                tuple_(PositionsModel.updated_at, PositionsModel.id) > tuple_(*after)
+            )
+            deletes = deletes.where(tuple_(tombstone.deleted_at, tombstone.id) > tuple_(*after))
+        # limit + 1 из каждого источника: после слияния лишняя строка говорит, что есть ещё
+        upserts = upserts.order_by(PositionsModel.updated_at, PositionsModel.id).limit(limit + 1)
+        deletes = deletes.order_by(tombstone.deleted_at, tombstone.id).limit(limit + 1)
+
+        try:
+            async with self.db.session(commit=False) as session:
+                changes = [
+                    (row["_changed_at"], row["id"], "upsert", dict(row))
+                    for row in (await session.execute(upserts)).mappings()
+                ]
+                changes.extend(
+                    (deleted_at, position_id, "delete", position_id)
+                    for position_id, deleted_at in (await session.execute(deletes)).all()
                 )
+        except Exception as e:
+            log.info("Fail to get changes of items, %s", e)
+            return None
+
+        changes.sort(key=lambda c: (c[0], c[1]))
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        next_cursor = encode_cursor(changes[-1][0], changes[-1][1]) if changes else since
+        for _, _, op, payload in changes:
+            if op == "upsert":
+                del payload["_changed_at"]
+        log.info("Successful got changes of items, len = %d", len(changes))
+        return [(op, payload) for _, _, op, payload in changes], next_cursor, has_more
+
+    async def stream_all(
+        self, *, chunk_size: int = 1000
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        Отдаёт все позиции пачками по chunk_size через server-side курсор.
+        Берём только колонки таблицы (без ORM-объектов и selectin-подгрузок),
+        поэтому память не растёт вместе с количеством строк.
+        """
+        query = (
+            select(*PositionsModel.__table__.columns)
+            .order_by(PositionsModel.created_at, PositionsModel.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        sent = 0
+        async with self.db.session(commit=False) as session:
+            result = await session.stream(query)
+            async for partition in result.mappings().partitions(chunk_size):
+                rows = [dict(row) for row in partition]
+                sent += len(rows)
+                yield rows
+        log.info("Successful streamed items, len = %d", sent)
+
+    async def get_by_id(self, position_id: UUID) -> dict[str, Any] | None:
+        # свои незакоммиченные записи в кэш не попадают и из кэша не читаются
+        if self.cache is None or self.db.has_pending_writes():
+            return await self._load_by_id(position_id)
+        return await self.cache.get_or_load(
+            CACHE_NAMESPACE, position_id, lambda: self._load_by_id(position_id)
+        )
+
+    async def _load_by_id(self, position_id: UUID) -> dict[str, Any] | None:
+        try:
+            async with self.db.session(commit=False) as session:
+                query = select(*_ENTITY_COLUMNS).where(PositionsModel.id == position_id)
+                result = await session.execute(query)
+                row = result.mappings().one_or_none()
+                position = dict(row) if row is not None else None
+                log.info("Successful got item by id %s", position_id)
+                log.debug("Successful got item by id %s, item - %s", position_id, position)
                 return position
         except Exception as e:
-            log.info(msg=f"Fail to get item with id {position_id}, {e}")
+            log.info("Fail to get item with id %s, %s", position_id, e)
+            return None
+
+    async def get_many_by_ids(self, position_ids: list[UUID]) -> dict[UUID, dict[str, Any]] | None:
+        """
+        Пакетный get_by_id: id -> строка, найденные в кэше не идут в БД,
+        остальные — одним запросом WHERE id = ANY(:ids). Ненайденных id в результате нет.
+        """
+        if not position_ids:
+            return {}
+        try:
+            if self.cache is None or self.db.has_pending_writes():
+                return await self._load_many_by_ids(position_ids)
+            return await self.cache.get_many_or_load(
+                CACHE_NAMESPACE, position_ids, self._load_many_by_ids
+            )
+        except Exception as e:
+            log.info("Fail to get items by ids, %s", e)
             return None
 
+    async def _load_many_by_ids(self, position_ids: list[UUID]) -> dict[UUID, dict[str, Any]]:
+        query = select(*_ENTITY_COLUMNS).where(
+            PositionsModel.id == any_(bindparam("ids", list(position_ids), type_=_UUID_ARRAY))
+        )
+        async with self.db.session(commit=False) as session:
+            result = await session.execute(query)
+            positions = {row["id"]: dict(row) for row in result.mappings()}
+        log.info(
+            "Successful got items by ids, requested = %d, found = %d",
+            len(position_ids),
+            len(positions),
+        )
+        return positions
+
     async def insert_many(
-        self, items: list[Any], refresh: bool = False
-    ) -> tuple | None:
-        ok: list[PositionsModel] = []
+        self, items: list[Any], *, chunk_size: int = 1000
+    ) -> tuple[list[dict[str, Any]], list[tuple[Any, str]]]:
+        """
+        Множественная вставка одной транзакцией:
+        1) валидируем/нормализуем все строки и проверяем FK двумя запросами;
+        2) вставляем пачками по chunk_size через INSERT ... RETURNING (executemany);
+        3) если пачка упала на IntegrityError — делим её пополам (SAVEPOINT на каждую половину),
+           пока не найдём конкретные плохие строки. Остальные строки пачки сохраняются.
+        Возвращает (ok, failed): ok — вставленные строки, failed — (item, error).
+        """
+        ok: list[dict[str, Any]] = []
         failed: list[tuple[Any, str]] = []
+
+        prepared: list[tuple[Any, dict[str, Any]]] = []
+        for item in items:
+            try:
+                prepared.append((item, self._prepare_row(item)))
+            except ValueError as e:
+                failed.append((item, f"VALIDATION_ERROR: {e}"))
+
         try:
-            for item in items:
-                obj = (
-                    item
-                    if isinstance(item, PositionsModel)
-                    else PositionsModel.from_dict(item)
-                )
+            async with self.db.session(commit=True) as session:
+                prepared = await self._drop_missing_fk(session, prepared, failed)
 
-                try:
-                    async with self.db.session(commit=True) as session:
-                        session.add(obj)
-                        await session.flush()
-                        if refresh:
-                            await session.refresh(obj)
-                    ok.append(obj)
-
-                except IntegrityError as e:
-                    # этот obj не сохранился, но остальные продолжим
-                    failed.append((item, str(e.orig)))
-                    return None
+                for start in range(0, len(prepared), chunk_size):
+                    chunk = prepared[start : start + chunk_size]
+                    chunk_ok, chunk_failed = await self._insert_chunk(session, chunk)
+                    ok.extend(chunk_ok)
+                    failed.extend(chunk_failed)
 
+            await self._invalidate(*(row["id"] for row in ok))
+            log.info("Successful inserted items, ok = %d, failed = %d", len(ok), len(failed))
             return ok, failed
         except Exception as e:
-            log.debug(msg=(ok, failed))
-            log.info(msg=f"Fail to insert items, {e}")
+            log.error("Fail to insert items, %s", e)
+            # транзакция откатилась целиком — ничего не сохранено
+            return [], failed + [(item, f"DB_ERROR: {e}") for item, _ in prepared]
+
+    @staticmethod
+    def _prepare_row(item: dict[str, Any] | PositionsModel) -> dict[str, Any]:
+        """
+        Приводит входной элемент к строке для INSERT с одинаковым набором ключей.
+        """
+        data = item.to_dict() if isinstance(item, PositionsModel) else item
+        row = _coerce_uuids({k: data.get(k) for k in _INSERT_COLUMNS})
+        if row["id"] is None:
+            row["id"] = uuid.uuid4()
+
+        missing = [k for k in _REQUIRED_COLUMNS if row[k] is None]
+        if missing:
+            raise ValueError(f"Missing required fields: {missing}")
+        return row
+
+    @staticmethod
+    async def _drop_missing_fk(
+        session: AsyncSession,
+        prepared: list[tuple[Any, dict[str, Any]]],
+        failed: list[tuple[Any, str]],
+    ) -> list[tuple[Any, dict[str, Any]]]:
+        """
+        Проверяет ссылки на providers/provider_manager одним запросом на таблицу,
+        чтобы FK-ошибки не ломали пачки при вставке.
+        """
+        existing: dict[str, set[UUID]] = {}
+        for key, model in (
+            ("provider_id", ProviderModel),
+            ("provider_manager_id", ProviderManagerModel),
+        ):
+            ids = {row[key] for _, row in prepared if row[key] is not None}
+            if not ids:
+                existing[key] = set()
+                continue
+            res = await session.execute(select(model.id).where(model.id.in_(ids)))
+            existing[key] = set(res.scalars().all())
+
+        kept: list[tuple[Any, dict[str, Any]]] = []
+        for item, row in prepared:
+            bad = [
+                k
+                for k in ("provider_id", "provider_manager_id")
+                if row[k] is not None and row[k] not in existing[k]
+            ]
+            if bad:
+                failed.append((item, f"FOREIGN_KEY_NOT_FOUND: {bad}"))
+            else:
+                kept.append((item, row))
+        return kept
+
+    async def _insert_chunk(
+        self, session: AsyncSession, chunk: list[tuple[Any, dict[str, Any]]], stmt: Any = None
+    ) -> tuple[list[dict[str, Any]], list[tuple[Any, str]]]:
+        if not chunk:
+            return [], []
+        if stmt is None:
+            stmt = insert(PositionsModel.__table__).returning(
+                *PositionsModel.__table__.columns, sort_by_parameter_order=True
+            )
+        try:
+            async with session.begin_nested():  # SAVEPOINT
+                res = await session.execute(stmt, [row for _, row in chunk])
+                return [dict(r) for r in res.mappings()], []
+        except IntegrityError as e:
+            if len(chunk) == 1:
+                return [], [(chunk[0][0], f"INTEGRITY_ERROR: {e.orig}")]
+            mid = len(chunk) // 2
+            left_ok, left_failed = await self._insert_chunk(session, chunk[:mid], stmt)
+            right_ok, right_failed = await self._insert_chunk(session, chunk[mid:], stmt)
+            return left_ok + right_ok, left_failed + right_failed
+
+    async def upsert_many(
+        self, items: list[Any], *, chunk_size: int = 1000
+    ) -> tuple[dict[str, int], list[tuple[Any, str]]]:
+        """
+        Идемпотентная запись прайс-листа по натуральному ключу
+        (provider_id, category, sub_category, name) одной транзакцией: новые строки
+        вставляются, изменённые обновляются, совпадающие не трогаются (ни updated_at,
+        ни инвалидации кэша). Валидация, FK и деление упавшей пачки — как в insert_many.
+        Повтор ключа в одном запросе — ошибка строки (остаётся первая).
+        Возвращает ({"inserted", "updated", "unchanged"}, failed).
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        failed: list[tuple[Any, str]] = []
+
+        prepared: dict[tuple, tuple[Any, dict[str, Any]]] = {}
+        for item in items:
+            try:
+                row = self._prepare_row(item)
+            except ValueError as e:
+                failed.append((item, f"VALIDATION_ERROR: {e}"))
+                continue
+            key = tuple(row[k] for k in _NATURAL_KEY)
+            if key in prepared:
+                failed.append((item, f"DUPLICATE_KEY_IN_BATCH: {list(_NATURAL_KEY)}"))
+            else:
+                prepared[key] = (item, row)
+        # один порядок строк у всех писателей: параллельные upsert-ы не ловят deadlock
+        rows = [
+            prepared[key]
+            for key in sorted(prepared, key=lambda k: (str(k[0] or ""), *k[1:]))
+        ]
+
+        changed: list[dict[str, Any]] = []
+        try:
+            async with self.db.session(commit=True) as session:
+                rows = await self._drop_missing_fk(session, rows, failed)
+                for start in range(0, len(rows), chunk_size):
+                    chunk = rows[start : start + chunk_size]
+                    chunk_changed, chunk_failed = await self._insert_chunk(session, chunk, _UPSERT)
+                    changed.extend(chunk_changed)
+                    failed.extend(chunk_failed)
+                    # строки без RETURNING совпали с уже записанными
+                    counts["unchanged"] += len(chunk) - len(chunk_changed) - len(chunk_failed)
+        except Exception as e:
+            log.error("Fail to upsert items, %s", e)
+            return (
+                {"inserted": 0, "updated": 0, "unchanged": 0},
+                failed + [(item, f"DB_ERROR: {e}") for item, _ in rows],
+            )
+
+        counts["inserted"] = sum(1 for row in changed if row["inserted"])
+        counts["updated"] = len(changed) - counts["inserted"]
+        await self._invalidate(*(row["id"] for row in changed))
+        log.info("Successful upserted items, %s, failed = %d", counts, len(failed))
+        return counts, failed
+
+    async def copy_import(
+        self, batches: AsyncIterator[list[tuple]]
+    ) -> dict[str, int] | None:
+        """
+        Импорт через PostgreSQL COPY:
+        1) пачки записей (порядок STAGING_COLUMNS) льются в temp-таблицу через COPY;
+        2) один INSERT ... SELECT переносит их в positions.
+        Дубликаты — строки с тем же (provider_id, category, sub_category, name),
+        что уже есть в positions или встречались в файле раньше.
+        Строки со ссылкой на несуществующего поставщика/менеджера считаются rejected.
+        Ошибки формата файла (ValueError из batches) пробрасываются наверх.
+        """
+        try:
+            async with self.db.session(commit=True) as session:
+                conn = await session.connection()
+                await conn.execute(text(_CREATE_IMPORT_STAGING))
+                raw = (await conn.get_raw_connection()).driver_connection
+
+                async for batch in batches:
+                    await raw.copy_records_to_table(
+                        "positions_import", records=batch, columns=STAGING_COLUMNS
+                    )
+
+                res = await conn.execute(text(_MERGE_IMPORT_STAGING))
+                staged, distinct_rows, valid_rows, inserted = res.one()
+        except ValueError:
+            raise
+        except Exception as e:
+            log.error("Fail to import items, %s", e)
             return None
 
+        summary = {
+            "inserted": inserted,
+            "rejected": distinct_rows - valid_rows,
+            "duplicates": (staged - distinct_rows) + (valid_rows - inserted),
+        }
+        log.info("Successful imported items, %s", summary)
+        return summary
+
     async def insert(
         self, item: dict[str, Any] | PositionsModel, refresh: bool = True
     ) -> PositionsModel | None:
@@ -93,33 +705,56 @@ class PositionsMetadataProvider:
                 await session.flush()
                 if refresh:
                     await session.refresh(obj)
-                return obj
+            await self._invalidate(obj.id)
+            return obj
         except Exception as e:
-            log.info(msg=f"Fail to insert {item}, {e}")
+            log.info("Fail to insert %s, %s", item, e)
             return None
 
-    async def delete_many(self, positions_id: list[str]):
-        if not positions_id:
-            return False
-
-        async with self.db.session() as session:
+    async def delete_many(
+        self, positions_id: list[str], *, chunk_size: int = 10000
+    ) -> tuple[list[UUID], list[str]] | None:
+        """
+        DELETE ... WHERE id = ANY(:ids) RETURNING id — один запрос на пачку,
+        без загрузки ORM-объектов. Возвращает (deleted_ids, not_found_ids)
+        или None, если упала БД (тогда ничего не удалено).
+        """
+        ids: list[UUID] = []
+        not_found: list[str] = []
+        for pid in positions_id:
             try:
-                query = select(PositionsModel).where(
-                    PositionsModel.id.in_(positions_id)
-                )
-                result = await session.execute(query)
-                positions = result.scalars().all()
+                ids.append(pid if isinstance(pid, UUID) else UUID(str(pid)))
+            except ValueError:
+                not_found.append(pid)
 
-                for position in positions:
-                    try:
-                        await session.delete(position)
-                        log.info(
-                            msg=f"Position id - {position.id} successfully deleted"
+        table = PositionsModel.__table__
+        deleted: list[UUID] = []
+        try:
+            async with self.db.session(commit=True) as session:
+                for start in range(0, len(ids), chunk_size):
+                    chunk = ids[start : start + chunk_size]
+                    res = await session.execute(
+                        delete(table)
+                        .where(
+                            table.c.id == any_(bindparam("ids", chunk, type_=_UUID_ARRAY))
                         )
-                    except Exception as e:
-                        log.info(msg=f"Position id - {position.id} can not delete, {e}")
-            except Exception as e:
-                log.error(msg=f"Fail to delete, {e}")
+                        .returning(table.c.id)
+                    )
+                    chunk_deleted = res.scalars().all()
+                    if chunk_deleted:
+                        await session.execute(_tombstones(chunk_deleted))
+                    deleted.extend(chunk_deleted)
+        except Exception as e:
+            log.error("Fail to delete, %s", e)
+            return None
+
+        await self._invalidate(*deleted)
+        deleted_set = set(deleted)
+        not_found.extend(str(pid) for pid in dict.fromkeys(ids) if pid not in deleted_set)
+        log.info(
+            "Successful deleted items, deleted = %d, not found = %d", len(deleted), len(not_found)
+        )
+        return deleted, not_found
 
     async def delete_by_id(self, position_id: str) -> bool:
         try:
@@ -128,78 +763,113 @@ class PositionsMetadataProvider:
                 result = await session.execute(query)
                 position = result.scalar_one_or_none()
                 if position is None:
-                    log.info(msg=f"Position with id {position_id} is not found")
+                    log.info("Position with id %s is not found", position_id)
                     return False
                 await session.delete(position)
-                log.info(msg=f"Position with id {position_id} successfully deleted")
-                return True
+                await session.execute(_tombstones([position.id]))
+            await self._invalidate(position.id)
+            log.info("Position with id %s successfully deleted", position_id)
+            return True
         except Exception as e:
-            log.error(msg=f"Fail to delete id - {position_id}, {e}")
+            log.error("Fail to delete id - %s, %s", position_id, e)
             return False
 
     async def update_many_by_id(
         self, ids_data: dict[str, dict[str, Any]]
-    ) -> tuple[list[PositionsModel], list[tuple[str, str]]]:
-        updated: list[PositionsModel] = []
+    ) -> tuple[list[dict[str, Any]], list[tuple[str, str]]]:
+        """
+        Пакетный PATCH: патчи группируются по набору изменяемых колонок,
+        каждая группа применяется одним
+        UPDATE positions SET ... FROM (VALUES ...) AS v WHERE positions.id = v.id RETURNING ...
+        Если группа упала (FK/тип/NOT NULL), она делится пополам под SAVEPOINT,
+        так что построчно откатываются только реально плохие строки.
+        """
+        updated: list[dict[str, Any]] = []
         failed: list[tuple[str, str]] = []
 
-        allowed = set(PositionsModel.__table__.columns.keys())
+        groups: dict[tuple[str, ...], list[tuple[str, dict[str, Any]]]] = {}
+        for pid, patch in ids_data.items():
+            try:
+                row = {k: v for k, v in patch.items() if k in _PATCH_COLUMNS}
+                row["id"] = pid
+                row = _coerce_uuids(row)
+            except ValueError as e:
+                failed.append((pid, f"VALIDATION_ERROR: {e}"))
+                continue
+            cols = tuple(sorted(k for k in row if k != "id"))
+            groups.setdefault(cols, []).append((pid, row))
 
         try:
             async with self.db.session(commit=True) as session:
-                # 1) Забираем все записи одним запросом
-                res = await session.execute(
-                    select(PositionsModel).where(
-                        PositionsModel.id.in_(list(ids_data.keys()))
-                    )
-                )
-                positions = res.scalars().all()
-
-                found_ids = {p.id for p in positions}
-                # 2) То, чего нет в БД — сразу в failed
-                for pid in ids_data.keys():
-                    if pid not in found_ids:
-                        failed.append((pid, "NOT_FOUND"))
-
-                # 3) Обновляем каждую запись отдельно, чтобы ошибка не откатывала всех
-                for position in positions:
-                    pid = position.id
-                    patch = ids_data.get(pid, {})
-
-                    try:
-                        async with session.begin_nested():  # SAVEPOINT
-                            for k, v in patch.items():
-                                if k in ("id", "created_at", "updated_at"):
-                                    continue
-                                if k in allowed:
-                                    setattr(position, k, v)
-                            await session.flush()
-                        await session.refresh(position)
-                        updated.append(position)
-                        log.info(f"Position id={pid} successfully updated")
-
-                    except IntegrityError as e:
-                        failed.append((pid, f"INTEGRITY_ERROR: {e.orig}"))
-                        log.warning(f"Position id={pid} update failed: {e}")
-                    except Exception as e:
-                        failed.append((pid, str(e)))
-                        log.error(f"Position id={pid} update failed: {e}")
+                for cols, rows in groups.items():
+                    group_ok, group_failed = await self._update_group(session, cols, rows)
+                    updated.extend(group_ok)
+                    failed.extend(group_failed)
 
+            await self._invalidate(*(row["id"] for row in updated))
+            log.info("Successful updated items, ok = %d, failed = %d", len(updated), len(failed))
             return updated, failed
 
         except Exception as e:
-            log.error(f"Error to update positions {list(ids_data.keys())}, {e}")
+            log.error("Error to update positions %s, %s", list(ids_data), e)
             # если упало вообще всё (например, нет соединения) — логично вернуть всех как failed
             return [], [(pid, f"DB_ERROR: {e}") for pid in ids_data.keys()]
 
+    async def _update_group(
+        self,
+        session: AsyncSession,
+        cols: tuple[str, ...],
+        rows: list[tuple[str, dict[str, Any]]],
+    ) -> tuple[list[dict[str, Any]], list[tuple[str, str]]]:
+        table = PositionsModel.__table__
+        if not cols:
+            # пустой патч — ничего не меняем, просто отдаём текущее состояние
+            stmt = select(*table.columns).where(
+                table.c.id.in_([row["id"] for _, row in rows])
+            )
+        else:
+            patch = values(
+                *(column(k, table.c[k].type) for k in ("id",) + cols), name="v"
+            ).data([tuple(row[k] for k in ("id",) + cols) for _, row in rows])
+            stmt = (
+                update(table)
+                .where(table.c.id == patch.c.id)
+                .values({k: patch.c[k] for k in cols})
+                .returning(*table.columns)
+            )
+
+        try:
+            async with session.begin_nested():  # SAVEPOINT
+                res = await session.execute(stmt)
+                got = [dict(r) for r in res.mappings()]
+        except DBAPIError as e:
+            if len(rows) == 1:
+                pid = rows[0][0]
+                kind = "INTEGRITY_ERROR" if isinstance(e, IntegrityError) else "DB_ERROR"
+                log.warning("Position id=%s update failed: %s", pid, e.orig)
+                return [], [(pid, f"{kind}: {e.orig}")]
+            mid = len(rows) // 2
+            left_ok, left_failed = await self._update_group(session, cols, rows[:mid])
+            right_ok, right_failed = await self._update_group(session, cols, rows[mid:])
+            return left_ok + right_ok, left_failed + right_failed
+
+        found = {r["id"] for r in got}
+        return got, [(pid, "NOT_FOUND") for pid, row in rows if row["id"] not in found]
+
     async def update_by_id(
-        self, position_id: str, data: dict[str, Any]
+        self,
+        position_id: str,
+        data: dict[str, Any],
+        *,
+        load: LoadProfile = LoadProfile.FLAT,
     ) -> PositionsModel | None:
 
         try:
             async with self.db.session(commit=True) as session:
                 res = await session.execute(
-                    select(PositionsModel).where(PositionsModel.id == position_id)
+                    select(PositionsModel)
+                    .where(PositionsModel.id == position_id)
+                    .options(*load_options(PositionsModel, load))
                 )
                 position = res.scalar_one_or_none()
                 if position is None:
@@ -215,8 +885,101 @@ class PositionsMetadataProvider:
                 await session.flush()
                 await session.refresh(position)
 
-                log.info(msg=f"Position id - {position_id} successfully update")
-                return position
+            await self._invalidate(position.id)
+            log.info("Position id - %s successfully update", position_id)
+            return position
+        except Exception as e:
+            log.error("Error to update position id - %s, %s", position_id, e)
+            return None
+
+    async def move_stock(
+        self, position_id: UUID, delta: int, *, allow_negative: bool = False
+    ) -> tuple[int | None, str | None]:
+        """
+        Приход (delta > 0) / расход (delta < 0) одним
+        UPDATE ... SET balance = balance + :delta RETURNING balance, без загрузки ORM-объекта:
+        конкурентные движения по одной позиции не теряются.
+        Отдаёт (новый остаток, None) или (None, STOCK_NOT_FOUND | STOCK_INSUFFICIENT | "DB_ERROR").
+        """
+        table = PositionsModel.__table__
+        new_balance = func.coalesce(table.c.balance, 0) + delta
+        stmt = (
+            update(table)
+            .where(table.c.id == position_id)
+            .values(balance=new_balance)
+            .returning(table.c.balance)
+        )
+        if not allow_negative and delta < 0:
+            stmt = stmt.where(new_balance >= 0)
+
+        try:
+            async with self.db.session(commit=True) as session:
+                balance = (await session.execute(stmt)).scalar_one_or_none()
+                if balance is None:
+                    # отказ — отдельный запрос только чтобы назвать причину
+                    exists = await session.scalar(
+                        select(table.c.id).where(table.c.id == position_id)
+                    )
+        except Exception as e:
+            log.error("Fail to move stock for position %s, %s", position_id, e)
+            return None, "DB_ERROR"
+
+        if balance is None:
+            reason = STOCK_INSUFFICIENT if exists is not None else STOCK_NOT_FOUND
+            log.info("Stock move %+d for position %s refused: %s", delta, position_id, reason)
+            return None, reason
+
+        await self._invalidate(position_id)
+        log.info("Stock move %+d for position %s, balance = %d", delta, position_id, balance)
+        return balance, None
+
+    async def move_stock_many(
+        self, movements: list[tuple[UUID, int]], *, allow_negative: bool = False
+    ) -> tuple[dict[UUID, int], list[tuple[UUID, str]]] | None:
+        """
+        Пакет движений одним statement'ом (_MOVE_STOCK_MANY), всё или ничего:
+        если хоть одной позиции нет или остаток уйдёт в минус, не меняется ни одна.
+        Движения одной позиции складываются. Отдаёт ({id: новый остаток}, [(id, причина)]).
+        """
+        if not movements:
+            return {}, []
+        ids = [position_id for position_id, _ in movements]
+        deltas = [delta for _, delta in movements]
+        try:
+            async with self.db.session(commit=True) as session:
+                res = await session.execute(
+                    _MOVE_STOCK_MANY,
+                    {"ids": ids, "deltas": deltas, "allow_negative": allow_negative},
+                )
+                balances = {row.id: row.balance for row in res}
+                if not balances:
+                    current = await session.execute(
+                        select(
+                            PositionsModel.id, func.coalesce(PositionsModel.balance, 0)
+                        ).where(PositionsModel.id == any_(bindparam("ids", ids, type_=_UUID_ARRAY)))
+                    )
+                    current_balances = dict(current.all())
         except Exception as e:
-            log.error(msg=f"Error to update position id - {position_id}, {e}")
+            log.error("Fail to move stock, %s", e)
             return None
+
+        if not balances:
+            totals: dict[UUID, int] = {}
+            for position_id, delta in movements:
+                totals[position_id] = totals.get(position_id, 0) + delta
+            failed = [
+                (position_id, STOCK_NOT_FOUND)
+                if position_id not in current_balances
+                else (position_id, STOCK_INSUFFICIENT)
+                for position_id, total in totals.items()
+                if position_id not in current_balances
+                or (total < 0 and current_balances[position_id] + total < 0)
+            ]
+            log.info("Stock moves refused, movements = %d, failed = %d", len(movements), len(failed))
+            return {}, failed
+
+        await self._invalidate(*balances)
+        log.info(
+            "Successful stock moves, movements = %d, positions = %d", len(movements), len(balances)
+        )
+        return balances, []
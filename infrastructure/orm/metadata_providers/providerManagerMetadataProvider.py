@@ -1,41 +1,103 @@
 from dataclasses import dataclass
+from functools import partial
 from typing import Any
 import uuid
 
-from sqlalchemy import select, delete, func
+from sqlalchemy import any_, bindparam, select, delete, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 
+from infrastructure.cache import EntityCache
 from infrastructure.db_helper import DatabaseHelper
+from infrastructure.orm.load_profiles import LoadProfile, load_options
 from infrastructure.orm.models import ProviderManagerModel
+from services.logger_setup import get_logger
+
+log = get_logger(__name__)
+
+# колонки, которые отдаются наружу (совпадают с ProviderManagerRead)
+_READ_COLUMNS = tuple(
+    c
+    for c in ProviderManagerModel.__table__.columns
+    if c.key not in ("created_at", "updated_at")
+)
+_UUID_ARRAY = ARRAY(PG_UUID(as_uuid=True))
+
+
+CACHE_NAMESPACE = "managers"
 
 
 @dataclass(slots=True)
 class ProviderManagerMetadataProvider:
     db: DatabaseHelper
+    cache: EntityCache | None = None
+
+    async def _invalidate(self, *manager_ids: Any, namespace: str = CACHE_NAMESPACE) -> None:
+        # внутри unit of work — только после commit запроса, иначе сразу
+        if self.cache is not None and manager_ids:
+            await self.db.after_commit(partial(self.cache.invalidate, namespace, *manager_ids))
 
-    async def get_all(self) -> list[ProviderManagerModel]:
+    async def get_all(self) -> list[dict[str, Any]]:
         async with self.db.session(commit=False) as session:
-            res = await session.execute(select(ProviderManagerModel))
-            return res.scalars().all()
+            res = await session.execute(select(*_READ_COLUMNS))
+            return [dict(row) for row in res.mappings()]
 
-    async def get_by_id(self, manager_id: uuid.UUID) -> ProviderManagerModel | None:
+    async def get_by_id(self, manager_id: uuid.UUID) -> dict[str, Any] | None:
+        # свои незакоммиченные записи в кэш не попадают и из кэша не читаются
+        if self.cache is None or self.db.has_pending_writes():
+            return await self._load_by_id(manager_id)
+        return await self.cache.get_or_load(
+            CACHE_NAMESPACE, manager_id, lambda: self._load_by_id(manager_id)
+        )
+
+    async def get_many_by_ids(
+        self, manager_ids: list[uuid.UUID]
+    ) -> dict[uuid.UUID, dict[str, Any]] | None:
+        """
+        Пакетный get_by_id: id -> строка; промахи кэша — одним запросом WHERE id = ANY(:ids).
+        None — ошибка БД.
+        """
+        if not manager_ids:
+            return {}
+        try:
+            if self.cache is None or self.db.has_pending_writes():
+                return await self._load_many_by_ids(manager_ids)
+            return await self.cache.get_many_or_load(
+                CACHE_NAMESPACE, manager_ids, self._load_many_by_ids
+            )
+        except Exception as e:
+            log.info("Fail to get managers by ids, %s", e)
+            return None
+
+    async def _load_by_id(self, manager_id: uuid.UUID) -> dict[str, Any] | None:
         async with self.db.session(commit=False) as session:
             res = await session.execute(
-                select(ProviderManagerModel).where(
-                    ProviderManagerModel.id == manager_id
+                select(*_READ_COLUMNS).where(ProviderManagerModel.id == manager_id)
+            )
+            row = res.mappings().one_or_none()
+            return dict(row) if row is not None else None
+
+    async def _load_many_by_ids(
+        self, manager_ids: list[uuid.UUID]
+    ) -> dict[uuid.UUID, dict[str, Any]]:
+        async with self.db.session(commit=False) as session:
+            res = await session.execute(
+                select(*_READ_COLUMNS).where(
+                    ProviderManagerModel.id
+                    == any_(bindparam("ids", list(manager_ids), type_=_UUID_ARRAY))
                 )
             )
-            return res.scalar_one_or_none()
+            return {row["id"]: dict(row) for row in res.mappings()}
 
     async def get_by_provider_id(
         self, provider_id: uuid.UUID
-    ) -> list[ProviderManagerModel]:
+    ) -> list[dict[str, Any]]:
         async with self.db.session(commit=False) as session:
             res = await session.execute(
-                select(ProviderManagerModel).where(
+                select(*_READ_COLUMNS).where(
                     ProviderManagerModel.provider_id == provider_id
                 )
             )
-            return res.scalars().all()
+            return [dict(row) for row in res.mappings()]
 
     async def insert(
         self, data: dict[str, Any], *, refresh: bool = True
@@ -47,7 +109,8 @@ class ProviderManagerMetadataProvider:
             await session.flush()
             if refresh:
                 await session.refresh(obj)
-            return obj
+        await self._invalidate(obj.id)
+        return obj
 
     async def update_by_id(
         self,
@@ -55,12 +118,13 @@ class ProviderManagerMetadataProvider:
         patch: dict[str, Any],
         *,
         refresh: bool = True,
+        load: LoadProfile = LoadProfile.FLAT,
     ) -> ProviderManagerModel | None:
         async with self.db.session(commit=True) as session:
             res = await session.execute(
-                select(ProviderManagerModel).where(
-                    ProviderManagerModel.id == manager_id
-                )
+                select(ProviderManagerModel)
+                .where(ProviderManagerModel.id == manager_id)
+                .options(*load_options(ProviderManagerModel, load))
             )
             obj = res.scalar_one_or_none()
             if obj is None:
@@ -79,7 +143,8 @@ class ProviderManagerMetadataProvider:
             await session.flush()
             if refresh:
                 await session.refresh(obj)
-            return obj
+        await self._invalidate(obj.id)
+        return obj
 
     async def delete_by_id(self, manager_id: uuid.UUID) -> bool:
         async with self.db.session(commit=True) as session:
@@ -92,13 +157,18 @@ class ProviderManagerMetadataProvider:
             if obj is None:
                 return False
             await session.delete(obj)
-            return True
+        await self._invalidate(obj.id)
+        return True
 
     async def delete_many_by_ids(self, ids: list[uuid.UUID]) -> int:
         if not ids:
             return 0
         async with self.db.session(commit=True) as session:
             result = await session.execute(
-                delete(ProviderManagerModel).where(ProviderManagerModel.id.in_(ids))
+                delete(ProviderManagerModel)
+                .where(ProviderManagerModel.id.in_(ids))
+                .returning(ProviderManagerModel.id)
             )
-            return result.rowcount or 0
+            deleted = result.scalars().all()
+        await self._invalidate(*deleted)
+        return len(deleted)
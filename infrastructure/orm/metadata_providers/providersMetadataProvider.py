@@ -1,33 +1,110 @@
 from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
 from typing import Any
 import uuid
 
-from sqlalchemy import select, delete, update, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import any_, bindparam, select, delete, update, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 
+from infrastructure.cache import EntityCache
 from infrastructure.db_helper import DatabaseHelper
-from infrastructure.orm.models import ProviderModel, ProviderManagerModel
+from infrastructure.orm.metadata_providers.providerManagerMetadataProvider import (
+    CACHE_NAMESPACE as MANAGERS_CACHE_NAMESPACE,
+)
+from infrastructure.orm.load_profiles import LoadProfile, load_options
+from infrastructure.orm.models import CollectionVersionModel, ProviderModel, ProviderManagerModel
+from services.logger_setup import get_logger
+
+log = get_logger(__name__)
+
+# колонки, которые отдаются наружу (совпадают с ProviderRead)
+_READ_COLUMNS = tuple(
+    c for c in ProviderModel.__table__.columns if c.key not in ("created_at", "updated_at")
+)
+# get_by_id дополнительно отдаёт updated_at — из него строится ETag/Last-Modified
+_ENTITY_COLUMNS = (*_READ_COLUMNS, ProviderModel.updated_at)
+_UUID_ARRAY = ARRAY(PG_UUID(as_uuid=True))
+
+
+CACHE_NAMESPACE = "providers"
 
 
 @dataclass(slots=True)
 class ProviderMetadataProvider:
     db: DatabaseHelper
+    cache: EntityCache | None = None
+
+    async def _invalidate(self, *provider_ids: Any, namespace: str = CACHE_NAMESPACE) -> None:
+        # внутри unit of work — только после commit запроса, иначе сразу
+        if self.cache is not None and provider_ids:
+            await self.db.after_commit(partial(self.cache.invalidate, namespace, *provider_ids))
+
+    async def get_all(self) -> list[dict[str, Any]]:
+        async with self.db.session(commit=False) as session:
+            res = await session.execute(select(*_READ_COLUMNS))
+            return [dict(row) for row in res.mappings()]
+
+    async def get_version(self) -> tuple[int, datetime] | None:
+        """
+        Версия списка для conditional GET: (счётчик, время изменения) из collection_versions,
+        одна строка по первичному ключу; None — в таблицу ещё не писали.
+        """
+        version = CollectionVersionModel
+        async with self.db.session(commit=False) as session:
+            res = await session.execute(
+                select(version.version, version.changed_at).where(
+                    version.name == ProviderModel.__tablename__
+                )
+            )
+            row = res.one_or_none()
+            return tuple(row) if row is not None else None
+
+    async def get_by_id(self, provider_id: uuid.UUID) -> dict[str, Any] | None:
+        # свои незакоммиченные записи в кэш не попадают и из кэша не читаются
+        if self.cache is None or self.db.has_pending_writes():
+            return await self._load_by_id(provider_id)
+        return await self.cache.get_or_load(
+            CACHE_NAMESPACE, provider_id, lambda: self._load_by_id(provider_id)
+        )
+
+    async def get_many_by_ids(
+        self, provider_ids: list[uuid.UUID]
+    ) -> dict[uuid.UUID, dict[str, Any]] | None:
+        """
+        Пакетный get_by_id: id -> строка; промахи кэша — одним запросом WHERE id = ANY(:ids).
+        None — ошибка БД.
+        """
+        if not provider_ids:
+            return {}
+        try:
+            if self.cache is None or self.db.has_pending_writes():
+                return await self._load_many_by_ids(provider_ids)
+            return await self.cache.get_many_or_load(
+                CACHE_NAMESPACE, provider_ids, self._load_many_by_ids
+            )
+        except Exception as e:
+            log.info("Fail to get providers by ids, %s", e)
+            return None
 
-    async def get_all(self) -> list[ProviderModel]:
+    async def _load_by_id(self, provider_id: uuid.UUID) -> dict[str, Any] | None:
         async with self.db.session(commit=False) as session:
             res = await session.execute(
-                select(ProviderModel).options(selectinload(ProviderModel.managers))
+                select(*_ENTITY_COLUMNS).where(ProviderModel.id == provider_id)
             )
-            return res.scalars().all()
+            row = res.mappings().one_or_none()
+            return dict(row) if row is not None else None
 
-    async def get_by_id(self, provider_id: uuid.UUID) -> ProviderModel | None:
+    async def _load_many_by_ids(
+        self, provider_ids: list[uuid.UUID]
+    ) -> dict[uuid.UUID, dict[str, Any]]:
         async with self.db.session(commit=False) as session:
             res = await session.execute(
-                select(ProviderModel)
-                .where(ProviderModel.id == provider_id)
-                .options(selectinload(ProviderModel.managers))
+                select(*_ENTITY_COLUMNS).where(
+                    ProviderModel.id == any_(bindparam("ids", list(provider_ids), type_=_UUID_ARRAY))
+                )
             )
-            return res.scalar_one_or_none()
+            return {row["id"]: dict(row) for row in res.mappings()}
 
     async def insert(
         self, data: dict[str, Any], *, refresh: bool = True
@@ -39,7 +116,8 @@ class ProviderMetadataProvider:
             await session.flush()
             if refresh:
                 await session.refresh(obj)
-            return obj
+        await self._invalidate(obj.id)
+        return obj
 
     async def update_by_id(
         self,
@@ -47,10 +125,13 @@ class ProviderMetadataProvider:
         patch: dict[str, Any],
         *,
         refresh: bool = True,
+        load: LoadProfile = LoadProfile.FLAT,
     ) -> ProviderModel | None:
         async with self.db.session(commit=True) as session:
             res = await session.execute(
-                select(ProviderModel).where(ProviderModel.id == provider_id)
+                select(ProviderModel)
+                .where(ProviderModel.id == provider_id)
+                .options(*load_options(ProviderModel, load))
             )
             obj = res.scalar_one_or_none()
             if obj is None:
@@ -69,30 +150,42 @@ class ProviderMetadataProvider:
             await session.flush()
             if refresh:
                 await session.refresh(obj)
-            return obj
+        await self._invalidate(obj.id)
+        return obj
 
     async def delete_by_id(self, provider_id: uuid.UUID) -> bool:
         """
         Если на Provider есть ссылки (positions/provider_manager) и стоит RESTRICT — удаление не пройдёт.
         """
         async with self.db.session(commit=True) as session:
+            # менеджеры нужны для каскадного удаления
             res = await session.execute(
-                select(ProviderModel).where(ProviderModel.id == provider_id)
+                select(ProviderModel)
+                .where(ProviderModel.id == provider_id)
+                .options(*load_options(ProviderModel, LoadProfile.WITH_MANAGERS))
             )
             obj = res.scalar_one_or_none()
             if obj is None:
                 return False
+            # менеджеры удаляются каскадом вместе с поставщиком
+            manager_ids = [m.id for m in obj.managers]
             await session.delete(obj)
-            return True
+        await self._invalidate(obj.id)
+        await self._invalidate(*manager_ids, namespace=MANAGERS_CACHE_NAMESPACE)
+        return True
 
     async def delete_many_by_ids(self, ids: list[uuid.UUID]) -> int:
         if not ids:
             return 0
         async with self.db.session(commit=True) as session:
             result = await session.execute(
-                delete(ProviderModel).where(ProviderModel.id.in_(ids))
+                delete(ProviderModel)
+                .where(ProviderModel.id.in_(ids))
+                .returning(ProviderModel.id)
             )
-            return result.rowcount or 0
+            deleted = result.scalars().all()
+        await self._invalidate(*deleted)
+        return len(deleted)
 
     async def create_with_manager(
         self,
@@ -120,4 +213,6 @@ class ProviderMetadataProvider:
                 # если хочешь сразу подтянуть managers:
                 await session.refresh(manager)
 
-            return provider
+        await self._invalidate(provider.id)
+        await self._invalidate(manager.id, namespace=MANAGERS_CACHE_NAMESPACE)
+        return provider
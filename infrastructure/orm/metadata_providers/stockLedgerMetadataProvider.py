@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+import uuid
+
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.types import DateTime, Integer
+
+from infrastructure.db_helper import DatabaseHelper
+from infrastructure.orm.models import StockMovementModel, StockSnapshotModel
+from services.logger_setup import get_logger
+
+log = get_logger(__name__)
+
+# pg_try_advisory_lock: компакция в один поток даже при нескольких воркерах.
+# Лок сессионный и держится весь прогон: порции разных прогонов не перемешиваются
+_COMPACTION_LOCK = 0x5704C0
+_NIL_POSITION = uuid.UUID(int=0)
+
+# Порция — batch_size позиций (keyset по position_id), а не batch_size строк журнала:
+# движения позиции до cutoff сворачиваются и удаляются все сразу, в одной транзакции.
+# Иначе между порциями (или после прерванного прогона) снимок на cutoff есть,
+# а часть движений до него ещё в журнале — и balance_at их не видит.
+_COMPACT_CHUNK = text("""
+WITH batch AS (
+    SELECT DISTINCT position_id FROM stock_movements
+    WHERE position_id > :after AND created_at <= :cutoff
+    ORDER BY position_id
+    LIMIT :batch_size
+),
+folded AS (
+    DELETE FROM stock_movements m
+    USING batch
+    WHERE m.position_id = batch.position_id AND m.created_at <= :cutoff
+    RETURNING m.position_id, m.delta
+),
+sums AS (
+    SELECT position_id, sum(delta)::integer AS delta, count(*) AS movements
+    FROM folded
+    GROUP BY position_id
+),
+snapshots AS (
+    INSERT INTO stock_snapshots (position_id, taken_at, balance)
+    SELECT sums.position_id, :cutoff, coalesce(prev.balance, 0) + sums.delta
+    FROM sums
+    LEFT JOIN LATERAL (
+        SELECT s.balance FROM stock_snapshots s
+        WHERE s.position_id = sums.position_id AND s.taken_at <= :cutoff
+        ORDER BY s.taken_at DESC
+        LIMIT 1
+    ) prev ON true
+    -- повторный прогон с тем же cutoff (движения транзакций, закоммиченных позже):
+    -- снимок на cutoff уже есть, prev — он сам
+    ON CONFLICT (position_id, taken_at) DO UPDATE SET balance = EXCLUDED.balance
+    RETURNING 1
+)
+SELECT
+    (SELECT position_id FROM batch ORDER BY position_id DESC LIMIT 1),
+    (SELECT count(*) FROM batch)::integer,
+    (SELECT coalesce(sum(movements), 0) FROM sums)::integer,
+    (SELECT count(*) FROM snapshots)::integer
+""").bindparams(
+    bindparam("after", type_=PG_UUID(as_uuid=True)),
+    bindparam("cutoff", type_=DateTime()),
+    bindparam("batch_size", type_=Integer()),
+)
+
+
+@dataclass(slots=True)
+class StockLedgerMetadataProvider:
+    db: DatabaseHelper
+
+    async def get_movements(
+        self, position_id: uuid.UUID, *, limit: int = 100
+    ) -> list[dict[str, Any]]:
+        """Последние движения позиции (ещё не свёрнутые в снимки), новые первыми."""
+        async with self.db.session(commit=False) as session:
+            res = await session.execute(
+                select(
+                    StockMovementModel.id,
+                    StockMovementModel.delta,
+                    StockMovementModel.created_at,
+                )
+                .where(StockMovementModel.position_id == position_id)
+                .order_by(StockMovementModel.created_at.desc(), StockMovementModel.id.desc())
+                .limit(limit)
+            )
+            return [dict(row) for row in res.mappings()]
+
+    async def balance_at(
+        self, position_id: uuid.UUID, at: datetime
+    ) -> tuple[int, datetime | None]:
+        """
+        Остаток на момент at: последний снимок <= at плюс сумма движений журнала
+        после снимка (index-only scan по ix_stock_movements_position_id_created_at).
+
+        Журнал до последнего снимка позиции свёрнут, поэтому для at раньше него
+        точным остаётся только значение на момент снимка. Отдаёт (balance, as_of):
+        as_of == at — значение точное; as_of < at — остаток на as_of;
+        as_of is None — история до at не сохранилась (или позиции ещё не было).
+        """
+        snapshot = StockSnapshotModel
+        async with self.db.session(commit=False) as session:
+            prev = (
+                await session.execute(
+                    select(snapshot.taken_at, snapshot.balance)
+                    .where(snapshot.position_id == position_id, snapshot.taken_at <= at)
+                    .order_by(snapshot.taken_at.desc())
+                    .limit(1)
+                )
+            ).one_or_none()
+            latest = await session.scalar(
+                select(func.max(snapshot.taken_at)).where(snapshot.position_id == position_id)
+            )
+            taken_at, balance = prev if prev is not None else (None, 0)
+
+            if latest is not None and latest > at:
+                # движения между prev и at уже свёрнуты в более поздний снимок
+                return balance, taken_at
+
+            movements = select(func.coalesce(func.sum(StockMovementModel.delta), 0)).where(
+                StockMovementModel.position_id == position_id,
+                StockMovementModel.created_at <= at,
+            )
+            if taken_at is not None:
+                movements = movements.where(StockMovementModel.created_at > taken_at)
+            balance += await session.scalar(movements)
+        return balance, at
+
+    async def compact_older_than(
+        self, retention: timedelta, *, batch_size: int = 1_000
+    ) -> tuple[int, int]:
+        """compact() с cutoff = сейчас - retention по часам БД (created_at ставит БД)."""
+        async with self.db.session(commit=False) as session:
+            cutoff = await session.scalar(select(func.localtimestamp() - retention))
+        return await self.compact(cutoff, batch_size=batch_size)
+
+    async def compact(self, cutoff: datetime, *, batch_size: int = 1_000) -> tuple[int, int]:
+        """
+        Сворачивает движения журнала с created_at <= cutoff в снимки на cutoff
+        (по одному на позицию) и удаляет их. Порциями по batch_size позиций, каждая —
+        своя транзакция; весь прогон — под сессионным advisory lock на отдельном
+        соединении. Лок занят другим воркером — прогон пропускается.
+        Отдаёт (свёрнуто движений, записано снимков).
+        """
+        folded = snapshots = 0
+        async with self.db.engine.connect() as conn:
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": _COMPACTION_LOCK}
+            )
+            await conn.commit()
+            if not locked:
+                log.info("Stock ledger compaction is running elsewhere, skipped")
+                return 0, 0
+            try:
+                after = _NIL_POSITION
+                while True:
+                    last, positions, chunk_folded, chunk_snapshots = await self._compact_chunk(
+                        conn, cutoff, after, batch_size
+                    )
+                    folded += chunk_folded
+                    snapshots += chunk_snapshots
+                    if positions < batch_size:
+                        break
+                    after = last
+            finally:
+                await self._unlock(conn)
+        log.info(
+            "Stock ledger compacted up to %s, movements = %d, snapshots = %d",
+            cutoff,
+            folded,
+            snapshots,
+        )
+        return folded, snapshots
+
+    async def _compact_chunk(
+        self, conn: AsyncConnection, cutoff: datetime, after: uuid.UUID, batch_size: int
+    ) -> tuple[uuid.UUID | None, int, int, int]:
+        """Одна порция compact(): (последняя позиция, позиций, движений, снимков)."""
+        async with conn.begin():
+            res = await conn.execute(
+                _COMPACT_CHUNK, {"after": after, "cutoff": cutoff, "batch_size": batch_size}
+            )
+            return tuple(res.one())
+
+    @staticmethod
+    async def _unlock(conn: AsyncConnection) -> None:
+        # reset пула делает только rollback: соединение с неснятым сессионным локом
+        # вернулось бы в пул и держало его, поэтому при ошибке его выбрасываем
+        try:
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": _COMPACTION_LOCK}
+            )
+            await conn.commit()
+        except BaseException:
+            await conn.invalidate()
+            raise
@@ -1,5 +1,20 @@
 from infrastructure.orm.models.base import Base
-from infrastructure.orm.models.position import PositionsModel
+from infrastructure.orm.models.collection_version import CollectionVersionModel
+from infrastructure.orm.models.inventory import RollupRefreshModel, inventory_rollup
+from infrastructure.orm.models.position import AVGPositionsInfoModel, PositionsModel, PositionTombstoneModel
 from infrastructure.orm.models.provider import ProviderModel, ProviderManagerModel
+from infrastructure.orm.models.stock import StockMovementModel, StockSnapshotModel
 
-__all__ = ["Base", "PositionsModel", "ProviderModel", "ProviderManagerModel"]
+__all__ = [
+    "AVGPositionsInfoModel",
+    "Base",
+    "CollectionVersionModel",
+    "PositionsModel",
+    "PositionTombstoneModel",
+    "ProviderModel",
+    "ProviderManagerModel",
+    "RollupRefreshModel",
+    "StockMovementModel",
+    "StockSnapshotModel",
+    "inventory_rollup",
+]
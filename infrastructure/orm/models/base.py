@@ -4,16 +4,27 @@ from sqlalchemy import inspect
 from sqlalchemy.orm import DeclarativeBase
 
 
+# список колонок модели не меняется после маппинга — считаем один раз на класс
+_COLUMN_KEYS: dict[type, tuple[str, ...]] = {}
+
+
 class Base(DeclarativeBase):
     __abstract__ = True
 
+    @classmethod
+    def column_keys(cls) -> tuple[str, ...]:
+        keys = _COLUMN_KEYS.get(cls)
+        if keys is None:
+            keys = tuple(attr.key for attr in inspect(cls).mapper.column_attrs)
+            _COLUMN_KEYS[cls] = keys
+        return keys
+
     def to_dict(self) -> dict[str, Any]:
-        mapper = inspect(self).mapper
-        return {attr.key: getattr(self, attr.key) for attr in mapper.column_attrs}
+        return {key: getattr(self, key) for key in self.column_keys()}
 
     @classmethod
     def from_dict(cls, data: Mapping[str, Any], *, ignore_unknown: bool = True):
-        cols = {attr.key for attr in inspect(cls).mapper.column_attrs}
+        cols = set(cls.column_keys())
         obj = cls()
 
         for k, v in data.items():
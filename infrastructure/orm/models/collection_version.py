@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from sqlalchemy import DDL, BigInteger, Table, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from infrastructure.orm.models.base import Base
+
+
+class CollectionVersionModel(Base):
+    """
+    Версия коллекции для conditional GET списков: счётчик, который увеличивает
+    каждый пишущий statement в таблицу (см. track_collection_version).
+
+    updated_at/deleted_at — время начала транзакции: запись, начатая раньше,
+    а закоммиченная позже, не двигает их max. Счётчик двигает любой commit.
+    """
+
+    __tablename__ = "collection_versions"
+
+    # имя таблицы (TG_TABLE_NAME)
+    name: Mapped[str] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(nullable=False)
+
+
+# BEFORE, а не AFTER: строку счётчика транзакция блокирует до commit, и берёт её раньше
+# блокировок строк коллекции — иначе два пишущих в несколько statement'ов писателя
+# ловят deadlock (строка таблицы у одного, счётчик у другого).
+# changed_at считается уже под блокировкой, поэтому не убывает в порядке commit.
+_BUMP_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION collection_version_bump() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO {CollectionVersionModel.__tablename__} AS v (name, version, changed_at)
+    VALUES (TG_TABLE_NAME, 1, clock_timestamp()::timestamp)
+    ON CONFLICT (name) DO UPDATE
+    SET version = v.version + 1,
+        changed_at = greatest(v.changed_at, clock_timestamp()::timestamp);
+    RETURN NULL;
+END $$
+"""
+
+
+def track_collection_version(table: Table) -> None:
+    """Statement-level триггер на table: любой INSERT/UPDATE/DELETE/TRUNCATE двигает версию."""
+    event.listen(table, "after_create", DDL(_BUMP_FUNCTION))
+    event.listen(
+        table,
+        "after_create",
+        DDL(
+            f"""
+            CREATE TRIGGER {table.name}_collection_version
+            BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table.name}
+            FOR EACH STATEMENT EXECUTE FUNCTION collection_version_bump()
+            """
+        ),
+    )
@@ -0,0 +1,89 @@
+from datetime import datetime
+import uuid
+
+from sqlalchemy import DDL, Double, BigInteger, String, column, event, table
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from infrastructure.orm.models.base import Base
+
+
+class RollupRefreshModel(Base):
+    """
+    Когда materialized view был обновлён в последний раз. Пишется в той же транзакции,
+    что и REFRESH, поэтому читатель видит refreshed_at, согласованный с данными.
+    """
+
+    __tablename__ = "rollup_refreshes"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    refreshed_at: Mapped[datetime] = mapped_column(nullable=False)
+
+
+# Сводка по складу: одна строка на категорию, подкатегорию и поставщика (level).
+# Не ORM-модель: materialized view создаётся DDL ниже, а не create_all, и обновляется
+# REFRESH ... CONCURRENTLY (см. InventoryRollupMetadataProvider).
+#
+# Ключевые колонки чужих уровней и позиции без поставщика — не NULL, а '' / нулевой UUID
+# (как "" в avg_positions_info): REFRESH CONCURRENTLY сопоставляет строки через "=" по
+# уникальному индексу, и строка с NULL в ключе (даже при NULLS NOT DISTINCT) удалялась
+# и вставлялась заново на каждом обновлении. Наружу они отдаются как null.
+INVENTORY_ROLLUP = "inventory_rollup"
+ROLLUP_NO_PROVIDER = uuid.UUID(int=0)
+
+inventory_rollup = table(
+    INVENTORY_ROLLUP,
+    column("level", String),
+    column("category", String),
+    column("sub_category", String),
+    column("provider_id", UUID(as_uuid=True)),
+    column("positions_count", BigInteger),
+    column("total_balance", BigInteger),
+    column("stock_value", Double),
+    column("potential_revenue", Double),
+)
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {INVENTORY_ROLLUP} AS
+        SELECT
+            CASE
+                WHEN grouping(provider_id) = 0 THEN 'provider'
+                WHEN grouping(sub_category) = 0 THEN 'sub_category'
+                ELSE 'category'
+            END AS level,
+            CASE WHEN grouping(category) = 0 THEN category ELSE '' END AS category,
+            CASE WHEN grouping(sub_category) = 0 THEN sub_category ELSE '' END AS sub_category,
+            coalesce(
+                CASE WHEN grouping(provider_id) = 0 THEN provider_id END,
+                '{ROLLUP_NO_PROVIDER}'::uuid
+            ) AS provider_id,
+            count(*) AS positions_count,
+            coalesce(sum(balance), 0)::bigint AS total_balance,
+            coalesce(sum(balance * purchase_price), 0)::float8 AS stock_value,
+            coalesce(sum(balance * sale_price), 0)::float8 AS potential_revenue
+        FROM positions
+        GROUP BY GROUPING SETS ((category), (category, sub_category), (provider_id))
+        """
+    ),
+)
+# REFRESH CONCURRENTLY требует уникальный индекс; он же — поиск по level + ключу
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_{INVENTORY_ROLLUP}_key
+        ON {INVENTORY_ROLLUP} (level, category, sub_category, provider_id)
+        """
+    ),
+)
+# view зависит от positions: без этого drop_all не сможет удалить таблицу
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL(f"DROP MATERIALIZED VIEW IF EXISTS {INVENTORY_ROLLUP}"),
+)
@@ -2,14 +2,64 @@ import uuid
 from datetime import datetime
 from typing import List, Any, Mapping
 
-from sqlalchemy import func, inspect, ForeignKey, UUID
+from sqlalchemy import DDL, event, func, inspect, text, ForeignKey, UUID, Index
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 
 from infrastructure.orm.models.base import Base
+from infrastructure.orm.models.collection_version import track_collection_version
 
 
 class PositionsModel(Base):
     __tablename__ = "positions"
+    __table_args__ = (
+        # keyset-пагинация: ORDER BY created_at, id + фильтры
+        Index(
+            "ix_positions_created_at_id",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "ix_positions_category_created_at_id",
+            "category",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "ix_positions_category_sub_category_created_at_id",
+            "category",
+            "sub_category",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "ix_positions_provider_id_created_at_id",
+            "provider_id",
+            "created_at",
+            "id",
+        ),
+        # лента изменений: WHERE (updated_at, id) > cursor ORDER BY updated_at, id
+        Index("ix_positions_updated_at_id", "updated_at", "id"),
+        # натуральный ключ позиции: upsert прайс-листов (ON CONFLICT) и дедупликация импорта;
+        # NULLS NOT DISTINCT — позиции без поставщика тоже уникальны по (category, sub_category, name);
+        # provider_id последним — индекс же ищет позиции группы имени (ремонт first/last статистики)
+        Index(
+            "uq_positions_category_sub_category_name_provider_id",
+            "category",
+            "sub_category",
+            "name",
+            "provider_id",
+            unique=True,
+            postgresql_nulls_not_distinct=True,
+        ),
+        # позиции ниже минимального остатка: частичный индекс хранит только их,
+        # список low-stock читается без скана таблицы (условие запроса — то же выражение)
+        Index(
+            "ix_positions_low_stock_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("balance < min_balance"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -33,9 +83,8 @@ class PositionsModel(Base):
     provider_id: Mapped[uuid.UUID | None] = mapped_column(
         ForeignKey("providers.id", ondelete="RESTRICT"),
         nullable=True,
-        index=True,
     )
-    provider: Mapped["ProviderModel | None"] = relationship(lazy="selectin")
+    provider: Mapped["ProviderModel | None"] = relationship(lazy="raise_on_sql")
 
     # если хочешь знать конкретного менеджера "кто продал":
     provider_manager_id: Mapped[uuid.UUID | None] = mapped_column(
@@ -44,7 +93,7 @@ class PositionsModel(Base):
         index=True,
     )
     provider_manager: Mapped["ProviderManagerModel | None"] = relationship(
-        lazy="selectin"
+        lazy="raise_on_sql"
     )
 
     created_at: Mapped[datetime] = mapped_column(
@@ -93,18 +142,50 @@ class PositionsModel(Base):
     #         print(str(e), src)
 
 
+class PositionTombstoneModel(Base):
+    """
+    Удалённые позиции для ленты изменений (/positions/changes): строка пишется
+    в той же транзакции, что и DELETE из positions.
+    """
+
+    __tablename__ = "position_tombstones"
+    __table_args__ = (Index("ix_position_tombstones_deleted_at_id", "deleted_at", "id"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    deleted_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
+
+
 class AVGPositionsInfoModel(Base):
+    """
+    Статистика цен позиций на трёх уровнях: (category, sub_category, name),
+    (category, sub_category, "") и (category, "", ""). Ведётся инкрементально
+    триггерами на positions (бегущие суммы и счётчик), чтение — один lookup по PK.
+    Полный пересчёт для ремонта — jobs.recompute_position_stats.
+    """
+
     __tablename__ = "avg_positions_info"
-    id: Mapped[str] = mapped_column(primary_key=True, default="code")
-    category: Mapped[str] = mapped_column(nullable=False, unique=False)
-    sub_category: Mapped[str] = mapped_column(nullable=False, unique=False)
-    name: Mapped[str] = mapped_column(nullable=False, unique=True)
-    first_purchase_price: Mapped[float] = mapped_column(nullable=False)
-    last_purchase_price: Mapped[float] = mapped_column(nullable=False)
-    avg_purchase_price: Mapped[float] = mapped_column(nullable=False)
-    first_sale_price: Mapped[float] = mapped_column(nullable=False)
-    last_sale_price: Mapped[float] = mapped_column(nullable=False)
-    avg_sale_price: Mapped[float] = mapped_column(nullable=False)
+    __table_args__ = (
+        # статистика по имени без категории
+        Index("ix_avg_positions_info_name", "name"),
+    )
+
+    category: Mapped[str] = mapped_column(primary_key=True)
+    sub_category: Mapped[str] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(primary_key=True)
+    positions_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    purchase_price_sum: Mapped[float] = mapped_column(nullable=False, server_default="0")
+    sale_price_sum: Mapped[float] = mapped_column(nullable=False, server_default="0")
+    # first — цена самой ранней позиции группы, last — последней записанной
+    # (удалили или изменили позицию, которая их задала, — перечитываются из positions);
+    # avg = sum / count (null, если в группе не осталось позиций)
+    first_purchase_price: Mapped[float | None] = mapped_column(nullable=True)
+    last_purchase_price: Mapped[float | None] = mapped_column(nullable=True)
+    avg_purchase_price: Mapped[float | None] = mapped_column(nullable=True)
+    first_sale_price: Mapped[float | None] = mapped_column(nullable=True)
+    last_sale_price: Mapped[float | None] = mapped_column(nullable=True)
+    avg_sale_price: Mapped[float | None] = mapped_column(nullable=True)
     # providers:Mapped[List] = mapped_column(nullable = False)
 
     created_at: Mapped[datetime] = mapped_column(
@@ -113,3 +194,249 @@ class AVGPositionsInfoModel(Base):
     updated_at: Mapped[datetime] = mapped_column(
         server_default=func.now(), onupdate=func.now(), nullable=False
     )
+
+
+# Изменения positions приводятся к строкам-дельтам (cnt = +1/-1, суммы цен со знаком,
+# цены для first/last только у добавлений), раскладываются на три уровня и
+# вливаются в avg_positions_info одним INSERT ... ON CONFLICT на statement.
+# ORDER BY — строки статистики блокируются в одном порядке у всех писателей.
+_PRICE_STATS_UPSERT = """
+    INSERT INTO avg_positions_info AS a (
+        category, sub_category, name, positions_count, purchase_price_sum, sale_price_sum,
+        first_purchase_price, last_purchase_price, avg_purchase_price,
+        first_sale_price, last_sale_price, avg_sale_price
+    )
+    SELECT
+        g.category, g.sub_category, g.name,
+        sum(d.cnt), sum(d.purchase_sum), sum(d.sale_sum),
+        (array_agg(d.purchase_price ORDER BY d.ord_at, d.ord_id) FILTER (WHERE d.cnt > 0))[1],
+        (array_agg(d.purchase_price ORDER BY d.ord_at DESC, d.ord_id DESC) FILTER (WHERE d.cnt > 0))[1],
+        sum(d.purchase_sum) / nullif(sum(d.cnt), 0),
+        (array_agg(d.sale_price ORDER BY d.ord_at, d.ord_id) FILTER (WHERE d.cnt > 0))[1],
+        (array_agg(d.sale_price ORDER BY d.ord_at DESC, d.ord_id DESC) FILTER (WHERE d.cnt > 0))[1],
+        sum(d.sale_sum) / nullif(sum(d.cnt), 0)
+    FROM ({deltas}) AS d
+    CROSS JOIN LATERAL (
+        VALUES (d.category, d.sub_category, d.name),
+               (d.category, d.sub_category, ''),
+               (d.category, '', '')
+    ) AS g(category, sub_category, name)
+    GROUP BY g.category, g.sub_category, g.name
+    ORDER BY g.category, g.sub_category, g.name
+    ON CONFLICT (category, sub_category, name) DO UPDATE SET
+        positions_count = a.positions_count + EXCLUDED.positions_count,
+        purchase_price_sum = a.purchase_price_sum + EXCLUDED.purchase_price_sum,
+        sale_price_sum = a.sale_price_sum + EXCLUDED.sale_price_sum,
+        first_purchase_price = coalesce(a.first_purchase_price, EXCLUDED.first_purchase_price),
+        last_purchase_price = coalesce(EXCLUDED.last_purchase_price, a.last_purchase_price),
+        avg_purchase_price = (a.purchase_price_sum + EXCLUDED.purchase_price_sum)
+            / nullif(a.positions_count + EXCLUDED.positions_count, 0),
+        first_sale_price = coalesce(a.first_sale_price, EXCLUDED.first_sale_price),
+        last_sale_price = coalesce(EXCLUDED.last_sale_price, a.last_sale_price),
+        avg_sale_price = (a.sale_price_sum + EXCLUDED.sale_price_sum)
+            / nullif(a.positions_count + EXCLUDED.positions_count, 0),
+        updated_at = now()
+"""
+
+_ADDED = """
+    SELECT n.category, n.sub_category, n.name, 1 AS cnt,
+           n.purchase_price AS purchase_sum, n.sale_price AS sale_sum,
+           n.purchase_price, n.sale_price, {at} AS ord_at, n.id AS ord_id
+    FROM {source}
+"""
+_REMOVED = """
+    SELECT o.category, o.sub_category, o.name, -1 AS cnt,
+           -o.purchase_price AS purchase_sum, -o.sale_price AS sale_sum,
+           NULL::float8 AS purchase_price, NULL::float8 AS sale_price,
+           o.updated_at AS ord_at, o.id AS ord_id
+    FROM {source}
+"""
+# UPDATE учитывается, только если поменялась цена или группа
+_CHANGED = """
+    old_rows o JOIN new_rows n ON n.id = o.id
+    WHERE (o.category, o.sub_category, o.name, o.purchase_price, o.sale_price)
+          IS DISTINCT FROM (n.category, n.sub_category, n.name, n.purchase_price, n.sale_price)
+"""
+
+# Дельтой first/last не откатить: в статистике только цены, без id и created_at позиции.
+# first перечитывается из positions, если ушедшая строка могла его задать (её цены
+# совпадают с first), группа опустела или в неё перенесли позицию (она может быть
+# раньше текущей first); last — если ушедшая строка совпадает с last. Порядок — как
+# в полном пересчёте (jobs.recompute_position_stats): самая ранняя по created_at и
+# последняя по updated_at; у опустевшей группы — null без чтения positions.
+# Запрос на каждый уровень свой: условие уровня известно заранее (one-time filter),
+# first читается по индексу (category[, sub_category], created_at), уровень имени —
+# по натуральному ключу (category, sub_category, name, provider_id).
+_GROUP_LEVELS = (
+    "r.sub_category = '' AND p.category = r.category",
+    "r.sub_category <> '' AND r.name = '' "
+    "AND p.category = r.category AND p.sub_category = r.sub_category",
+    "r.name <> '' "
+    "AND p.category = r.category AND p.sub_category = r.sub_category AND p.name = r.name",
+)
+
+
+def _group_prices(flag: str, order: str) -> str:
+    return " UNION ALL ".join(
+        f"(SELECT p.purchase_price, p.sale_price FROM positions p "
+        f"WHERE r.{flag} AND r.positions_count > 0 AND {level} ORDER BY {order} LIMIT 1)"
+        for level in _GROUP_LEVELS
+    )
+
+
+_PRICE_STATS_REPAIR = """
+    WITH stale AS (
+        SELECT s.category, s.sub_category, s.name, s.positions_count,
+               bool_or(s.need_first) AS need_first, bool_or(s.need_last) AS need_last
+        FROM (
+            SELECT a.category, a.sub_category, a.name, a.positions_count,
+                   a.positions_count = 0
+                   OR (o.purchase_price, o.sale_price)
+                      IS NOT DISTINCT FROM (a.first_purchase_price, a.first_sale_price)
+                   AS need_first,
+                   a.positions_count = 0
+                   OR (o.purchase_price, o.sale_price)
+                      IS NOT DISTINCT FROM (a.last_purchase_price, a.last_sale_price)
+                   AS need_last
+            FROM (
+                SELECT o.category, o.sub_category, o.name, o.purchase_price, o.sale_price
+                FROM {source}
+            ) AS o
+            CROSS JOIN LATERAL (
+                VALUES (o.category, o.sub_category, o.name),
+                       (o.category, o.sub_category, ''),
+                       (o.category, '', '')
+            ) AS g(category, sub_category, name)
+            JOIN avg_positions_info a
+              ON (a.category, a.sub_category, a.name) = (g.category, g.sub_category, g.name)
+            {moved}
+        ) AS s
+        GROUP BY s.category, s.sub_category, s.name, s.positions_count
+        HAVING bool_or(s.need_first) OR bool_or(s.need_last)
+    )
+    UPDATE avg_positions_info AS a SET
+        first_purchase_price = CASE WHEN r.need_first THEN f.purchase_price ELSE a.first_purchase_price END,
+        first_sale_price = CASE WHEN r.need_first THEN f.sale_price ELSE a.first_sale_price END,
+        last_purchase_price = CASE WHEN r.need_last THEN l.purchase_price ELSE a.last_purchase_price END,
+        last_sale_price = CASE WHEN r.need_last THEN l.sale_price ELSE a.last_sale_price END
+    FROM stale r
+    LEFT JOIN LATERAL ({first}) AS f ON true
+    LEFT JOIN LATERAL ({last}) AS l ON true
+    WHERE (a.category, a.sub_category, a.name) = (r.category, r.sub_category, r.name)
+""".replace(
+    "{first}", _group_prices("need_first", "p.created_at, p.id")
+).replace(
+    "{last}", _group_prices("need_last", "p.updated_at DESC, p.id DESC")
+)
+
+# группы, в которые UPDATE перенёс позицию: last уже верный (у неё последний updated_at)
+_MOVED_IN = """
+            UNION ALL
+            SELECT a.category, a.sub_category, a.name, a.positions_count, true, false
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            CROSS JOIN LATERAL (
+                VALUES (n.category, n.sub_category, n.name),
+                       (n.category, n.sub_category, ''),
+                       (n.category, '', '')
+            ) AS g(category, sub_category, name)
+            JOIN avg_positions_info a
+              ON (a.category, a.sub_category, a.name) = (g.category, g.sub_category, g.name)
+            WHERE (o.category, o.sub_category, o.name)
+                  IS DISTINCT FROM (n.category, n.sub_category, n.name)
+"""
+
+# событие -> (transition tables, дельты, ремонт first/last или None)
+_PRICE_STATS_TRIGGERS = {
+    "insert": (
+        "NEW TABLE AS new_rows",
+        _ADDED.format(at="n.created_at", source="new_rows n"),
+        None,
+    ),
+    "update": (
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        _REMOVED.format(source=_CHANGED)
+        + " UNION ALL "
+        + _ADDED.format(at="n.updated_at", source=_CHANGED),
+        _PRICE_STATS_REPAIR.format(source=_CHANGED, moved=_MOVED_IN),
+    ),
+    "delete": (
+        "OLD TABLE AS old_rows",
+        _REMOVED.format(source="old_rows o"),
+        _PRICE_STATS_REPAIR.format(source="old_rows o", moved=""),
+    ),
+}
+
+for _event, (_transition, _deltas, _repair) in _PRICE_STATS_TRIGGERS.items():
+    event.listen(
+        PositionsModel.__table__,
+        "after_create",
+        DDL(
+            f"""
+            CREATE OR REPLACE FUNCTION position_price_stats_on_{_event}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {_PRICE_STATS_UPSERT.format(deltas=_deltas)};
+                {_repair + ";" if _repair else ""}
+                RETURN NULL;
+            END $$
+            """
+        ),
+    )
+    event.listen(
+        PositionsModel.__table__,
+        "after_create",
+        DDL(
+            f"""
+            CREATE TRIGGER positions_price_stats_{_event} AFTER {_event.upper()} ON positions
+            REFERENCING {_transition}
+            FOR EACH STATEMENT EXECUTE FUNCTION position_price_stats_on_{_event}()
+            """
+        ),
+    )
+
+
+# Канал NOTIFY: позиция ушла ниже min_balance (event = "low") или вернулась к нему
+# ("restored") — любой UPDATE: PATCH, bulk, движения остатка, смена min_balance.
+# NOTIFY доставляется после коммита; payload — JSON (лимит 8000 байт, name короткий).
+LOW_STOCK_CHANNEL = "positions_low_stock"
+
+event.listen(
+    PositionsModel.__table__,
+    "after_create",
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION positions_low_stock_notify() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('{LOW_STOCK_CHANNEL}', json_build_object(
+                'event', CASE WHEN n.balance < n.min_balance THEN 'low' ELSE 'restored' END,
+                'id', n.id,
+                'category', n.category,
+                'sub_category', n.sub_category,
+                'name', n.name,
+                'balance', n.balance,
+                'min_balance', n.min_balance,
+                'provider_id', n.provider_id
+            )::text)
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE coalesce(o.balance < o.min_balance, false)
+                  <> coalesce(n.balance < n.min_balance, false);
+            RETURN NULL;
+        END $$
+        """
+    ),
+)
+event.listen(
+    PositionsModel.__table__,
+    "after_create",
+    DDL(
+        """
+        CREATE TRIGGER positions_low_stock_notify AFTER UPDATE ON positions
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION positions_low_stock_notify()
+        """
+    ),
+)
+
+# версия списка для conditional GET (ETag / Last-Modified GET /positions)
+track_collection_version(PositionsModel.__table__)
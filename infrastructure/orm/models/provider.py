@@ -6,6 +6,7 @@ from sqlalchemy import func, ForeignKey, UUID, inspect
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from infrastructure.orm.models import Base
+from infrastructure.orm.models.collection_version import track_collection_version
 
 
 class ProviderManagerModel(Base):
@@ -27,7 +28,7 @@ class ProviderManagerModel(Base):
     name: Mapped[str] = mapped_column(nullable=False)
 
     provider: Mapped["ProviderModel"] = relationship(
-        back_populates="managers", lazy="selectin"
+        back_populates="managers", lazy="raise_on_sql"
     )
 
     created_at: Mapped[datetime] = mapped_column(
@@ -37,10 +38,6 @@ class ProviderManagerModel(Base):
         server_default=func.now(), onupdate=func.now(), nullable=False
     )
 
-    def to_dict(self) -> dict[str, Any]:
-        mapper = inspect(self).mapper
-        return {attr.key: getattr(self, attr.key) for attr in mapper.column_attrs}
-
     @classmethod
     def from_dict_strict(
         cls,
@@ -48,7 +45,7 @@ class ProviderManagerModel(Base):
         *,
         allow_id: bool = False,
     ) -> "ProviderManagerModel":
-        cols = {attr.key for attr in inspect(cls).mapper.column_attrs}
+        cols = set(cls.column_keys())
 
         forbidden = {"created_at", "updated_at"}
         if not allow_id:
@@ -103,7 +100,7 @@ class ProviderModel(Base):
     managers: Mapped[list["ProviderManagerModel"]] = relationship(
         back_populates="provider",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
     )
 
     created_at: Mapped[datetime] = mapped_column(
@@ -113,10 +110,6 @@ class ProviderModel(Base):
         server_default=func.now(), onupdate=func.now(), nullable=False
     )
 
-    def to_dict(self) -> dict[str, Any]:
-        mapper = inspect(self).mapper
-        return {attr.key: getattr(self, attr.key) for attr in mapper.column_attrs}
-
     @classmethod
     def from_dict_strict(
         cls,
@@ -124,7 +117,7 @@ class ProviderModel(Base):
         *,
         allow_id: bool = False,
     ) -> "ProviderModel":
-        cols = {attr.key for attr in inspect(cls).mapper.column_attrs}
+        cols = set(cls.column_keys())
 
         forbidden = {"created_at", "updated_at"}
         if not allow_id:
@@ -157,3 +150,7 @@ class ProviderModel(Base):
             raise ValueError(f"Missing required fields for {cls.__name__}: {missing}")
 
         return obj
+
+
+# версия списка для conditional GET (ETag / Last-Modified GET /providers)
+track_collection_version(ProviderModel.__table__)
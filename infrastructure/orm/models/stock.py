@@ -0,0 +1,106 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DDL, BigInteger, Identity, Index, event, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from infrastructure.orm.models.base import Base
+from infrastructure.orm.models.position import PositionsModel
+
+
+class StockMovementModel(Base):
+    """
+    Журнал движений остатка (append-only): одна строка на изменение positions.balance.
+    Пишется триггерами на positions (см. ниже), поэтому ловит любой путь записи —
+    stock-movements, PATCH, bulk, импорт, удаление.
+    """
+
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        # balance_at: сумма delta по позиции после снимка — index-only scan
+        Index(
+            "ix_stock_movements_position_id_created_at",
+            "position_id",
+            "created_at",
+            postgresql_include=["delta"],
+        ),
+        # компакция: WHERE created_at <= cutoff; таблица только дописывается, BRIN почти бесплатен
+        Index("ix_stock_movements_created_at_brin", "created_at", postgresql_using="brin"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    # без FK: история переживает удаление позиции
+    position_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    delta: Mapped[int] = mapped_column(nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
+
+
+class StockSnapshotModel(Base):
+    """
+    Остаток позиции на момент taken_at: в него свёрнуты все движения до taken_at,
+    строки журнала старше этого удалены компакцией.
+    """
+
+    __tablename__ = "stock_snapshots"
+
+    position_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    taken_at: Mapped[datetime] = mapped_column(primary_key=True)
+    balance: Mapped[int] = mapped_column(nullable=False)
+
+
+# Триггеры уровня statement с transition tables: один INSERT в журнал на весь UPDATE/INSERT/DELETE,
+# а не на каждую строку, — пакетные записи в positions не замедляются построчной вставкой.
+_LEDGER_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION stock_ledger_on_insert() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO stock_movements (position_id, delta)
+        SELECT n.id, n.balance FROM new_rows n
+        WHERE coalesce(n.balance, 0) <> 0;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION stock_ledger_on_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO stock_movements (position_id, delta)
+        SELECT n.id, coalesce(n.balance, 0) - coalesce(o.balance, 0)
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE coalesce(n.balance, 0) <> coalesce(o.balance, 0);
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION stock_ledger_on_delete() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO stock_movements (position_id, delta)
+        SELECT o.id, -o.balance FROM old_rows o
+        WHERE coalesce(o.balance, 0) <> 0;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE TRIGGER positions_stock_ledger_insert AFTER INSERT ON positions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stock_ledger_on_insert()
+    """,
+    """
+    CREATE TRIGGER positions_stock_ledger_update AFTER UPDATE ON positions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stock_ledger_on_update()
+    """,
+    """
+    CREATE TRIGGER positions_stock_ledger_delete AFTER DELETE ON positions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION stock_ledger_on_delete()
+    """,
+)
+
+for _statement in _LEDGER_DDL:
+    event.listen(PositionsModel.__table__, "after_create", DDL(_statement))
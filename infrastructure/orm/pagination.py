@@ -0,0 +1,25 @@
+import base64
+import uuid
+from datetime import datetime
+
+
+def encode_cursor(created_at: datetime, item_id: uuid.UUID) -> str:
+    """
+    Курсор keyset-пагинации по (created_at, id).
+    Для клиента это непрозрачная строка, внутри — base64 от "created_at|id".
+    """
+    raw = f"{created_at.isoformat()}|{item_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Обратное преобразование. На любой мусор — ValueError.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(item_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
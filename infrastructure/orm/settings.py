@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -15,6 +16,68 @@ class Settings(BaseSettings):
     DB_PORT: str | None = os.environ.get("DB_PORT")
     DB_NAME: str | None = os.environ.get("DB_NAME")
 
+    # пул соединений (на один воркер uvicorn)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # кэш prepared statements на соединение (SQLAlchemy + asyncpg); 0 — выключить оба
+    # и именовать statement'ы уникально: нужно за pgbouncer в режиме transaction
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    # реплики для read-only сессий: полные URL через запятую
+    DB_REPLICA_URLS: str | None = None
+    DB_REPLICA_STRATEGY: Literal["round_robin", "least_connections"] = "round_robin"
+    # сколько секунд после записи читать из primary (read-your-writes)
+    DB_READ_YOUR_WRITES_SECONDS: float = 2.0
+    # на сколько секунд исключать недоступную реплику
+    DB_REPLICA_RETRY_SECONDS: float = 10.0
+
+    # read-through кэш get_by_id (in-process LRU + TTL)
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_SIZE: int = 10_000
+    CACHE_TTL_SECONDS: float = 30.0
+
+    # максимум id в одном POST /.../batch-get
+    BATCH_GET_MAX_IDS: int = 1000
+
+    # /positions/changes не отдаёт изменения моложе N секунд: транзакция, начатая
+    # раньше, но закоммиченная позже, не должна проскочить мимо курсора клиента
+    CHANGES_SETTLE_SECONDS: float = 2.0
+
+    # логирование (services/logger_setup.setup_logging)
+    LOG_LEVEL: str = "INFO"
+    LOG_DIR: str = "logs"
+    # запись в файл/консоль из фонового потока, в event loop — только put в очередь
+    LOG_QUEUE: bool = True
+    LOG_JSON: bool = False
+    # из INFO/DEBUG-сообщений с одинаковым шаблоном писать каждое N-е
+    LOG_SAMPLE_EVERY: int = 1
+
+    # /metrics: латентность роутов, in-flight запросы, время/строки SQL, пул
+    METRICS_ENABLED: bool = True
+
+    # бюджет БД на один HTTP-запрос (0 — не проверять): превышение пишется в лог
+    DB_QUERY_BUDGET: int = 30
+    DB_QUERY_TIME_BUDGET_MS: float = 500.0
+    # один и тот же SQL столько раз за запрос — подозрение на N+1
+    DB_REPEATED_QUERY_THRESHOLD: int = 10
+    # statement дольше этого пишется в лог (0 — выключено)
+    DB_SLOW_QUERY_MS: float = 200.0
+
+    # журнал движений остатка: старше N дней сворачивается в снимки stock_snapshots
+    STOCK_LEDGER_RETENTION_DAYS: float = 30.0
+    # как часто фоновая задача запускает компакцию (0 — не запускать, только вручную)
+    STOCK_COMPACTION_INTERVAL_SECONDS: float = 3600.0
+    # позиций на транзакцию компакции (все их движения до cutoff сворачиваются разом)
+    STOCK_COMPACTION_BATCH_SIZE: int = 1_000
+    # как часто фоновая задача обновляет сводку по складу inventory_rollup (0 — не обновлять)
+    INVENTORY_ROLLUP_REFRESH_SECONDS: float = 60.0
+    # SSE low-stock: очередь событий на подписчика (переполнил — отключается) и heartbeat
+    LOW_STOCK_EVENTS_QUEUE_SIZE: int = 1000
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+
     @property
     def database_url(self) -> str:
 
@@ -22,3 +85,9 @@ class Settings(BaseSettings):
             f"{self.DB_BRAND}+{self.DB_ENGINE}://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}"
             f":{self.DB_PORT}/{self.DB_NAME}"
         )
+
+    @property
+    def replica_urls(self) -> list[str]:
+        if not self.DB_REPLICA_URLS:
+            return []
+        return [u.strip() for u in self.DB_REPLICA_URLS.split(",") if u.strip()]
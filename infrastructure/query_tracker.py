@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from services.logger_setup import get_logger
+
+log = get_logger(__name__)
+
+# сколько символов SQL писать в лог/сообщение assert
+_STATEMENT_PREVIEW = 300
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """
+    Statement'ы, выполненные в области collect_queries(): число, суммарное время
+    и сколько раз встретился каждый текст SQL (повторы — признак N+1).
+    """
+
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Тексты SQL, выполненные не меньше threshold раз."""
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold]
+
+    def describe(self, limit: int = 10) -> str:
+        return "\n".join(
+            f"  {n} x {_preview(s)}" for s, n in self.statements.most_common(limit)
+        )
+
+
+_collectors: ContextVar[tuple[QueryStats, ...]] = ContextVar("db_query_collectors", default=())
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """
+    Считает statement'ы в текущем контексте (запрос, тест). Области вкладываются:
+    statement учитывается во всех открытых collect_queries().
+    """
+    stats = QueryStats()
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+@contextmanager
+def assert_max_queries(n: int) -> Iterator[QueryStats]:
+    """
+    Для тестов: падает с AssertionError, если внутри блока выполнено больше n statement'ов.
+
+        with assert_max_queries(2):
+            await client.get(f"/positions/{position_id}")
+    """
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > n:
+        raise AssertionError(
+            f"Expected at most {n} queries, got {stats.count}:\n{stats.describe()}"
+        )
+
+
+def _preview(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > _STATEMENT_PREVIEW:
+        return statement[:_STATEMENT_PREVIEW] + "..."
+    return statement
+
+
+def _value_shape(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def param_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    Форма bound-параметров без значений: типы и длины списков,
+    для executemany — число наборов и форма первого.
+    """
+    if executemany:
+        if not parameters:
+            return "0 x ()"
+        return f"{len(parameters)} x {param_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {_value_shape(v)}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(_value_shape(v) for v in parameters) + ")"
+    return _value_shape(parameters)
+
+
+# наблюдатель statement'ов: (statement, rowcount, elapsed), например метрики SQL
+StatementObserver = Callable[[str, int, float], None]
+
+
+class QueryTracker:
+    """
+    Единственный слушатель cursor execute на engine: отдаёт время каждого statement'а
+    в открытые collect_queries() и наблюдателям (метрики SQL), пишет в лог statement'ы
+    дольше slow_query секунд (с формой параметров, без значений).
+    """
+
+    def __init__(self, *, slow_query: float):
+        self.slow_query = slow_query
+        self.observers: list[StatementObserver] = []
+
+    def add_observer(self, observer: StatementObserver) -> None:
+        self.observers.append(observer)
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+        if event.contains(sync_engine, "before_cursor_execute", self._before_cursor_execute):
+            return
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        for stats in _collectors.get():
+            stats.record(statement, elapsed)
+        if self.observers:
+            rowcount = cursor.rowcount
+            for observer in self.observers:
+                observer(statement, rowcount, elapsed)
+        if self.slow_query and elapsed >= self.slow_query:
+            log.warning(
+                "Slow query %.1f ms, params %s: %s",
+                elapsed * 1000,
+                param_shape(parameters, executemany),
+                _preview(statement),
+            )
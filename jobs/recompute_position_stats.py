@@ -0,0 +1,38 @@
+"""
+Полный пересчёт статистики цен (avg_positions_info) из positions.
+
+Штатно статистику ведут триггеры на positions; пересчёт — ремонт после расхождений
+(погрешность float-сумм, правки в обход триггеров, восстановление из бэкапа).
+На время пересчёта запись в positions ждёт (SHARE ROW EXCLUSIVE), чтение не блокируется.
+
+Запуск: python -m jobs.recompute_position_stats
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+
+from api.dependencies import position_stats_use_cases
+from infrastructure.db_helper import db_helper
+
+
+def main() -> None:
+    argparse.ArgumentParser(description=__doc__).parse_args()
+
+    async def run() -> int | None:
+        try:
+            return await position_stats_use_cases.recompute()
+        finally:
+            await db_helper.dispose()
+
+    started = time.perf_counter()
+    rows = asyncio.run(run())
+    if rows is None:
+        sys.exit("position stats recompute failed, see log")
+    print(f"recomputed {rows} position stats rows in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
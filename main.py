@@ -1,27 +1,116 @@
 from __future__ import annotations
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 import uvicorn
 
-from infrastructure.db_helper import db_helper
+from infrastructure.db_helper import db_helper, settings
+from infrastructure.db_metrics import setup_db_metrics
+from infrastructure.query_tracker import QueryTracker
+from api.middleware import (
+    MetricsMiddleware,
+    QueryBudgetMiddleware,
+    ReadYourWritesMiddleware,
+    UnitOfWorkMiddleware,
+)
 from api.routes.providers import router as providers_router
 from api.routes.providers_managers import router as managers_router
 from api.routes.positions import router as positions_router
+from api.routes.cache import router as cache_router
+from api.routes.db import router as db_router
+from api.routes.metrics import router as metrics_router
+from api.dependencies import inventory_use_cases, low_stock_events, stock_ledger_use_cases
+from services.logger_setup import get_logger, setup_logging
+
+REPLICA_CHECK_INTERVAL = 5.0
+
+log = get_logger(__name__)
+
+
+async def _watch_replicas() -> None:
+    while True:
+        await db_helper.check_replicas()
+        await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+
+
+async def _compact_stock_ledger() -> None:
+    while True:
+        await asyncio.sleep(settings.STOCK_COMPACTION_INTERVAL_SECONDS)
+        try:
+            await stock_ledger_use_cases.compact(
+                retention_days=settings.STOCK_LEDGER_RETENTION_DAYS,
+                batch_size=settings.STOCK_COMPACTION_BATCH_SIZE,
+            )
+        except Exception as e:
+            log.error("Stock ledger compaction failed, %s", e)
+
+
+async def _refresh_inventory_rollup() -> None:
+    # первый refresh сразу: после старта сводка не ждёт целый интервал
+    while True:
+        await inventory_use_cases.refresh_summary()
+        await asyncio.sleep(settings.INVENTORY_ROLLUP_REFRESH_SECONDS)
+
+
+def configure_logging() -> None:
+    # не при импорте: import main не должен поднимать поток QueueListener
+    setup_logging(
+        log_dir=settings.LOG_DIR,
+        level=settings.LOG_LEVEL,
+        use_queue=settings.LOG_QUEUE,
+        json_format=settings.LOG_JSON,
+        sample_every=settings.LOG_SAMPLE_EVERY,
+    )
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    configure_logging()
+    tasks = []
+    if db_helper.replicas:
+        tasks.append(asyncio.create_task(_watch_replicas()))
+    if settings.STOCK_COMPACTION_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(_compact_stock_ledger()))
+    if settings.INVENTORY_ROLLUP_REFRESH_SECONDS > 0:
+        tasks.append(asyncio.create_task(_refresh_inventory_rollup()))
     yield
-    await db_helper.engine.dispose()
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await low_stock_events.close()
+    await db_helper.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
 
+# одна сессия на запрос; ReadYourWrites добавляется позже — он снаружи и видит commit
+app.add_middleware(UnitOfWorkMiddleware, db=db_helper)
+app.add_middleware(
+    QueryBudgetMiddleware,
+    max_queries=settings.DB_QUERY_BUDGET,
+    max_duration=settings.DB_QUERY_TIME_BUDGET_MS / 1000,
+    repeat_threshold=settings.DB_REPEATED_QUERY_THRESHOLD,
+)
+query_tracker = QueryTracker(slow_query=settings.DB_SLOW_QUERY_MS / 1000)
+for engine in [db_helper.engine] + [r.engine for r in db_helper.replicas]:
+    query_tracker.instrument(engine)
+if db_helper.replicas:
+    app.add_middleware(ReadYourWritesMiddleware, window=db_helper.read_your_writes)
+if settings.METRICS_ENABLED:
+    # самый внешний: время запроса включает commit и работу остальных middleware
+    app.add_middleware(MetricsMiddleware)
+    setup_db_metrics(db_helper, query_tracker)
+
 
 #Роутеры
 app.include_router(providers_router)
 app.include_router(managers_router)
 app.include_router(positions_router)
+app.include_router(cache_router)
+app.include_router(db_router)
+app.include_router(metrics_router)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,96 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import itertools
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
 from pathlib import Path
 from typing import Optional
 
+import orjson
+
+# стандартные атрибуты LogRecord — всё остальное (extra=...) попадает в JSON как есть
+_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна строка JSON на запись: ts, level, logger, line, message (+ exc_info и extra-поля).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        return orjson.dumps(payload, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только каждую every-ю запись уровня <= max_level для каждого шаблона
+    сообщения (logger + msg до подстановки %-аргументов). WARNING и выше — всегда.
+    """
+
+    def __init__(self, every: int, max_level: int = logging.INFO):
+        super().__init__()
+        self.every = every
+        self.max_level = max_level
+        self._counters: dict[tuple[str, object], itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every <= 1 or record.levelno > self.max_level:
+            return True
+        key = (record.name, record.msg)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = itertools.count()
+        return next(counter) % self.every == 0
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в event loop. Стандартный prepare
+    в 3.11 вклеивает traceback в msg и обнуляет exc_info — JsonFormatter в потоке
+    listener'а уже не видит исключения. Здесь подставляются только %-аргументы
+    (они могут измениться до записи), exc_info/exc_text остаются в записи.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def stop_logging_listener() -> None:
+    """Дописывает очередь и останавливает фоновый поток (вызывается и через atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging_listener)
+
 
 def setup_logging(
     *,
@@ -16,12 +101,21 @@ def setup_logging(
     file_level: Optional[str] = None,
     max_bytes: int = 10 * 1024 * 1024,  # 10 MB
     backup_count: int = 10,
+    use_queue: bool = True,
+    json_format: bool = False,
+    sample_every: int = 1,
 ) -> None:
     """
     Настраивает логирование для приложения.
     - Пишет в консоль + в файл с ротацией.
     - Уровни можно задать отдельно для консоли/файла.
+    - use_queue: в event loop запись только кладётся в очередь, вывод в консоль/файл
+      и ротацию делает фоновый поток QueueListener.
+    - json_format: одна строка JSON на запись вместо текстового формата.
+    - sample_every: из INFO/DEBUG-сообщений с одинаковым шаблоном пишется каждое N-е.
     """
+    global _listener
+    stop_logging_listener()
 
     # уровни
     level = (level or "INFO").upper()
@@ -34,6 +128,8 @@ def setup_logging(
 
     logfile = log_path / f"{app_name}.log"
 
+    formatter = "json" if json_format else "standard"
+
     # единый формат
     fmt = "%(asctime)s | %(levelname)s | %(name)s:%(lineno)d | %(message)s"
     datefmt = "%Y-%m-%d %H:%M:%S"
@@ -43,18 +139,19 @@ def setup_logging(
         "disable_existing_loggers": False,
         "formatters": {
             "standard": {"format": fmt, "datefmt": datefmt},
+            "json": {"()": JsonFormatter, "datefmt": datefmt},
         },
         "handlers": {
             "console": {
                 "class": "logging.StreamHandler",
                 "level": console_level,
-                "formatter": "standard",
+                "formatter": formatter,
                 "stream": "ext://sys.stdout",
             },
             "file": {
                 "class": "logging.handlers.RotatingFileHandler",
                 "level": file_level,
-                "formatter": "standard",
+                "formatter": formatter,
                 "filename": str(logfile),
                 "maxBytes": max_bytes,
                 "backupCount": backup_count,
@@ -83,6 +180,26 @@ def setup_logging(
 
     logging.config.dictConfig(config)
 
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    if use_queue:
+        # dictConfig в 3.11 ещё не умеет queue_handler — переставляем руками;
+        # SimpleQueue без ограничения: put не блокирует event loop
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        front = RecordQueueHandler(log_queue)
+        for handler in handlers:
+            root.removeHandler(handler)
+        root.addHandler(front)
+        _listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+        handlers = [front]
+
+    if sample_every > 1:
+        for handler in handlers:
+            handler.addFilter(SamplingFilter(sample_every))
+
 
 def get_logger(name: str | None = None) -> logging.Logger:
     return logging.getLogger(name if name else "storehouse")
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Sequence
+
+# границы бакетов (секунды) для задержек: от 0.5 мс до 10 с
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    Простая гистограмма с фиксированными бакетами (как в Prometheus):
+    counts[i] — число наблюдений <= buckets[i], последний бакет — +Inf.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        cumulative: dict[str, int] = {}
+        total = 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            cumulative[repr(bound)] = total
+        cumulative["+Inf"] = self.count
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+# границы бакетов для числа строк в результате SQL
+ROW_BUCKETS: tuple[float, ...] = (0, 1, 10, 100, 1000, 10_000, 100_000)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Family:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    def expose(self) -> list[str]:
+        raise NotImplementedError
+
+
+class CounterVec(_Family):
+    """
+    Монотонный счётчик с метками: inc("GET", "/positions").
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def expose(self) -> list[str]:
+        lines = self._header()
+        for labels, value in self.values.items():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class GaugeVec(CounterVec):
+    """
+    Значение, которое может и расти, и убывать (in-flight запросы, размер пула).
+    """
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+
+class HistogramVec(_Family):
+    """
+    Семейство Histogram с метками; гистограмма на набор меток создаётся при первом observe.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.histograms: dict[Labels, Histogram] = {}
+
+    def labels(self, *labels: str) -> Histogram:
+        histogram = self.histograms.get(labels)
+        if histogram is None:
+            histogram = self.histograms[labels] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    def expose(self) -> list[str]:
+        lines = self._header()
+        for labels, histogram in self.histograms.items():
+            lines.extend(self._expose_one(labels, histogram))
+        return lines
+
+    def _expose_one(self, labels: Labels, histogram: Histogram) -> list[str]:
+        snapshot = histogram.snapshot()
+        lines = []
+        for le, n in snapshot["buckets"].items():
+            bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % le)
+            lines.append(f"{self.name}_bucket{bucket_labels} {n}")
+        suffix = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{suffix} {_format_value(snapshot['sum'])}")
+        lines.append(f"{self.name}_count{suffix} {snapshot['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Набор метрик для /metrics. Кроме постоянных семейств можно зарегистрировать
+    collector — функцию, которая строит семейства в момент scrape (например, из пула).
+    """
+
+    def __init__(self):
+        self.families: list[_Family] = []
+        self.collectors: list[Callable[[], Iterable[_Family]]] = []
+
+    def register(self, family: _Family) -> _Family:
+        self.families.append(family)
+        return family
+
+    def register_collector(self, collector: Callable[[], Iterable[_Family]]) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)."""
+        lines: list[str] = []
+        for family in self.families:
+            lines.extend(family.expose())
+        for collector in self.collectors:
+            for family in collector():
+                lines.extend(family.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
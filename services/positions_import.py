@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+# порядок колонок staging-таблицы (см. PositionsMetadataProvider.copy_import)
+STAGING_COLUMNS = (
+    "line_no",
+    "category",
+    "sub_category",
+    "name",
+    "description",
+    "balance",
+    "min_balance",
+    "purchase_price",
+    "sale_price",
+    "markup",
+    "provider_id",
+    "provider_manager_id",
+)
+
+_REQUIRED_TEXT = ("category", "sub_category", "name", "description")
+_REQUIRED_FLOAT = ("purchase_price", "sale_price", "markup")
+_OPTIONAL_INT = ("balance", "min_balance")
+_OPTIONAL_UUID = ("provider_id", "provider_manager_id")
+
+
+@dataclass
+class ParseReport:
+    """
+    Итог разбора файла: сколько строк отброшено и первые max_errors причин.
+    """
+
+    rejected: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    max_errors: int = 100
+
+    def reject(self, line_no: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line_no, "error": error})
+
+
+async def _iter_csv_text(
+    chunks: AsyncIterator[bytes], encoding: str
+) -> AsyncIterator[str]:
+    """
+    Склеивает байтовые чанки в куски текста, которые заканчиваются на границе записи:
+    режем только по переводу строки и только вне кавычек (чётное число '"'),
+    чтобы многострочные значения в кавычках не разрывались между кусками.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    tail = ""
+    async for chunk in chunks:
+        text = tail + decoder.decode(chunk)
+        lines = text.split("\n")
+        tail = lines.pop()
+
+        cut = 0
+        quotes = 0
+        for i, line in enumerate(lines):
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                cut = i + 1
+        if cut:
+            yield "\n".join(lines[:cut]) + "\n"
+        if cut < len(lines):
+            tail = "\n".join(lines[cut:] + [tail])
+
+    tail += decoder.decode(b"", final=True)
+    if tail.strip():
+        yield tail
+
+
+def _to_record(line_no: int, row: list[str], index: dict[str, int]) -> tuple:
+    def get(col: str) -> str:
+        i = index.get(col)
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    values: dict[str, Any] = {"line_no": line_no}
+    for col in _REQUIRED_TEXT:
+        v = get(col)
+        if not v:
+            raise ValueError(f"{col} is required")
+        values[col] = v
+    for col in _REQUIRED_FLOAT:
+        v = get(col)
+        if not v:
+            raise ValueError(f"{col} is required")
+        try:
+            values[col] = float(v.replace(",", "."))
+        except ValueError:
+            raise ValueError(f"{col} is not a number: {v!r}") from None
+    for col in _OPTIONAL_INT:
+        v = get(col)
+        try:
+            values[col] = int(v) if v else None
+        except ValueError:
+            raise ValueError(f"{col} is not an integer: {v!r}") from None
+    for col in _OPTIONAL_UUID:
+        v = get(col)
+        try:
+            values[col] = uuid.UUID(v) if v else None
+        except ValueError:
+            raise ValueError(f"{col} is not a UUID: {v!r}") from None
+
+    return tuple(values[c] for c in STAGING_COLUMNS)
+
+
+async def iter_position_records(
+    chunks: AsyncIterator[bytes],
+    *,
+    delimiter: str,
+    report: ParseReport,
+    batch_size: int = 5000,
+    encoding: str = "utf-8-sig",
+) -> AsyncIterator[list[tuple]]:
+    """
+    Потоково разбирает CSV/TSV с заголовком и отдаёт пачки записей в порядке STAGING_COLUMNS.
+    Невалидные строки не прерывают импорт — они попадают в report.
+    Ошибка формата всего файла (нет заголовка/обязательных колонок) -> ValueError.
+    """
+    index: dict[str, int] | None = None
+    line_no = 0
+    batch: list[tuple] = []
+
+    async for text in _iter_csv_text(chunks, encoding):
+        for row in csv.reader(io.StringIO(text, newline=""), delimiter=delimiter):
+            line_no += 1
+            if index is None:
+                index = {name.strip().lower(): i for i, name in enumerate(row)}
+                missing = [
+                    c for c in _REQUIRED_TEXT + _REQUIRED_FLOAT if c not in index
+                ]
+                if missing:
+                    raise ValueError(f"Missing required columns: {missing}")
+                continue
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                batch.append(_to_record(line_no, row, index))
+            except ValueError as e:
+                report.reject(line_no, str(e))
+                continue
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if index is None:
+        raise ValueError("Empty file")
+    if batch:
+        yield batch
@@ -0,0 +1,68 @@
+"""
+Тесты ходят в настоящий Postgres (DB_* из окружения / .env), но в отдельную БД
+<DB_NAME>_test (или TEST_DB_NAME): схема в ней пересоздаётся на каждый прогон,
+рабочая БД не трогается. Нет Postgres — тесты пропускаются.
+"""
+from __future__ import annotations
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+# до импорта приложения: Settings читает окружение при импорте
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME") or f"{os.environ.get('DB_NAME', 'crmapp')}_test"
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import asyncpg  # noqa: E402
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from infrastructure.cache import entity_cache  # noqa: E402
+from infrastructure.db_helper import db_helper  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def anyio_backend() -> str:
+    # один event loop на сессию: соединения пула engine к нему привязаны
+    return "asyncio"
+
+
+async def _ensure_database() -> None:
+    url = db_helper.engine.url
+    params = dict(
+        user=url.username,
+        password=url.password,
+        host=url.host or None,
+        port=url.port,
+    )
+    try:
+        conn = await asyncpg.connect(database="postgres", **params)
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"Postgres is not available: {e}")
+    try:
+        exists = await conn.fetchval("SELECT 1 FROM pg_database WHERE datname = $1", url.database)
+        if not exists:
+            await conn.execute(f'CREATE DATABASE "{url.database}"')
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(scope="session")
+async def database():
+    await _ensure_database()
+    await db_helper.recreate_all()
+    yield db_helper
+    await db_helper.dispose()
+
+
+@pytest.fixture
+async def client(database):
+    import main
+
+    if entity_cache is not None:
+        # каждый тест начинает с холодного кэша: число запросов не зависит от порядка тестов
+        await entity_cache.backend.clear()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
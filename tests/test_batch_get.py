@@ -0,0 +1,34 @@
+"""
+Пакетный get by ids: ошибка загрузки из БД — 400 "Batch get failed", а не 500.
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+from infrastructure.orm.metadata_providers.providerManagerMetadataProvider import (
+    ProviderManagerMetadataProvider,
+)
+from infrastructure.orm.metadata_providers.providersMetadataProvider import (
+    ProviderMetadataProvider,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize(
+    ("path", "provider_cls"),
+    [
+        ("/providers/batch-get", ProviderMetadataProvider),
+        ("/managers/batch-get", ProviderManagerMetadataProvider),
+    ],
+)
+async def test_batch_get_load_failure(client, monkeypatch, path, provider_cls):
+    async def failing_load(self, ids):
+        raise ConnectionResetError("connection lost")
+
+    monkeypatch.setattr(provider_cls, "_load_many_by_ids", failing_load)
+    r = await client.post(path, json=[str(uuid.uuid4())])
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Batch get failed"
@@ -0,0 +1,90 @@
+"""
+Conditional GET списков: ETag и Last-Modified меняются при любом изменении выборки,
+включая удаление и запись транзакции, начатой раньше, — иначе клиент получит 304
+на устаревший список.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from infrastructure.db_helper import db_helper
+
+pytestmark = pytest.mark.anyio
+
+
+def _position(n: int) -> dict:
+    return {
+        "category": "tests",
+        "sub_category": "conditional-get",
+        "name": f"conditional-{n}",
+        "description": "d",
+        "balance": 1,
+        "min_balance": 0,
+        "purchase_price": 1.0,
+        "sale_price": 2.0,
+        "markup": 1.0,
+    }
+
+
+async def test_positions_delete_moves_validators(client):
+    r = await client.post("/positions/bulk", json=[_position(n) for n in range(2)])
+    position_id = r.json()["ok"][0]["id"]
+    first = await client.get("/positions", params={"limit": 1})
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    r = await client.get("/positions", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    # Last-Modified — с точностью до секунды: удаление должно попасть в следующую
+    await asyncio.sleep(1.1)
+    assert (await client.delete(f"/positions/{position_id}")).status_code == 204
+
+    r = await client.get("/positions", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    r = await client.get(
+        "/positions", params={"limit": 1}, headers={"If-Modified-Since": last_modified}
+    )
+    assert r.status_code == 200
+    assert r.headers["last-modified"] != last_modified
+
+
+async def test_positions_older_transaction_moves_etag(client):
+    r = await client.post("/positions/bulk", json=[_position(n) for n in range(10, 12)])
+    older_id, newer_id = [row["id"] for row in r.json()["ok"]]
+
+    async with db_helper.engine.connect() as conn:
+        # транзакция началась раньше: её updated_at (now()) меньше, чем у записи ниже
+        await conn.execute(text("SELECT 1"))
+        r = await client.patch(f"/positions/{newer_id}", json={"balance": 2})
+        assert r.status_code == 200
+        first = await client.get("/positions", params={"limit": 1})
+        etag = first.headers["etag"]
+
+        await conn.execute(
+            text("UPDATE positions SET balance = 5, updated_at = now() WHERE id = :id"),
+            {"id": older_id},
+        )
+        await conn.commit()
+
+    r = await client.get("/positions", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+async def test_providers_delete_moves_validators(client):
+    r = await client.post("/providers", json={"name": "c", "address": "a", "description": "d"})
+    provider_id = r.json()["id"]
+    first = await client.get("/providers")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    await asyncio.sleep(1.1)
+    assert (await client.delete(f"/providers/{provider_id}")).status_code == 204
+    r = await client.get("/providers", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    r = await client.get("/providers", headers={"If-Modified-Since": last_modified})
+    assert r.status_code == 200
@@ -0,0 +1,62 @@
+"""
+Сводка по складу (inventory_rollup): REFRESH CONCURRENTLY переписывает только
+изменившиеся строки, ключи чужих уровней и "без поставщика" наружу отдаются как null.
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from api.dependencies import inventory_use_cases
+from infrastructure.db_helper import db_helper
+
+pytestmark = pytest.mark.anyio
+
+
+async def _rollup_rows() -> dict:
+    async with db_helper.session(commit=False) as session:
+        res = await session.execute(
+            text("SELECT ctid::text, level, category, sub_category, provider_id FROM inventory_rollup")
+        )
+        return {tuple(row[1:]): row[0] for row in res}
+
+
+async def test_refresh_keeps_unchanged_rows(client):
+    category = f"rollup-{uuid.uuid4()}"
+    r = await client.post(
+        "/positions",
+        json={
+            "category": category,
+            "sub_category": "s",
+            "name": "without-provider",
+            "description": "d",
+            "balance": 3,
+            "purchase_price": 1.0,
+            "sale_price": 2.0,
+            "markup": 1.0,
+        },
+    )
+    assert r.status_code == 201
+    assert await inventory_use_cases.refresh_summary() is not None
+    before = await _rollup_rows()
+
+    # данные не менялись: ни одна строка view не удалена и не вставлена заново
+    assert await inventory_use_cases.refresh_summary() is not None
+    assert await _rollup_rows() == before
+
+    r = await client.get("/positions/summary", params={"group_by": "category", "category": category})
+    assert r.json()["items"] == [
+        {
+            "category": category,
+            "sub_category": None,
+            "provider_id": None,
+            "positions_count": 1,
+            "total_balance": 3,
+            "stock_value": 3.0,
+            "potential_revenue": 6.0,
+        }
+    ]
+    r = await client.get("/positions/summary", params={"group_by": "provider"})
+    assert None in [item["provider_id"] for item in r.json()["items"]]
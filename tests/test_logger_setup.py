@@ -0,0 +1,36 @@
+import logging
+
+import orjson
+import pytest
+
+from services.logger_setup import get_logger, setup_logging, stop_logging_listener
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    stop_logging_listener()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_queue_mode_keeps_exc_info_in_json(tmp_path, restore_root_logger):
+    setup_logging(log_dir=str(tmp_path), level="INFO", use_queue=True, json_format=True)
+    log = get_logger("tests.logging")
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.exception("Failed for %s", "position")
+    # listener дописывает очередь при остановке
+    stop_logging_listener()
+
+    lines = (tmp_path / "storehouse.log").read_text(encoding="utf-8").splitlines()
+    record = orjson.loads(lines[-1])
+    assert record["message"] == "Failed for position"
+    assert "ZeroDivisionError" in record["exc_info"]
@@ -0,0 +1,81 @@
+"""
+Статистика цен (avg_positions_info), которую ведут триггеры на positions, совпадает
+с полным пересчётом и после удалений/изменений позиций, задавших first/last.
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def _create(
+    client, category: str, name: str, price: float, sub_category: str = "s"
+) -> str:
+    r = await client.post(
+        "/positions",
+        json={
+            "category": category,
+            "sub_category": sub_category,
+            "name": name,
+            "description": "d",
+            "purchase_price": price,
+            "sale_price": price * 2,
+            "markup": 100.0,
+        },
+    )
+    assert r.status_code in (200, 201)
+    return r.json()["id"]
+
+
+async def _stats(client, category: str, **params) -> dict:
+    r = await client.get("/positions/stats", params={"category": category, **params})
+    assert r.status_code == 200
+    return r.json()[0]
+
+
+def _prices(stats: dict) -> tuple:
+    return (
+        stats["positions_count"],
+        stats["first_purchase_price"],
+        stats["last_purchase_price"],
+        stats["first_sale_price"],
+        stats["last_sale_price"],
+    )
+
+
+async def test_first_last_follow_deletes_and_updates(client):
+    category = f"stats-{uuid.uuid4()}"
+    # отдельные запросы — отдельные транзакции, created_at растёт
+    first = await _create(client, category, "a", 10.0)
+    middle = await _create(client, category, "b", 20.0)
+    last = await _create(client, category, "c", 30.0)
+    assert _prices(await _stats(client, category)) == (3, 10.0, 30.0, 20.0, 60.0)
+
+    assert (await client.delete(f"/positions/{first}")).status_code == 204
+    assert (await client.delete(f"/positions/{last}")).status_code == 204
+    assert _prices(await _stats(client, category)) == (1, 20.0, 20.0, 40.0, 40.0)
+    # группа имени "c" опустела
+    assert _prices(await _stats(client, category, sub_category="s", name="c")) == (
+        0, None, None, None, None,
+    )
+
+    r = await client.patch(
+        f"/positions/{middle}", json={"purchase_price": 25.0, "sale_price": 50.0}
+    )
+    assert r.status_code == 200
+    assert _prices(await _stats(client, category)) == (1, 25.0, 25.0, 50.0, 50.0)
+
+
+async def test_first_follows_position_moved_into_group(client):
+    category = f"stats-{uuid.uuid4()}"
+    older = await _create(client, category, "a", 10.0, sub_category="s")
+    await _create(client, category, "b", 20.0, sub_category="t")
+
+    r = await client.patch(f"/positions/{older}", json={"sub_category": "t"})
+    assert r.status_code == 200
+    # перенесённая позиция раньше всех в "t" — она и first, и (как последняя записанная) last
+    assert _prices(await _stats(client, category, sub_category="t")) == (2, 10.0, 10.0, 20.0, 20.0)
+    assert _prices(await _stats(client, category, sub_category="s")) == (0, None, None, None, None)
@@ -0,0 +1,213 @@
+"""
+Число SQL-statement'ов на запрос: профили загрузки (infrastructure/orm/load_profiles)
+и set-based пути записи обещают фиксированное число запросов, не зависящее от объёма
+данных. Рост числа — регрессия (N+1, refresh после flush, построчный цикл).
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass, field
+from itertools import count
+
+import httpx
+import pytest
+
+from infrastructure.query_tracker import assert_max_queries
+
+pytestmark = pytest.mark.anyio
+
+_seq = count()
+
+
+def _position(provider_id: str, manager_id: str, **extra) -> dict:
+    n = next(_seq)
+    return {
+        "category": "tests",
+        "sub_category": "query-counts",
+        "name": f"position-{n}",
+        "description": "d",
+        "balance": 10,
+        "min_balance": 1,
+        "purchase_price": 100.0,
+        "sale_price": 150.0,
+        "markup": 50.0,
+        "provider_id": provider_id,
+        "provider_manager_id": manager_id,
+        **extra,
+    }
+
+
+@dataclass
+class Seeded:
+    provider_id: str
+    manager_id: str
+    position_ids: list[str] = field(default_factory=list)
+
+    def position(self, **extra) -> dict:
+        return _position(self.provider_id, self.manager_id, **extra)
+
+
+@pytest.fixture
+async def seeded(client: httpx.AsyncClient) -> Seeded:
+    # поставщик с несколькими менеджерами и позициями: связи есть, но профиль FLAT их не грузит
+    r = await client.post("/providers", json={"name": "p", "address": "a", "description": "d"})
+    provider_id = r.json()["id"]
+    managers = [
+        (await client.post(
+            "/managers", json={"provider_id": provider_id, "name": f"m{k}", "telephones": "1"}
+        )).json()["id"]
+        for k in range(3)
+    ]
+    data = Seeded(provider_id, managers[0])
+    r = await client.post("/positions/bulk", json=[data.position() for _ in range(20)])
+    data.position_ids = [row["id"] for row in r.json()["ok"]]
+    return data
+
+
+# --------------------------------------------------------------------------- positions
+
+
+async def test_list_positions(client, seeded):
+    # версия выборки (ETag) + страница
+    with assert_max_queries(2):
+        r = await client.get("/positions", params={"limit": 10})
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == 10
+
+
+async def test_list_positions_filtered_page(client, seeded):
+    first = await client.get("/positions", params={"limit": 5, "category": "tests"})
+    with assert_max_queries(2):
+        r = await client.get(
+            "/positions",
+            params={"limit": 5, "category": "tests", "cursor": first.json()["next_cursor"]},
+        )
+    assert r.status_code == 200
+
+
+async def test_get_position(client, seeded):
+    position_id = seeded.position_ids[0]
+    with assert_max_queries(1):
+        r = await client.get(f"/positions/{position_id}")
+    assert r.status_code == 200
+    # повторно — из read-through кэша
+    with assert_max_queries(0):
+        r = await client.get(f"/positions/{position_id}")
+    assert r.status_code == 200
+
+
+async def test_get_missing_position(client, database):
+    with assert_max_queries(1):
+        r = await client.get(f"/positions/{uuid.uuid4()}")
+    assert r.status_code == 404
+
+
+async def test_batch_get_positions(client, seeded):
+    with assert_max_queries(1):
+        r = await client.post("/positions/batch-get", json=seeded.position_ids)
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == len(seeded.position_ids)
+
+
+async def test_create_position(client, seeded):
+    # INSERT + чтение строки для ответа
+    with assert_max_queries(2):
+        r = await client.post("/positions", json=seeded.position())
+    assert r.status_code == 201
+
+
+@pytest.mark.parametrize("rows", [1, 100])
+async def test_create_positions_bulk(client, seeded, rows):
+    # проверка FK (providers, provider_manager) + SAVEPOINT / INSERT / RELEASE — для любого числа строк
+    with assert_max_queries(5):
+        r = await client.post("/positions/bulk", json=[seeded.position() for _ in range(rows)])
+    assert r.status_code == 200
+    assert len(r.json()["ok"]) == rows
+
+
+async def test_upsert_positions_bulk(client, seeded):
+    rows = [seeded.position() for _ in range(50)]
+    await client.post("/positions/bulk", params={"mode": "upsert"}, json=rows)
+    with assert_max_queries(5):
+        r = await client.post("/positions/bulk", params={"mode": "upsert"}, json=rows)
+    assert r.json()["unchanged"] == len(rows)
+
+
+async def test_update_position(client, seeded):
+    with assert_max_queries(3):
+        r = await client.patch(f"/positions/{seeded.position_ids[0]}", json={"name": "renamed"})
+    assert r.status_code == 200
+
+
+async def test_update_positions_bulk(client, seeded):
+    # одна группа колонок -> один UPDATE ... FROM (VALUES ...) в SAVEPOINT
+    patch = {pid: {"balance": 3} for pid in seeded.position_ids}
+    with assert_max_queries(3):
+        r = await client.patch("/positions/bulk", json=patch)
+    assert r.status_code == 200
+
+
+async def test_delete_position(client, seeded):
+    with assert_max_queries(3):
+        r = await client.delete(f"/positions/{seeded.position_ids[0]}")
+    assert r.status_code == 204
+
+
+async def test_delete_positions_bulk(client, seeded):
+    with assert_max_queries(2):
+        r = await client.post("/positions/delete-bulk", json=seeded.position_ids)
+    assert r.status_code == 200
+
+
+async def test_stock_movements(client, seeded):
+    movements = [{"position_id": pid, "delta": 1} for pid in seeded.position_ids]
+    with assert_max_queries(1):
+        r = await client.post("/positions/stock-movements", json={"movements": movements})
+    assert r.status_code == 200
+
+
+# --------------------------------------------------------------------------- providers / managers
+
+
+async def test_list_providers(client, seeded):
+    # версия выборки + список; менеджеры не подгружаются (профиль FLAT)
+    with assert_max_queries(2):
+        r = await client.get("/providers")
+    assert r.status_code == 200
+
+
+async def test_get_provider(client, seeded):
+    with assert_max_queries(1):
+        r = await client.get(f"/providers/{seeded.provider_id}")
+    assert r.status_code == 200
+
+
+async def test_batch_get_providers(client, seeded):
+    missing = str(uuid.uuid4())
+    with assert_max_queries(1):
+        r = await client.post(
+            "/providers/batch-get", json=[seeded.provider_id, missing, seeded.provider_id]
+        )
+    assert r.status_code == 200
+    body = r.json()
+    assert [p and p["id"] for p in body["items"]] == [seeded.provider_id, None, seeded.provider_id]
+    assert body["not_found_ids"] == [missing]
+
+
+async def test_list_managers(client, seeded):
+    with assert_max_queries(1):
+        r = await client.get("/managers")
+    assert r.status_code == 200
+
+
+async def test_get_manager(client, seeded):
+    with assert_max_queries(1):
+        r = await client.get(f"/managers/{seeded.manager_id}")
+    assert r.status_code == 200
+
+
+async def test_list_managers_by_provider(client, seeded):
+    with assert_max_queries(1):
+        r = await client.get(f"/managers/by-provider/{seeded.provider_id}")
+    assert r.status_code == 200
+    assert len(r.json()) == 3
@@ -0,0 +1,107 @@
+"""
+Компакция журнала движений: прерванный между порциями прогон не ломает balance_at —
+позиция либо свёрнута целиком, либо не тронута.
+"""
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from sqlalchemy import func, select, text
+
+from api.dependencies import stock_ledger_provider
+from infrastructure.db_helper import db_helper
+from infrastructure.orm.metadata_providers.stockLedgerMetadataProvider import (
+    _COMPACTION_LOCK,
+    StockLedgerMetadataProvider,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+class Interrupted(Exception):
+    pass
+
+
+async def _now():
+    async with db_helper.session(commit=False) as session:
+        return await session.scalar(select(func.localtimestamp()))
+
+
+async def _create(client, balance: int) -> uuid.UUID:
+    r = await client.post(
+        "/positions",
+        json={
+            "category": "tests",
+            "sub_category": "stock-ledger",
+            "name": f"ledger-{uuid.uuid4()}",
+            "description": "d",
+            "balance": balance,
+            "purchase_price": 1.0,
+            "sale_price": 2.0,
+            "markup": 1.0,
+        },
+    )
+    assert r.status_code == 201
+    return uuid.UUID(r.json()["id"])
+
+
+async def _receive(client, position_id: uuid.UUID, quantity: int) -> None:
+    r = await client.post(f"/positions/{position_id}/stock/receive", json={"quantity": quantity})
+    assert r.status_code == 200
+
+
+async def test_interrupted_compaction_keeps_balances(client, monkeypatch):
+    # журнал других тестов — в снимки, дальше в нём только движения этого теста
+    await stock_ledger_provider.compact(await _now())
+
+    positions = [await _create(client, 5), await _create(client, 7)]
+    for position_id in positions:
+        await _receive(client, position_id, 2)
+    cutoff = await _now()
+    for position_id in positions:
+        await _receive(client, position_id, 3)
+    at_cutoff = {positions[0]: 7, positions[1]: 9}
+    current = {positions[0]: 10, positions[1]: 12}
+
+    async def check_balances() -> None:
+        now = await _now()
+        for position_id in positions:
+            assert await stock_ledger_provider.balance_at(position_id, cutoff) == (
+                at_cutoff[position_id],
+                cutoff,
+            )
+            assert await stock_ledger_provider.balance_at(position_id, now) == (
+                current[position_id],
+                now,
+            )
+
+    compact_chunk = StockLedgerMetadataProvider._compact_chunk
+    calls = 0
+
+    async def interrupted_chunk(self, *args):
+        nonlocal calls
+        calls += 1
+        if calls > 1:
+            raise Interrupted
+        return await compact_chunk(self, *args)
+
+    monkeypatch.setattr(StockLedgerMetadataProvider, "_compact_chunk", interrupted_chunk)
+    with pytest.raises(Interrupted):
+        await stock_ledger_provider.compact(cutoff, batch_size=1)
+    # одна позиция свёрнута, вторая ещё целиком в журнале
+    await check_balances()
+
+    monkeypatch.undo()
+    # лок прерванного прогона снят: следующий сворачивает оставшееся
+    assert await stock_ledger_provider.compact(cutoff, batch_size=1) == (2, 1)
+    await check_balances()
+
+
+async def test_compaction_skipped_while_locked(database):
+    async with db_helper.engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _COMPACTION_LOCK})
+        try:
+            assert await stock_ledger_provider.compact(await _now()) == (0, 0)
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _COMPACTION_LOCK})
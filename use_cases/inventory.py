@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from infrastructure.orm.metadata_providers.inventoryRollupMetadataProvider import (
+    InventoryRollupMetadataProvider,
+    SummaryLevel,
+)
+
+
+class InventoryUseCases:
+    def __init__(self, rollup: InventoryRollupMetadataProvider):
+        self.rollup = rollup
+
+    async def get_summary(
+        self,
+        level: SummaryLevel,
+        *,
+        category: str | None = None,
+        sub_category: str | None = None,
+        provider_id: UUID | None = None,
+    ) -> tuple[list[dict[str, Any]], datetime | None] | None:
+        return await self.rollup.get_summary(
+            level, category=category, sub_category=sub_category, provider_id=provider_id
+        )
+
+    async def refresh_summary(self) -> datetime | None:
+        return await self.rollup.refresh()
@@ -1,39 +1,139 @@
 from __future__ import annotations
 
-from typing import Any
+from datetime import datetime
+from typing import Any, AsyncIterator
 
+from infrastructure.events import PgNotifyBroker, Subscription
+from infrastructure.orm.load_profiles import LoadProfile
 from infrastructure.orm.metadata_providers.positionsMetadataProvider import PositionsMetadataProvider
 from infrastructure.orm.models import PositionsModel
+from services.positions_import import ParseReport, iter_position_records
 from uuid import UUID
 
 class PositionsUseCases:
-    def __init__(self, positions: PositionsMetadataProvider):
+    def __init__(self, positions: PositionsMetadataProvider, low_stock_events: PgNotifyBroker):
         self.positions = positions
+        self.low_stock_events = low_stock_events
 
-    async def list_positions(self) -> list[PositionsModel]:
-        res = await self.positions.get_all()
+    async def list_positions(
+        self, *, load: LoadProfile = LoadProfile.FLAT
+    ) -> list[PositionsModel]:
+        res = await self.positions.get_all(load=load)
         return res or []
 
-    async def get_position(self, position_id: UUID) -> PositionsModel | None:
+    async def list_positions_page(
+        self,
+        *,
+        limit: int,
+        cursor: str | None = None,
+        category: str | None = None,
+        sub_category: str | None = None,
+        provider_id: UUID | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        res = await self.positions.get_page(
+            limit=limit,
+            cursor=cursor,
+            category=category,
+            sub_category=sub_category,
+            provider_id=provider_id,
+        )
+        return res or ([], None)
+
+    async def list_low_stock_page(
+        self,
+        *,
+        limit: int,
+        cursor: str | None = None,
+        category: str | None = None,
+        provider_id: UUID | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        res = await self.positions.get_low_stock_page(
+            limit=limit, cursor=cursor, category=category, provider_id=provider_id
+        )
+        return res or ([], None)
+
+    async def subscribe_low_stock(self) -> Subscription:
+        return await self.low_stock_events.subscribe()
+
+    async def positions_version(self) -> tuple[int, datetime] | None:
+        return await self.positions.get_version()
+
+    async def list_changes(
+        self,
+        *,
+        since: str | None = None,
+        limit: int,
+        settle_seconds: float = 0.0,
+    ) -> tuple[list[tuple[str, Any]], str | None, bool]:
+        res = await self.positions.get_changes(
+            since=since, limit=limit, settle_seconds=settle_seconds
+        )
+        return res or ([], since, False)
+
+    def export_positions(self, *, chunk_size: int = 1000) -> AsyncIterator[list[dict[str, Any]]]:
+        return self.positions.stream_all(chunk_size=chunk_size)
+
+    async def get_position(self, position_id: UUID) -> dict[str, Any] | None:
         return await self.positions.get_by_id(position_id)
 
+    async def get_positions(self, position_ids: list[UUID]) -> list[dict[str, Any] | None] | None:
+        """
+        Позиции в порядке position_ids (повторы сохраняются), None — не найдена.
+        """
+        found = await self.positions.get_many_by_ids(position_ids)
+        if found is None:
+            return None
+        return [found.get(pid) for pid in position_ids]
+
     async def create_position(self, data: dict[str, Any]) -> PositionsModel | None:
         return await self.positions.insert(data, refresh=True)
 
     async def create_many(self, items: list[dict[str, Any]]):
-        # вернёт (ok, failed) или None
-        return await self.positions.insert_many(items, refresh=False)
+        # вернёт (ok, failed): ok — вставленные строки, failed — (item, error)
+        return await self.positions.insert_many(items)
+
+    async def upsert_many(self, items: list[dict[str, Any]]):
+        # вернёт (counts, failed): counts — inserted/updated/unchanged, failed — (item, error)
+        return await self.positions.upsert_many(items)
+
+    async def import_positions(
+        self, chunks: AsyncIterator[bytes], *, delimiter: str
+    ) -> dict[str, Any] | None:
+        # вернёт сводку inserted/rejected/duplicates или None, если упала БД
+        report = ParseReport()
+        batches = iter_position_records(chunks, delimiter=delimiter, report=report)
+        summary = await self.positions.copy_import(batches)
+        if summary is None:
+            return None
+        summary["rejected"] += report.rejected
+        summary["errors"] = report.errors
+        return summary
 
     async def update_position(self, position_id: str, patch: dict[str, Any]) -> PositionsModel | None:
         return await self.positions.update_by_id(position_id, patch)
 
     async def update_many(self, ids_data: dict[str, dict[str, Any]]):
-        # вернёт (updated, failed)
+        # вернёт (updated, failed): updated — строки после обновления, failed — (id, error)
         return await self.positions.update_many_by_id(ids_data)
 
+    async def receive_stock(self, position_id: UUID, quantity: int) -> tuple[int | None, str | None]:
+        return await self.positions.move_stock(position_id, quantity)
+
+    async def issue_stock(
+        self, position_id: UUID, quantity: int, *, allow_negative: bool = False
+    ) -> tuple[int | None, str | None]:
+        return await self.positions.move_stock(
+            position_id, -quantity, allow_negative=allow_negative
+        )
+
+    async def move_stock_many(
+        self, movements: list[tuple[UUID, int]], *, allow_negative: bool = False
+    ) -> tuple[dict[UUID, int], list[tuple[UUID, str]]] | None:
+        return await self.positions.move_stock_many(movements, allow_negative=allow_negative)
+
     async def delete_position(self, position_id: str) -> bool:
         return await self.positions.delete_by_id(position_id)
 
-    async def delete_many(self, ids: list[str]) -> bool:
-        await self.positions.delete_many(ids)
-        return True
+    async def delete_many(self, ids: list[str]) -> tuple[list[UUID], list[str]] | None:
+        # вернёт (deleted_ids, not_found_ids) или None
+        return await self.positions.delete_many(ids)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Any
+
+from infrastructure.orm.metadata_providers.positionStatsMetadataProvider import PositionStatsMetadataProvider
+
+
+class PositionStatsUseCases:
+    def __init__(self, stats: PositionStatsMetadataProvider):
+        self.stats = stats
+
+    async def get_stats(
+        self,
+        *,
+        category: str | None = None,
+        sub_category: str | None = None,
+        name: str | None = None,
+    ) -> list[dict[str, Any]] | None:
+        return await self.stats.get_stats(category=category, sub_category=sub_category, name=name)
+
+    async def recompute(self) -> int | None:
+        return await self.stats.recompute()
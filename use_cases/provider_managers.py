@@ -15,6 +15,15 @@ class ProviderManagerUseCases:
     async def get_manager(self, manager_id: UUID):
         return await self.managers.get_by_id(manager_id)
 
+    async def get_managers(self, manager_ids: list[UUID]):
+        """
+        Менеджеры в порядке manager_ids (повторы сохраняются), None — не найден.
+        """
+        found = await self.managers.get_many_by_ids(manager_ids)
+        if found is None:
+            return None
+        return [found.get(mid) for mid in manager_ids]
+
     async def list_by_provider(self, provider_id: UUID):
         return await self.managers.get_by_provider_id(provider_id)
 
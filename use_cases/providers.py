@@ -19,9 +19,21 @@ class ProviderUseCases:
     async def list_providers(self):
         return await self.providers.get_all()
 
+    async def providers_version(self):
+        return await self.providers.get_version()
+
     async def get_provider(self, provider_id: UUID):
         return await self.providers.get_by_id(provider_id)
 
+    async def get_providers(self, provider_ids: list[UUID]):
+        """
+        Поставщики в порядке provider_ids (повторы сохраняются), None — не найден.
+        """
+        found = await self.providers.get_many_by_ids(provider_ids)
+        if found is None:
+            return None
+        return [found.get(pid) for pid in provider_ids]
+
     async def create_provider(self, data: dict):
         try:
             return await self.providers.insert(data=data, refresh=True)
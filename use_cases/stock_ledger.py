@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID
+
+from infrastructure.orm.metadata_providers.stockLedgerMetadataProvider import StockLedgerMetadataProvider
+
+
+class StockLedgerUseCases:
+    def __init__(self, ledger: StockLedgerMetadataProvider):
+        self.ledger = ledger
+
+    async def list_movements(self, position_id: UUID, *, limit: int = 100) -> list[dict[str, Any]]:
+        return await self.ledger.get_movements(position_id, limit=limit)
+
+    async def balance_at(self, position_id: UUID, at: datetime) -> tuple[int, datetime | None]:
+        # timestamp в БД без зоны (UTC сервера БД): aware-время приводим к нему и обратно
+        if at.tzinfo is None:
+            return await self.ledger.balance_at(position_id, at)
+        balance, as_of = await self.ledger.balance_at(
+            position_id, at.astimezone(timezone.utc).replace(tzinfo=None)
+        )
+        return balance, as_of.replace(tzinfo=timezone.utc) if as_of is not None else None
+
+    async def compact(self, *, retention_days: float, batch_size: int) -> tuple[int, int]:
+        return await self.ledger.compact_older_than(
+            timedelta(days=retention_days), batch_size=batch_size
+        )